@@ -0,0 +1,65 @@
+"""
+Compare decoding a full Rover register snapshot with `decode()` against calling the
+generated accessor for every field. When given a capture file recorded with the
+RenogyRover `capture` option, also time decoding every poll it contains.
+
+    python -m benchmarks.rover_decoder [rover.capture]
+"""
+
+import sys
+import time
+import timeit
+from unittest import mock
+
+from probes.renogy.capture import ReplayDevice
+from probes.renogy.registers import REGISTER_BLOCKS, REGISTER_MAP, decode
+from probes.renogy.renogy_rover import RenogyRoverController
+from tests.probes.renogy.fakes.fake_modbus import create_fake_modbus
+
+ITERATIONS = 2000
+
+
+def main():
+    with mock.patch(
+        "probes.renogy.renogy_rover._create_controller"
+    ) as mock_create_controller:
+        mock_create_controller.return_value = create_fake_modbus()
+        controller = RenogyRoverController(port=123, address="/dev/ttyUSB0")
+
+    with controller.snapshot() as snapshot:
+        for block in REGISTER_BLOCKS:
+            snapshot.load(block.address, block.count)
+
+        keys = [register.key for register in REGISTER_MAP]
+        assert decode(snapshot.read) == {
+            key: getattr(controller, key)() for key in keys
+        }
+
+        per_field = timeit.timeit(
+            lambda: {key: getattr(controller, key)() for key in keys},
+            number=ITERATIONS,
+        )
+        table_driven = timeit.timeit(lambda: decode(snapshot.read), number=ITERATIONS)
+
+    print(f"fields per cycle: {len(keys)}")
+    print(f"method per field: {per_field / ITERATIONS * 1e6:8.1f} us/cycle")
+    print(f"decode():         {table_driven / ITERATIONS * 1e6:8.1f} us/cycle")
+
+
+def replay(path: str):
+    device = ReplayDevice(path, speed=None, loop=False)
+    controller = RenogyRoverController(None, None, device=device, retries=0)
+
+    polls = 0
+    start = time.perf_counter()
+    while device.advance():
+        controller.all_data()
+        polls += 1
+    elapsed = time.perf_counter() - start
+    print(f"replayed {polls} polls in {elapsed:.2f}s ({polls / elapsed:.0f} polls/s)")
+
+
+if __name__ == "__main__":
+    main()
+    if len(sys.argv) > 1:
+        replay(sys.argv[1])
@@ -1,12 +1,14 @@
 import logging
 import os
 from dataclasses import dataclass, field
-from typing import Union
+from typing import Any, Optional, Union
 
 import yaml
 
 from probes import Probe
+from probes.isolated import isolated
 from writers import MetricsWriter
+from writers.queued import QueuedWriter
 
 try:
     from yaml import CLoader as Loader  # noqa
@@ -15,14 +17,20 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+
 @dataclass
 class LoggingConfig:
     level: Union[int, str] = logging.WARNING
     filename: Union[str, None] = None
 
+
 @dataclass
 class EngineConfig:
     frequency: float = 30.0
+    concurrent: bool = False
+    poll_timeout: Optional[float] = None
+    overrun: str = "skip"
+    asyncio: bool = False
     logging: LoggingConfig = field(default_factory=LoggingConfig)
     probes: list[Probe] = field(default_factory=list)
     writers: list[MetricsWriter] = field(default_factory=list)
@@ -66,10 +74,17 @@ def load_config(
         logger.warning(f"Available probe names are: {sorted(available_probes)}")
 
     probes_map = {p.__name__.lower(): p for p in probes}
+    for name, probe in config.get("probes", {}).items():
+        if name.lower() in probes_map:
+            _check_isolation(
+                probes_map[name.lower()], probe if isinstance(probe, list) else [probe]
+            )
+    # a list of arguments configures several instances of the same probe
     config["probes"] = [
-        probes_map[name.lower()](**(probe or {}))
+        _create_probe(probes_map[name.lower()], args)
         for name, probe in config.get("probes", {}).items()
         if name.lower() in probes_map
+        for args in (probe if isinstance(probe, list) else [probe])
     ]
     configured_probes = sorted(p.__class__.__name__ for p in config["probes"])
     logger.info(f"Configured probes: {configured_probes}")
@@ -89,7 +104,7 @@ def load_config(
 
     writers_map = {w.__name__.lower(): w for w in writers}
     config["writers"] = [
-        writers_map[name.lower()](**writer)
+        _create_writer(writers_map[name.lower()], writer)
         for name, writer in config.get("writers", {}).items()
         if name.lower() in writers_map
     ]
@@ -99,7 +114,65 @@ def load_config(
     config = {
         k: v
         for k, v in config.items()
-        if k in ["frequency", "probes", "writers", "logging"]
+        if k
+        in [
+            "frequency",
+            "concurrent",
+            "poll_timeout",
+            "overrun",
+            "asyncio",
+            "probes",
+            "writers",
+            "logging",
+        ]
     }
 
     return EngineConfig(**config)
+
+
+def _check_isolation(probe: type[Probe], instances: list[Optional[dict]]) -> None:
+    # Each worker process of an isolated probe has buses of its own, so an isolated
+    # instance would talk over the others on the same bus instead of taking turns
+    if probe.shared_bus is None:
+        return
+    buses: dict[Any, list[dict]] = {}
+    for args in instances:
+        args = args or {}
+        if probe.shared_bus in args:
+            buses.setdefault(args[probe.shared_bus], []).append(args)
+    for bus, bus_instances in buses.items():
+        if len(bus_instances) > 1 and any(
+            args.get("isolate") for args in bus_instances
+        ):
+            raise ValueError(
+                f"{probe.__name__} instances on {probe.shared_bus} {bus} share a bus "
+                "and can't be isolated"
+            )
+
+
+def _create_probe(probe: type[Probe], args: Optional[dict]) -> Probe:
+    # `frequency` is the engine's setting for this probe, not a probe argument, and
+    # `isolate: true` (or `isolate: {deadline: ...}`) runs it in a worker process
+    args = dict(args or {})
+    frequency = args.pop("frequency", None)
+    isolate = args.pop("isolate", None)
+    if isolate:
+        instance = isolated(probe)(
+            **(isolate if isinstance(isolate, dict) else {}), **args
+        )
+    else:
+        instance = probe(**args)
+    if frequency is not None:
+        instance.frequency = frequency
+    return instance
+
+
+def _create_writer(writer: type[MetricsWriter], args: Optional[dict]) -> MetricsWriter:
+    # `queue: {max_size: ..., overflow: ...}` (or `queue: true`) runs the writer on
+    # its own thread behind a bounded queue
+    args = dict(args or {})
+    queue = args.pop("queue", None)
+    instance = writer(**args)
+    if queue:
+        instance = QueuedWriter(instance, **(queue if isinstance(queue, dict) else {}))
+    return instance
@@ -1,13 +1,130 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 import logging
 import pprint
 import sys
 import time
+from typing import Iterator, Optional, Union
 
+from instrumentation import EngineStats, Histogram, export
 from probes import Probe
 from writers import MetricsWriter
+from writers.queued import QueuedWriter
 
 logger = logging.getLogger(__name__)
 
+OVERRUN_POLICIES = ("skip", "coalesce")
+
+
+@dataclass
+class ProbeSchedule:
+    period: float  # seconds
+    next_tick: float  # time.monotonic() of the next poll
+    overruns: int = 0  # polls that were still running when their next tick came
+    missed_ticks: int = 0  # ticks skipped or folded into a late poll
+
+    def advance(self, now: float, overrun: str = "skip") -> None:
+        """
+        Move to the tick following the one that was just polled. Ticks are at fixed
+        multiples of `period` so that polling doesn't drift. When polling overran
+        ticks, `skip` waits for the next tick still ahead while `coalesce` polls
+        once right away for all of them.
+        """
+        if self.period <= 0:
+            self.next_tick = now
+            return
+
+        self.next_tick += self.period
+        if self.next_tick > now:
+            return
+        missed = int((now - self.next_tick) // self.period) + 1
+        if overrun == "coalesce":
+            missed -= 1
+        self.next_tick += missed * self.period
+        self.overruns += 1
+        self.missed_ticks += missed
+
+
+def probe_period(probe: Probe, frequency: float) -> float:
+    """
+    Seconds between polls of `probe`: its own `frequency` attribute (set from the
+    probe's config) or the engine's `frequency`
+    """
+    probe_frequency = getattr(probe, "frequency", None)
+    return frequency if probe_frequency is None else probe_frequency
+
+
+def _advance(
+    probe: Probe,
+    schedule: ProbeSchedule,
+    now: float,
+    overrun: str,
+    stats: EngineStats,
+) -> None:
+    overruns, missed_ticks = schedule.overruns, schedule.missed_ticks
+    schedule.advance(now, overrun)
+    if schedule.overruns != overruns:
+        name = probe.__class__.__name__
+        stats.overruns[name] += schedule.overruns - overruns
+        stats.missed_ticks[name] += schedule.missed_ticks - missed_ticks
+        logger.debug(
+            f"Probe {name} overran its {schedule.period}s period "
+            f"({schedule.missed_ticks} ticks missed so far)"
+        )
+
+
+def writer_name(writer: MetricsWriter) -> str:
+    """
+    Name of `writer` in logs and stats, that of the writer it queues records for if
+    it is a `QueuedWriter`
+    """
+    if isinstance(writer, QueuedWriter):
+        return writer.name
+    return writer.__class__.__name__
+
+
+def _export_stats(
+    stats: EngineStats, probes: list[Probe], writers: list[MetricsWriter]
+) -> None:
+    # probes and writers reporting on themselves, like the Rover's Modbus transport
+    stats.sources = [
+        source for source in [*probes, *writers] if hasattr(source, "metrics")
+    ]
+    for writer in writers:
+        if isinstance(writer, QueuedWriter):
+            # the time spent writing, as the engine only sees records being queued
+            writer.latency = stats.write_latency[writer_name(writer)]
+    export(stats)
+
+
+def _engine_latency(stats: EngineStats, writer: MetricsWriter) -> Optional[Histogram]:
+    # queued writers observe their own write latency
+    if isinstance(writer, QueuedWriter):
+        return None
+    return stats.write_latency[writer_name(writer)]
+
+
+def _stop_probes(probes: list[Probe]) -> None:
+    for probe in probes:
+        try:
+            probe.stop()
+        except Exception as exc:
+            logger.exception(exc)
+
+
+def _close_writers(writers: list[MetricsWriter]) -> None:
+    for writer in writers:
+        try:
+            writer.close()
+        except Exception as exc:
+            logger.exception(exc)
+
+
+def _discard_result(task: asyncio.Task) -> None:
+    if not task.cancelled():
+        task.exception()
+
 
 class Engine:
     def __init__(
@@ -15,37 +132,283 @@ class Engine:
         probes: list[Probe] = [],
         writers: list[MetricsWriter] = [],
         frequency: float = 1.0,
+        concurrent: bool = False,
+        poll_timeout: Optional[float] = None,
+        overrun: str = "skip",
+        stats: Optional[EngineStats] = None,
     ) -> None:
-        self.frequency = frequency  # seconds
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(
+                f"Unknown overrun policy {overrun!r}, expected one of {OVERRUN_POLICIES}"
+            )
+        # seconds between polls of the probes that don't have their own `frequency`
+        self.frequency = frequency
         self.probes = probes
         self.writers = writers
+        # Poll every probe at the same time on a worker pool. A probe that takes
+        # longer than `poll_timeout` seconds is left out of the cycle, and of the
+        # following ones until its poll returns.
+        self.concurrent = concurrent
+        self.poll_timeout = poll_timeout
+        self.overrun = overrun
+        self.schedules: list[ProbeSchedule] = []
+        self.stats = stats or EngineStats()
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: dict[int, Future] = {}
 
     def run(self):
         logger.info("=" * 80)
         logger.info("Starting probes. Press CTRL-C to terminate")
-        while True:
-            for probe in self.probes:
+        start = time.monotonic()
+        self.schedules = [
+            ProbeSchedule(period=probe_period(probe, self.frequency), next_tick=start)
+            for probe in self.probes
+        ]
+        _export_stats(self.stats, self.probes, self.writers)
+        try:
+            while True:
+                now = cycle_start = time.monotonic()
+                due = [
+                    i
+                    for i, schedule in enumerate(self.schedules)
+                    if schedule.next_tick <= now
+                ]
+                polls = (
+                    self._poll_concurrently(due) if self.concurrent else self._poll(due)
+                )
+                for probe, data in polls:
+                    self._write(probe, data)
+
+                now = time.monotonic()
+                if due:
+                    self.stats.cycle_duration.observe(now - cycle_start)
+                for i in due:
+                    _advance(
+                        self.probes[i], self.schedules[i], now, self.overrun, self.stats
+                    )
+
+                # Force log buffers and stdout to flush before sleeping
+                for handler in logger.handlers + logger.root.handlers:
+                    if hasattr(handler, "flush"):
+                        logger.root.handlers[0].flush()
+                sys.stdout.flush()
+
+                next_tick = min(
+                    (schedule.next_tick for schedule in self.schedules), default=now
+                )
+                time.sleep(max(0.0, next_tick - time.monotonic()))
+        finally:
+            if self._executor:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            _stop_probes(self.probes)
+            _close_writers(self.writers)
+
+    def _poll(self, due: list[int]) -> Iterator[tuple[Probe, Union[dict, list[dict]]]]:
+        for i in due:
+            probe = self.probes[i]
+            try:
+                data = self._timed_poll(probe)
+            except Exception as exc:
+                self.stats.poll_errors[probe.__class__.__name__] += 1
+                logger.exception(exc)
+            else:
+                yield probe, data
+
+    def _timed_poll(self, probe: Probe) -> Union[dict, list[dict]]:
+        name = probe.__class__.__name__
+        logger.debug(f"Polling with probe {name}")
+        start = time.perf_counter()
+        try:
+            return probe.poll()
+        finally:
+            self.stats.poll_latency[name].observe(time.perf_counter() - start)
+
+    def _poll_concurrently(
+        self, due: list[int]
+    ) -> Iterator[tuple[Probe, Union[dict, list[dict]]]]:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, len(self.probes)), thread_name_prefix="probe"
+            )
+
+        futures: dict[int, Future] = {}
+        for i in due:
+            probe = self.probes[i]
+            pending = self._pending.get(i)
+            if pending is not None:
+                if not pending.done():
+                    logger.warning(
+                        f"Skipping probe {probe.__class__.__name__}, its previous poll "
+                        "has not returned yet"
+                    )
+                    continue
+                del self._pending[i]
+            futures[i] = self._executor.submit(self._timed_poll, probe)
+
+        wait(futures.values(), timeout=self.poll_timeout)
+
+        # results are handed out in probe order whatever order they completed in
+        for i, future in futures.items():
+            probe = self.probes[i]
+            if not future.done():
+                logger.warning(
+                    f"Probe {probe.__class__.__name__} timed out after "
+                    f"{self.poll_timeout}s"
+                )
+                self.stats.poll_timeouts[probe.__class__.__name__] += 1
+                self._pending[i] = future
+                continue
+            try:
+                data = future.result()
+            except Exception as exc:
+                self.stats.poll_errors[probe.__class__.__name__] += 1
+                logger.exception(exc)
+            else:
+                yield probe, data
+
+    def _write(self, probe: Probe, data: Union[dict, list[dict]]) -> None:
+        if not data:
+            return
+
+        logging.debug("Collected data:\n" + pprint.pformat(data))
+        records = data if isinstance(data, list) else [data]
+        for writer in self.writers:
+            name = writer_name(writer)
+            latency = _engine_latency(self.stats, writer)
+            try:
+                logger.debug(f"Writing to {name}")
+                for record in records:
+                    start = time.perf_counter()
+                    writer.output_metrics(
+                        probe.__class__.__name__, probe.version(), record
+                    )
+                    if latency:
+                        latency.observe(time.perf_counter() - start)
+            except Exception as exc:
+                self.stats.write_errors[name] += 1
+                logger.exception(exc)
+
+
+class AsyncEngine:
+    """
+    Runs every probe on one asyncio event loop, each on its own fixed-rate schedule
+    (see `Engine`). Probes and writers that implement `poll_async()` and
+    `output_metrics_async()` overlap their waits on the loop; the others run on its
+    thread pool.
+
+    `poll_timeout` stops waiting for polls that take longer. As with the concurrent
+    `Engine`, the probe is then skipped until its late poll returns: the thread of a
+    synchronous probe can't be interrupted, and polling again would pile up threads
+    stuck on the same device.
+    """
+
+    def __init__(
+        self,
+        probes: list[Probe] = [],
+        writers: list[MetricsWriter] = [],
+        frequency: float = 1.0,
+        poll_timeout: Optional[float] = None,
+        overrun: str = "skip",
+        stats: Optional[EngineStats] = None,
+    ) -> None:
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(
+                f"Unknown overrun policy {overrun!r}, expected one of {OVERRUN_POLICIES}"
+            )
+        self.frequency = frequency
+        self.probes = probes
+        self.writers = writers
+        self.poll_timeout = poll_timeout
+        self.overrun = overrun
+        self.schedules: list[ProbeSchedule] = []
+        self.stats = stats or EngineStats()
+
+    async def run(self):
+        logger.info("=" * 80)
+        logger.info("Starting probes. Press CTRL-C to terminate")
+        start = time.monotonic()
+        self.schedules = [
+            ProbeSchedule(period=probe_period(probe, self.frequency), next_tick=start)
+            for probe in self.probes
+        ]
+        _export_stats(self.stats, self.probes, self.writers)
+        try:
+            await asyncio.gather(
+                *(
+                    self._run_probe(probe, schedule)
+                    for probe, schedule in zip(self.probes, self.schedules)
+                )
+            )
+        finally:
+            _stop_probes(self.probes)
+            _close_writers(self.writers)
+
+    async def _run_probe(self, probe: Probe, schedule: ProbeSchedule) -> None:
+        name = probe.__class__.__name__
+        pending: Optional[asyncio.Task] = None
+        try:
+            while True:
+                await asyncio.sleep(max(0.0, schedule.next_tick - time.monotonic()))
+                if pending is not None and not pending.done():
+                    logger.warning(
+                        f"Skipping probe {name}, its previous poll has not returned yet"
+                    )
+                    _advance(
+                        probe, schedule, time.monotonic(), self.overrun, self.stats
+                    )
+                    continue
+
+                start = time.perf_counter()
+                pending = asyncio.ensure_future(probe.poll_async())
                 try:
-                    logger.info(f"Polling with probe {probe.__class__.__name__}")
-                    data = probe.poll()
-                    if not data:
-                        continue
-
-                    logging.debug("Collected data:\n" + pprint.pformat(data))
-                    for writer in self.writers:
-                        try:
-                            logger.info(f"Writing to {writer.__class__.__name__}")
-                            writer.output_metrics(
-                                probe.__class__.__name__, probe.version(), data
-                            )
-                        except Exception as exc:
-                            logger.exception(exc)
+                    logger.debug(f"Polling with probe {name}")
+                    data = await asyncio.wait_for(
+                        asyncio.shield(pending), self.poll_timeout
+                    )
+                except asyncio.TimeoutError:
+                    self.stats.poll_timeouts[name] += 1
+                    logger.warning(f"Probe {name} timed out after {self.poll_timeout}s")
+                    # its result comes too late to be written
+                    pending.add_done_callback(_discard_result)
                 except Exception as exc:
+                    pending = None
+                    self.stats.poll_errors[name] += 1
                     logger.exception(exc)
+                else:
+                    pending = None
+                    self.stats.poll_latency[name].observe(time.perf_counter() - start)
+                    await self._write(probe, data)
+                _advance(probe, schedule, time.monotonic(), self.overrun, self.stats)
+        finally:
+            if pending is not None:
+                pending.cancel()
 
-            # Force log buffers and stdout to flush before sleeping
-            for handler in logger.handlers + logger.root.handlers:
-                if hasattr(handler, "flush"):
-                    logger.root.handlers[0].flush()
-            sys.stdout.flush()
-            time.sleep(self.frequency)
+    async def _write(self, probe: Probe, data: Union[dict, list[dict]]) -> None:
+        if not data:
+            return
+
+        logging.debug("Collected data:\n" + pprint.pformat(data))
+        records = data if isinstance(data, list) else [data]
+        await asyncio.gather(
+            *(self._write_records(writer, probe, records) for writer in self.writers)
+        )
+
+    async def _write_records(
+        self, writer: MetricsWriter, probe: Probe, records: list[dict]
+    ) -> None:
+        name = writer_name(writer)
+        latency = _engine_latency(self.stats, writer)
+        try:
+            logger.debug(f"Writing to {name}")
+            for record in records:
+                start = time.perf_counter()
+                await writer.output_metrics_async(
+                    probe.__class__.__name__, probe.version(), record
+                )
+                if latency:
+                    latency.observe(time.perf_counter() - start)
+        except Exception as exc:
+            self.stats.write_errors[name] += 1
+            logger.exception(exc)
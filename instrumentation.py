@@ -0,0 +1,186 @@
+"""
+Engine self-instrumentation: poll and write latencies, cycle durations, overruns and
+errors, exported on the Prometheus endpoint of the Http writer
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+import logging
+import threading
+from typing import Iterator, Optional
+
+from prometheus_client.core import (
+    REGISTRY,
+    CounterMetricFamily,
+    GaugeMetricFamily,
+    HistogramMetricFamily,
+    Metric,
+)
+
+logger = logging.getLogger(__name__)
+
+# seconds, from a fast in-memory probe to a serial read retried after timeouts
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    float("inf"),
+)
+
+
+class Histogram:
+    """
+    Counts of observations per bucket, kept in a flat list. Observing is a binary
+    search and two additions.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def cumulative(self) -> tuple[list[tuple[str, int]], float]:
+        """
+        Cumulative bucket counts as Prometheus expects them, and the sum
+        """
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative, buckets = 0, []
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            buckets.append(
+                ("+Inf" if bound == float("inf") else str(bound), cumulative)
+            )
+        return buckets, total
+
+
+class EngineStats:
+    """
+    Latency histograms and counters updated by the engine as it runs
+    """
+
+    def __init__(self) -> None:
+        self.poll_latency: dict[str, Histogram] = defaultdict(Histogram)
+        self.write_latency: dict[str, Histogram] = defaultdict(Histogram)
+        self.cycle_duration = Histogram()
+        self.poll_errors: dict[str, int] = defaultdict(int)
+        self.poll_timeouts: dict[str, int] = defaultdict(int)
+        self.write_errors: dict[str, int] = defaultdict(int)
+        self.overruns: dict[str, int] = defaultdict(int)
+        self.missed_ticks: dict[str, int] = defaultdict(int)
+        # objects with a `metrics()` method, like queued writers and Rover probes,
+        # exported as gauges, and optionally a `counters()` method, exported as
+        # counters
+        self.sources: list = []
+
+    def collect(self) -> Iterator[Metric]:
+        yield _histogram(
+            "solarstats_poll_duration_seconds",
+            "Time spent polling each probe",
+            "probe",
+            self.poll_latency,
+        )
+        yield _histogram(
+            "solarstats_write_duration_seconds",
+            "Time spent writing a record with each writer",
+            "writer",
+            self.write_latency,
+        )
+        yield _histogram(
+            "solarstats_cycle_duration_seconds",
+            "Time spent polling the probes due and writing their data",
+            None,
+            {"": self.cycle_duration},
+        )
+        for name, documentation, label, counts in (
+            (
+                "poll_errors",
+                "Polls that raised an exception",
+                "probe",
+                self.poll_errors,
+            ),
+            ("poll_timeouts", "Polls that timed out", "probe", self.poll_timeouts),
+            (
+                "write_errors",
+                "Writes that raised an exception",
+                "writer",
+                self.write_errors,
+            ),
+            ("overruns", "Polls that overran their next tick", "probe", self.overruns),
+            ("missed_ticks", "Ticks skipped or coalesced", "probe", self.missed_ticks),
+        ):
+            counter = CounterMetricFamily(
+                f"solarstats_{name}", documentation, labels=[label]
+            )
+            for key, value in list(counts.items()):
+                counter.add_metric([key], value)
+            yield counter
+
+        for source in self.sources:
+            for key, value in source.metrics().items():
+                yield GaugeMetricFamily(f"solarstats_{key}", key, value=value)
+            counters = getattr(source, "counters", None)
+            for key, value in (counters() if counters else {}).items():
+                yield CounterMetricFamily(f"solarstats_{key}", key, value=value)
+
+
+def _histogram(
+    name: str, documentation: str, label: Optional[str], histograms: dict
+) -> HistogramMetricFamily:
+    family = HistogramMetricFamily(
+        name, documentation, labels=[label] if label else None
+    )
+    for key, histogram in list(histograms.items()):
+        buckets, total = histogram.cumulative()
+        family.add_metric([key] if label else [], buckets, total)
+    return family
+
+
+class _Collector:
+    stats: Optional[EngineStats] = None
+
+    def collect(self) -> Iterator[Metric]:
+        if self.stats is not None:
+            yield from self.stats.collect()
+
+
+_collector = _Collector()
+_registered = False
+_register_lock = threading.Lock()
+
+
+def export(stats: EngineStats) -> None:
+    """
+    Serve `stats` on the default Prometheus registry, the one the Http writer
+    exposes. The collector is registered once; later calls switch what it reports.
+    """
+    global _registered
+    with _register_lock:
+        _collector.stats = stats
+        if not _registered:
+            REGISTRY.register(_collector)
+            _registered = True
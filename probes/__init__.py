@@ -1,11 +1,34 @@
 from abc import ABC, abstractmethod
+import asyncio
+from typing import Optional, Union
 
 
 class Probe(ABC):
+    # constructor argument naming the bus that instances given the same value share
+    # within the process, like the serial port of daisy-chained Rovers
+    shared_bus: Optional[str] = None
+
     @abstractmethod
-    def poll(self) -> dict:
+    def poll(self) -> Union[dict, list[dict]]:
+        """
+        Metrics collected by the probe. Probes reporting on several devices return a
+        list with one dict per device.
+        """
         raise NotImplementedError()
 
     @abstractmethod
     def version(self) -> str:
         raise NotImplementedError()
+
+    def stop(self) -> None:
+        """
+        Called when the engine stops, to end the threads, processes and files the
+        probe started
+        """
+
+    async def poll_async(self) -> Union[dict, list[dict]]:
+        """
+        `poll()` for the asyncio engine. Probes that can wait on I/O without blocking
+        override it; the default runs `poll()` on the event loop's thread pool.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.poll)
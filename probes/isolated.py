@@ -0,0 +1,162 @@
+"""
+Probes running in their own worker process, so that a poll stuck in a driver or a
+system call can be killed without taking the engine down with it
+"""
+
+from functools import lru_cache
+import logging
+import multiprocessing
+from multiprocessing.connection import Connection
+import pickle
+import signal
+from typing import Any, Optional, Union
+
+from probes import Probe
+
+logger = logging.getLogger(__name__)
+
+# seconds a new worker has to create its probe
+STARTUP_TIMEOUT = 60.0
+
+_POLL = "poll"
+_STOP = "stop"
+
+
+class ProbeWorkerError(Exception):
+    pass
+
+
+class IsolatedProbe(Probe):
+    """
+    Creates `probe_class(**kwargs)` in a worker process and polls it over a pipe. A
+    poll that doesn't return within `deadline` seconds raises `TimeoutError` and
+    kills the worker; a new one is started on the next poll.
+
+    Use `isolated(probe_class)` to get a subclass with the same name as the probe,
+    under which writers report its metrics.
+    """
+
+    probe_class: type[Probe]
+
+    def __init__(self, deadline: float = 30.0, **kwargs) -> None:
+        self.deadline = deadline
+        self.kwargs = kwargs
+        self.restarts = 0
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        self._connection: Optional[Connection] = None
+        self._version: Optional[str] = None
+        self._start()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process else None
+
+    def version(self) -> str:
+        return self._version
+
+    def poll(self) -> Union[dict, list[dict]]:
+        if self._process is None or not self._process.is_alive():
+            self._kill()
+            self.restarts += 1
+            logger.warning(f"Restarting the worker process of {self.name}")
+            self._start()
+        self._connection.send(_POLL)
+        return self._receive(self.deadline)
+
+    def stop(self) -> None:
+        if self._process is None:
+            return
+        try:
+            self._connection.send(_STOP)
+            self._process.join(1.0)
+        except (BrokenPipeError, OSError):
+            pass
+        self._kill()
+
+    @property
+    def name(self) -> str:
+        return self.__class__.__name__
+
+    def _start(self) -> None:
+        context = multiprocessing.get_context("spawn")
+        self._connection, child = context.Pipe()
+        self._process = context.Process(
+            target=_serve,
+            args=(child, self.probe_class, self.kwargs),
+            name=f"probe-{self.name}",
+            daemon=True,
+        )
+        self._process.start()
+        child.close()
+        self._version = self._receive(STARTUP_TIMEOUT)
+
+    def _receive(self, timeout: float) -> Any:
+        try:
+            ready = self._connection.poll(timeout)
+        except (EOFError, OSError):
+            ready = True  # the worker is gone, recv() reports it
+        if not ready:
+            self._kill()
+            raise TimeoutError(f"{self.name} did not respond within {timeout}s")
+        try:
+            status, value = self._connection.recv()
+        except (EOFError, OSError):
+            self._kill()
+            raise ProbeWorkerError(f"The worker process of {self.name} exited")
+        if status == "error":
+            raise value
+        return value
+
+    def _kill(self) -> None:
+        process, self._process = self._process, None
+        if process is None:
+            return
+        if process.is_alive():
+            process.terminate()
+            process.join(1.0)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self._connection.close()
+
+
+@lru_cache(maxsize=None)
+def isolated(probe_class: type[Probe]) -> type[IsolatedProbe]:
+    """
+    An `IsolatedProbe` subclass for `probe_class`, named after it
+    """
+    return type(probe_class.__name__, (IsolatedProbe,), {"probe_class": probe_class})
+
+
+def _serve(connection: Connection, probe_class: type[Probe], kwargs: dict) -> None:
+    # Ctrl-C is for the engine; workers are daemons that end with it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        probe = probe_class(**kwargs)
+        connection.send(("ok", probe.version()))
+    except Exception as exc:
+        connection.send(("error", _picklable(exc)))
+        return
+
+    try:
+        while True:
+            try:
+                command = connection.recv()
+            except EOFError:
+                return
+            if command == _STOP:
+                return
+            try:
+                connection.send(("ok", probe.poll()))
+            except Exception as exc:
+                connection.send(("error", _picklable(exc)))
+    finally:
+        probe.stop()
+
+
+def _picklable(exc: Exception) -> Exception:
+    try:
+        pickle.loads(pickle.dumps(exc))
+        return exc
+    except Exception:
+        return ProbeWorkerError(f"{exc.__class__.__name__}: {exc}")
@@ -1,10 +1,23 @@
 from probes import Probe
 from probes.psutil import PSUtil
 
-from probes.renogy import RenogyRover, RenogyRoverSimulator
+from probes.renogy import (
+    RenogyRover,
+    RenogyRoverFleet,
+    RenogyRoverReplay,
+    RenogyRoverSimulator,
+    SyntheticRover,
+)
 from writers import MetricsWriter
 from writers.http import Http
 from writers.sql import Sql
 
-ALL_PROBES: list[type[Probe]] = [RenogyRover, RenogyRoverSimulator, PSUtil]
+ALL_PROBES: list[type[Probe]] = [
+    RenogyRover,
+    RenogyRoverFleet,
+    RenogyRoverReplay,
+    RenogyRoverSimulator,
+    SyntheticRover,
+    PSUtil,
+]
 ALL_WRITERS: list[type[MetricsWriter]] = [Sql, Http]
@@ -1,34 +1,343 @@
 import logging
+import re
+import time
+from typing import Any, Iterable, Optional
 from probes import Probe
-from probes.renogy.renogy_rover import (
-    RenogyRoverController,
+from probes.renogy.bus import ModbusBus
+from probes.renogy.capture import ReplayDevice
+from probes.renogy.fleet import RecordedHistory, ReplayedFleet, SyntheticFleet
+from probes.renogy.registers import (
+    LIVE_REGISTERS,
+    REGISTER_BLOCKS,
+    SETTINGS_BLOCK,
+    SYSTEM_BLOCK,
+    TELEMETRY_BLOCK,
+    Register,
+    RegisterBlock,
+    empty_value,
+    resolve,
 )
+from probes.renogy.renogy_rover import RenogyRoverController
 from probes.renogy.renogy_rover_sim import RenogyRoverControllerSimulator
+from probes.renogy.sampling import Sampler
+from probes.renogy.synthetic import (
+    SolarSite,
+    SyntheticRoverController,
+    SyntheticRoverModel,
+)
 
 VERSION = "0.1"
 
 logger = logging.getLogger(__name__)
 
+# Seconds that values read from each register block are reused before the block is
+# read again. Device identity never changes and settings only change when someone
+# reconfigures the controller, while telemetry is read on every poll.
+DEFAULT_REFRESH_INTERVALS = {
+    SYSTEM_BLOCK.name: 3600.0,
+    SETTINGS_BLOCK.name: 60.0,
+    TELEMETRY_BLOCK.name: 0.0,
+}
+
 
 class _RenogyRoverBase(Probe):
-    def __init__(self, controller: RenogyRoverController) -> None:
+    def __init__(
+        self, controller: RenogyRoverController, keys: Optional[list[str]] = None
+    ) -> None:
         self._controller = controller
+        self._registers = resolve(keys)
 
     def version(self) -> str:
         return VERSION
 
     def poll(self) -> dict:
-        logger.info(f"Polling controller {self._controller.__class__.__name__}")
-        return self._controller.all_data()
+        logger.debug(f"Polling controller {self._controller.__class__.__name__}")
+        return self._controller.read(self._registers)
+
+
+class _BlockCache:
+    """
+    Keeps the values decoded from each register block until its refresh interval
+    expires
+    """
+
+    def __init__(self, intervals: dict[str, float]) -> None:
+        self._intervals = intervals
+        self._values: dict[str, dict[str, Any]] = {}
+        self._expires_at: dict[str, float] = {}
+
+    def stale(self, blocks: Iterable[RegisterBlock], now: float) -> list[RegisterBlock]:
+        return [
+            block
+            for block in blocks
+            if block.name not in self._expires_at or now >= self._expires_at[block.name]
+        ]
+
+    def update(
+        self,
+        block: RegisterBlock,
+        registers: tuple[Register, ...],
+        data: dict[str, Any],
+        now: float,
+    ) -> None:
+        values = {r.key: data[r.key] for r in registers if r.key in data}
+        self._values[block.name] = values
+        if len(values) == len(registers):
+            self._expires_at[block.name] = now + self._intervals.get(block.name, 0.0)
+        else:
+            # partially read blocks are read again on the next poll
+            self._expires_at.pop(block.name, None)
+
+    def values(self) -> dict[str, Any]:
+        return {
+            key: value
+            for block_values in self._values.values()
+            for key, value in block_values.items()
+        }
 
 
 class RenogyRover(_RenogyRoverBase):
-    def __init__(self, device, address, baudrate=9600, timeout=0.5) -> None:
-        super().__init__(RenogyRoverController(device, address, baudrate, timeout))
+    shared_bus = "device"
+
+    def __init__(
+        self,
+        device,
+        address,
+        baudrate=9600,
+        timeout=0.5,
+        block_reads=True,
+        refresh_intervals: Optional[dict[str, float]] = None,
+        keys: Optional[list[str]] = None,
+        cadence: float = 0.0,
+        retries: int = 2,
+        capture: Optional[str] = None,
+        sample_interval: Optional[float] = None,
+    ) -> None:
+        self._bus = ModbusBus.for_port(device, baudrate)
+        self._bus.attach(address, cadence)
+        self._address = address
+        super().__init__(
+            RenogyRoverController(
+                device,
+                address,
+                baudrate,
+                timeout,
+                block_reads,
+                bus=self._bus,
+                retries=retries,
+                capture=capture,
+            ),
+            keys=keys,
+        )
+
+        intervals = {**DEFAULT_REFRESH_INTERVALS, **(refresh_intervals or {})}
+        unknown_blocks = set(intervals) - {block.name for block in REGISTER_BLOCKS}
+        if unknown_blocks:
+            logger.warning(
+                f"Ignoring unknown register blocks: {sorted(unknown_blocks)}"
+            )
+        self._cache = _BlockCache(intervals)
+
+        # only blocks holding at least one requested register are ever read
+        self._block_registers = {
+            block: registers
+            for block in REGISTER_BLOCKS
+            if (registers := tuple(r for r in self._registers if block.contains(r)))
+        }
+
+        # sample the live readings several times per poll and report their aggregates
+        live_registers = tuple(r for r in LIVE_REGISTERS if r in self._registers)
+        self._sampler = None
+        if sample_interval and live_registers:
+            self._sampler = Sampler(
+                lambda: self._controller.read(live_registers), sample_interval
+            ).start()
+
+    def stop(self) -> None:
+        if self._sampler:
+            self._sampler.stop()
+        self._controller.close()
+
+    def poll(self) -> dict:
+        now = time.monotonic()
+        if not self._bus.poll_due(self._address, now):
+            return {}
+
+        stale_blocks = self._cache.stale(self._block_registers, now)
+        logger.debug(
+            f"Polling controller {self._controller.__class__.__name__} "
+            f"(blocks={[block.name for block in stale_blocks]})"
+        )
+        if stale_blocks:
+            data = self._controller.read(
+                tuple(r for block in stale_blocks for r in self._block_registers[block])
+            )
+            for block in stale_blocks:
+                self._cache.update(block, self._block_registers[block], data, now)
+        return {
+            **self._cache.values(),
+            **(self._sampler.collect() if self._sampler else {}),
+        }
+
+    def metrics(self) -> dict[str, float]:
+        """
+        Gauges of the Modbus transport and of the bus, exported by the engine rather
+        than written with the samples
+        """
+        return {
+            **self._prefixed(self._controller.transport.metrics()),
+            f"{self._prefix}_bus_utilization": self._bus.utilization(),
+        }
+
+    def counters(self) -> dict[str, int]:
+        return self._prefixed(self._controller.transport.counters())
+
+    @property
+    def _prefix(self) -> str:
+        port = re.sub(r"\W+", "_", self._bus.port).strip("_").lower()
+        return f"rover_{port}_{self._address}"
+
+    def _prefixed(self, values: dict[str, Any]) -> dict[str, Any]:
+        return {f"{self._prefix}_{key}": value for key, value in values.items()}
 
 
 class RenogyRoverSimulator(_RenogyRoverBase):
-    def __init__(self, connection: str, poll_delay=None) -> None:
+    def __init__(
+        self,
+        connection: str,
+        poll_delay=None,
+        keys: Optional[list[str]] = None,
+        speed: Optional[float] = None,
+        layout: str = "json",
+        probe: Optional[str] = None,
+    ) -> None:
         super().__init__(
-            RenogyRoverControllerSimulator(connection, poll_delay=poll_delay)
+            RenogyRoverControllerSimulator(
+                connection,
+                poll_delay=poll_delay,
+                speed=speed,
+                layout=layout,
+                probe=probe,
+            ),
+            keys=keys,
         )
+        self.speed = speed
+
+    def poll(self) -> dict[str, Any]:
+        data = super().poll()
+        if self.speed is not None:
+            data["replay_samples_per_second"] = self._controller.throughput()
+        return data
+
+
+class RenogyRoverReplay(_RenogyRoverBase):
+    """
+    Replays a capture file recorded with the RenogyRover `capture` option through the
+    real register decoder, one captured poll per poll. `speed` scales the recorded
+    time between polls; set it to 0 or null to replay as fast as possible.
+    """
+
+    def __init__(
+        self,
+        capture: str,
+        speed: Optional[float] = 1.0,
+        loop: bool = True,
+        keys: Optional[list[str]] = None,
+    ) -> None:
+        self._device = ReplayDevice(capture, speed=speed, loop=loop)
+        super().__init__(
+            RenogyRoverController(None, None, device=self._device, retries=0),
+            keys=keys,
+        )
+
+    def poll(self) -> dict:
+        if not self._device.advance():
+            logger.info("Reached the end of the capture")
+            return {}
+        return super().poll()
+
+
+class SyntheticRover(_RenogyRoverBase):
+    """
+    Generates plausible controller data from a parametric model of a solar
+    installation (see `SolarSite` for its options) instead of reading a device.
+
+    Every poll advances the simulated installation by `interval` seconds, starting at
+    `start` (a unix timestamp, now by default). Without an `interval` it runs in real
+    time.
+    """
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        start: Optional[float] = None,
+        seed: Optional[int] = None,
+        keys: Optional[list[str]] = None,
+        **site,
+    ) -> None:
+        self.model = SyntheticRoverModel(
+            SolarSite(**site), start=start, interval=interval or 0.0, seed=seed
+        )
+        super().__init__(
+            SyntheticRoverController(self.model, realtime=interval is None),
+            keys=keys,
+        )
+
+
+class RenogyRoverFleet(Probe):
+    """
+    Simulates `devices` controllers at once and reports one record per device, tagged
+    with a `device_id` (`<name>-1`, `<name>-2`, ...).
+
+    With a `connection`, every device replays the metrics recorded in that database
+    (its first `max_records` rows), each one `offset` seconds further into the
+    recording; `layout` and `probe` select the recorded metrics as for the
+    `RenogyRoverSimulator`. Otherwise every device is a `SyntheticRover` of the same
+    site, each one starting `offset` seconds later.
+    """
+
+    def __init__(
+        self,
+        devices: int = 10,
+        connection: Optional[str] = None,
+        offset: float = 0.0,
+        interval: Optional[float] = None,
+        start: Optional[float] = None,
+        seed: Optional[int] = None,
+        max_records: Optional[int] = 100_000,
+        keys: Optional[list[str]] = None,
+        name: str = "rover",
+        layout: str = "json",
+        probe: Optional[str] = None,
+        **site,
+    ) -> None:
+        if connection:
+            if site:
+                logger.warning(f"Ignoring site options when replaying: {sorted(site)}")
+            self.fleet = ReplayedFleet(
+                devices, RecordedHistory(connection, max_records, layout, probe), offset
+            )
+        else:
+            self.fleet = SyntheticFleet(
+                devices, SolarSite(**site), interval, start, offset, seed
+            )
+        self._registers = resolve(keys)
+        self._device_ids = [f"{name}-{i + 1}" for i in range(devices)]
+
+    def version(self) -> str:
+        return VERSION
+
+    def poll(self) -> list[dict[str, Any]]:
+        logger.debug(f"Polling {len(self._device_ids)} simulated controllers")
+        return [
+            {
+                "device_id": device_id,
+                **{
+                    register.key: value
+                    if (value := sample.get(register.key)) is not None
+                    else empty_value(register)
+                    for register in self._registers
+                },
+            }
+            for device_id, sample in zip(self._device_ids, self.fleet.sample())
+        ]
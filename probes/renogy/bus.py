@@ -0,0 +1,131 @@
+"""
+Shared RS485 bus for several Modbus devices daisy-chained on one serial port
+"""
+
+from collections import deque
+from contextlib import contextmanager
+import logging
+import threading
+import time
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bits per character on the wire: start bit, 8 data bits, parity/stop bits
+_BITS_PER_CHARACTER = 11
+
+
+class ModbusBus:
+    """
+    Owns a serial port shared by every device on it and serializes their
+    transactions. When several devices are waiting for the bus it is granted to them
+    in round-robin order of slave address, and consecutive frames are separated by
+    the 3.5 character silent interval Modbus RTU requires.
+
+    Each device can also be given a cadence (seconds) so that slow-changing devices
+    are polled less often than the others sharing the bus.
+    """
+
+    _buses: dict[str, "ModbusBus"] = {}
+    _buses_lock = threading.Lock()
+
+    def __init__(self, port: str, baudrate: int = 9600, window: float = 60.0) -> None:
+        self.port = port
+        self.baudrate = baudrate
+        self.transactions = 0
+        self.busy_seconds = 0.0
+
+        self._silent_interval = 3.5 * _BITS_PER_CHARACTER / baudrate
+        self._condition = threading.Condition()
+        self._owner: Optional[int] = None
+        self._waiting: list[int] = []
+        self._last_granted: Optional[int] = None
+        self._last_end = 0.0
+
+        self._cadences: dict[int, float] = {}
+        self._next_poll: dict[int, float] = {}
+
+        self._window = window
+        self._created_at = time.monotonic()
+        self._history: deque[tuple[float, float]] = deque()
+
+    @classmethod
+    def for_port(cls, port: str, baudrate: int = 9600) -> "ModbusBus":
+        """
+        The bus for `port`, created the first time a device on that port asks for it
+        """
+        with cls._buses_lock:
+            bus = cls._buses.get(port)
+            if bus is None:
+                bus = cls._buses[port] = cls(port, baudrate)
+            elif bus.baudrate != baudrate:
+                logger.warning(
+                    f"Ignoring baudrate {baudrate} for {port}, the bus is already "
+                    f"running at {bus.baudrate}"
+                )
+            return bus
+
+    def attach(self, address: int, cadence: float = 0.0) -> None:
+        self._cadences[address] = cadence
+
+    def poll_due(self, address: int, now: Optional[float] = None) -> bool:
+        """
+        Whether the device's cadence has elapsed since it was last polled. Returning
+        True starts the device's next cadence period.
+        """
+        now = time.monotonic() if now is None else now
+        if now < self._next_poll.get(address, now):
+            return False
+        self._next_poll[address] = now + self._cadences.get(address, 0.0)
+        return True
+
+    @contextmanager
+    def transaction(self, address: int) -> Iterator[None]:
+        """
+        Hold the bus for one request/response exchange with the device at `address`
+        """
+        with self._condition:
+            self._waiting.append(address)
+            while self._owner is not None or self._next_in_turn() != address:
+                self._condition.wait()
+            self._waiting.remove(address)
+            self._owner = address
+            self._last_granted = address
+
+        silence = self._last_end + self._silent_interval - time.monotonic()
+        if silence > 0:
+            time.sleep(silence)
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            with self._condition:
+                self.transactions += 1
+                self.busy_seconds += end - start
+                self._history.append((end, end - start))
+                self._owner = None
+                self._last_end = end
+                self._condition.notify_all()
+
+    def utilization(self, now: Optional[float] = None) -> float:
+        """
+        Fraction of the recent window (or of the bus lifetime when shorter) spent in
+        transactions
+        """
+        now = time.monotonic() if now is None else now
+        with self._condition:
+            while self._history and self._history[0][0] < now - self._window:
+                self._history.popleft()
+            busy = sum(duration for _, duration in self._history)
+        elapsed = min(self._window, now - self._created_at)
+        return min(1.0, busy / elapsed) if elapsed > 0 else 0.0
+
+    def _next_in_turn(self) -> int:
+        waiting = sorted(set(self._waiting))
+        if self._last_granted is not None:
+            for address in waiting:
+                if address > self._last_granted:
+                    return address
+        return waiting[0]
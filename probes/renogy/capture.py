@@ -0,0 +1,180 @@
+"""
+Capture of raw Modbus register blocks to a compact binary file and bit-exact replay
+
+A capture file starts with a small header followed by fixed-size records, one per
+contiguous run of registers read during a poll. Records of the same poll share the
+same timestamp. Because every record has the same size the file can be memory-mapped
+and indexed directly.
+"""
+
+from dataclasses import dataclass
+import mmap
+import os
+import struct
+import time
+from types import SimpleNamespace
+from typing import Iterator, Optional, Sequence
+
+import minimalmodbus
+
+MAGIC = b"RNGYCAP1"
+MAX_WORDS = 64
+
+_HEADER = struct.Struct("<8sHH4x")
+_RECORD = struct.Struct(f"<dHH{MAX_WORDS}H")
+
+
+@dataclass(frozen=True)
+class CaptureRecord:
+    timestamp: float
+    address: int
+    words: tuple[int, ...]
+
+
+class CaptureWriter:
+    """
+    Appends register runs to a capture file
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(_HEADER.pack(MAGIC, _RECORD.size, MAX_WORDS))
+
+    def write(self, timestamp: float, address: int, words: Sequence[int]) -> None:
+        for offset in range(0, len(words), MAX_WORDS):
+            chunk = list(words[offset : offset + MAX_WORDS])
+            padding = [0] * (MAX_WORDS - len(chunk))
+            self._file.write(
+                _RECORD.pack(timestamp, address + offset, len(chunk), *chunk, *padding)
+            )
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class CaptureReader:
+    """
+    Random access to the records of a capture file through a read-only memory map
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as fd:
+            size = os.fstat(fd.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"{path} is not a capture file")
+            self._buffer = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, record_size, max_words = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or record_size != _RECORD.size or max_words != MAX_WORDS:
+            raise ValueError(f"{path} is not a capture file")
+        self._count = (size - _HEADER.size) // _RECORD.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> CaptureRecord:
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        timestamp, address, count, *words = _RECORD.unpack_from(
+            self._buffer, _HEADER.size + index * _RECORD.size
+        )
+        return CaptureRecord(timestamp, address, tuple(words[:count]))
+
+    def __iter__(self) -> Iterator[CaptureRecord]:
+        return (self[i] for i in range(self._count))
+
+    def cycles(self) -> Iterator[list[CaptureRecord]]:
+        """
+        Records grouped by the poll they were captured in
+        """
+        cycle: list[CaptureRecord] = []
+        for record in self:
+            if cycle and record.timestamp != cycle[0].timestamp:
+                yield cycle
+                cycle = []
+            cycle.append(record)
+        if cycle:
+            yield cycle
+
+    def close(self) -> None:
+        self._buffer.close()
+
+
+class ReplayDevice:
+    """
+    Stands in for a `minimalmodbus.Instrument` and serves the registers of a capture
+    file, one captured poll at a time. Registers keep the value they had in the most
+    recent poll that read them, so blocks captured less often than others (see the
+    RenogyRover refresh intervals) are still available.
+
+    `speed` scales the time between recorded polls (1.0 replays in real time, 60.0 a
+    minute per second); `None` replays as fast as possible.
+    """
+
+    def __init__(
+        self, path: str, speed: Optional[float] = 1.0, loop: bool = True
+    ) -> None:
+        self.serial = SimpleNamespace(baudrate=None, timeout=None)
+        self.speed = speed
+        self.loop = loop
+        self._reader = CaptureReader(path)
+        self._registers: dict[int, int] = {}
+        self._cycles: Optional[Iterator[list[CaptureRecord]]] = None
+        self._replay_start = 0.0
+        self._first_timestamp: Optional[float] = None
+
+    def advance(self) -> bool:
+        """
+        Move to the next captured poll, waiting for it when replaying at a given speed.
+        Returns False once the capture is exhausted and `loop` is off.
+        """
+        cycle = next(self._cycles, None) if self._cycles else None
+        if cycle is None:
+            if self._cycles is not None and not self.loop:
+                return False
+            self._cycles = self._reader.cycles()
+            self._first_timestamp = None
+            cycle = next(self._cycles, None)
+            if cycle is None:
+                return False
+
+        timestamp = cycle[0].timestamp
+        if self._first_timestamp is None:
+            self._first_timestamp = timestamp
+            self._replay_start = time.monotonic()
+        elif self.speed:
+            due = self._replay_start + (timestamp - self._first_timestamp) / self.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        for record in cycle:
+            self._registers.update(
+                zip(
+                    range(record.address, record.address + len(record.words)),
+                    record.words,
+                )
+            )
+        return True
+
+    def read_register(self, address: int, *args, **kwargs) -> int:
+        return self.read_registers(address, 1)[0]
+
+    def read_registers(
+        self, address: int, number_of_registers: int, **kwargs
+    ) -> list[int]:
+        try:
+            return [self._registers[address + i] for i in range(number_of_registers)]
+        except KeyError:
+            raise minimalmodbus.IllegalRequestError(
+                f"register {address:#06x} was not captured"
+            )
+
+    def write_register(self, *args, **kwargs) -> None:
+        pass
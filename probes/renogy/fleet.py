@@ -0,0 +1,162 @@
+"""
+Many simulated controllers polled as one probe, for capacity planning
+"""
+
+from array import array
+from bisect import bisect_left
+import logging
+import random
+import time
+from typing import Any, Optional, Union
+
+from sqlalchemy import create_engine
+
+from probes.renogy.renogy_rover_sim import NoSimulatedMetricsFoundError
+from probes.renogy.synthetic import SolarSite, SyntheticRoverModel
+from writers.sql import read_samples
+
+logger = logging.getLogger(__name__)
+
+
+class RecordedHistory:
+    """
+    Metrics recorded with the SQL writer, loaded once and shared read-only by every
+    device replaying them.
+
+    The history is kept by key rather than by record. A key whose value never changes,
+    like the device identity or most settings, is stored once. The others are stored
+    as one column each, an array of 8 byte numbers when all their values are floats or
+    integers, so that a hundred thousand Rover records take a few tens of MB.
+    """
+
+    def __init__(
+        self,
+        connection: str,
+        max_records: Optional[int] = None,
+        layout: str = "json",
+        probe: Optional[str] = None,
+    ) -> None:
+        timestamps = array("d")
+        # keys with the same value in every record so far, and the others
+        constants: dict[str, Any] = {}
+        columns: dict[str, list] = {}
+        engine = create_engine(connection)
+        for created_at, data in read_samples(engine, layout, probe, max_records):
+            count = len(timestamps)
+            timestamps.append(created_at.timestamp())
+            for key in {**constants, **columns, **data}:
+                value = data.get(key)
+                if key in columns:
+                    columns[key].append(value)
+                elif count == 0:
+                    constants[key] = value
+                elif key not in constants:
+                    columns[key] = [None] * count + [value]
+                elif not _same(value, constants[key]):
+                    columns[key] = [constants.pop(key)] * count + [value]
+        engine.dispose()
+        if not timestamps:
+            raise NoSimulatedMetricsFoundError("No metrics found in database")
+
+        self.constants = constants
+        self.columns = {key: _compact(values) for key, values in columns.items()}
+        self._count = len(timestamps)
+        # seconds since the first record
+        self.offsets = array("d", (t - timestamps[0] for t in timestamps))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def record(self, index: int) -> dict[str, Any]:
+        record = dict(self.constants)
+        for key, values in self.columns.items():
+            record[key] = values[index]
+        return record
+
+    def position(self, offset: float) -> int:
+        """
+        Index of the first record at least `offset` seconds into the history, which
+        wraps around
+        """
+        span = self.offsets[-1]
+        offset = offset % span if span else 0.0
+        return min(bisect_left(self.offsets, offset), self._count - 1)
+
+
+def _same(value: Any, other: Any) -> bool:
+    # 1, 1.0 and True are equal but not interchangeable
+    return type(value) is type(other) and value == other
+
+
+def _compact(values: list) -> Union[array, tuple]:
+    if all(type(value) is float for value in values):
+        return array("d", values)
+    if all(type(value) is int for value in values):
+        try:
+            return array("q", values)
+        except OverflowError:
+            pass
+    return tuple(values)
+
+
+class SyntheticFleet:
+    """
+    `devices` synthetic installations sharing one site and one random generator.
+    Device `i` starts `i * offset` seconds later than the first one.
+    """
+
+    def __init__(
+        self,
+        devices: int,
+        site: SolarSite,
+        interval: Optional[float] = None,
+        start: Optional[float] = None,
+        offset: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.realtime = interval is None
+        self.offset = offset
+        start = time.time() if start is None else start
+        rng = random.Random(seed)
+        self.models = [
+            SyntheticRoverModel(
+                site, start=start + i * offset, interval=interval or 0.0, rng=rng
+            )
+            for i in range(devices)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def sample(self) -> list[dict[str, Any]]:
+        if self.realtime:
+            now = time.time()
+            return [
+                model.sample(now + i * self.offset)
+                for i, model in enumerate(self.models)
+            ]
+        return [model.sample() for model in self.models]
+
+
+class ReplayedFleet:
+    """
+    `devices` controllers replaying the same recorded history, device `i` running
+    `i * offset` seconds ahead of the first one. The only per-device state is its
+    position in the history.
+    """
+
+    def __init__(self, devices: int, history: RecordedHistory, offset: float = 0.0):
+        self.history = history
+        self.positions = array(
+            "l", (history.position(i * offset) for i in range(devices))
+        )
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def sample(self) -> list[dict[str, Any]]:
+        history = self.history
+        samples = [history.record(position) for position in self.positions]
+        for i, position in enumerate(self.positions):
+            self.positions[i] = (position + 1) % len(history)
+        return samples
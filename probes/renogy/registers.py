@@ -0,0 +1,605 @@
+"""
+Declarative register map for the Renogy Rover
+
+Every value exposed by the controller is described by a `Register` entry below. The
+accessor methods on `RenogyRoverController` and `RenogyRoverControllerSimulator` are
+generated from this map and `decode()` turns raw register words into the full output
+dict in a single pass.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+import logging
+from typing import Any, Callable, Iterable, NamedTuple, Optional, Sequence, Union
+
+from probes.renogy.types import (
+    BatteryType,
+    ChargingMethod,
+    ChargingModeController,
+    ChargingState,
+    Fault,
+    LoadWorkingModes,
+    Toggle,
+    ProductType,
+)
+
+logger = logging.getLogger(__name__)
+
+HIGH = "high"
+LOW = "low"
+
+
+def _string(words: Sequence[int]) -> str:
+    # two latin-1 characters per register, high byte first (as minimalmodbus does)
+    return "".join(chr(word >> 8) + chr(word & 0x00FF) for word in words).strip()
+
+
+def _version(words: Sequence[int]) -> str:
+    major = words[0] & 0x00FF
+    minor = words[1] >> 8
+    patch = words[1] & 0x00FF
+    return f"{major}.{minor}.{patch}"
+
+
+def _faults(words: Sequence[int]) -> list[Fault]:
+    double = words[0] << 16 | words[1]
+    return [fault for fault in Fault if double & fault.value == fault.value]
+
+
+@dataclass(frozen=True)
+class Register:
+    """
+    Describes how a single value is decoded from the controller's registers.
+
+    The raw value is built from `width` consecutive words (high word first), then
+    optionally narrowed to the `half` byte of the word, shifted right by `shift` and
+    masked with `mask`. `signed` values are sign-magnitude bytes (bit 7 is the sign).
+    The result is divided by `scale` or converted to `enum`; unknown enum values are
+    logged and decoded as None, or as the raw value when `keep_unknown` is set.
+    `decoder` replaces all of the above for values that aren't plain numbers.
+    """
+
+    key: str
+    address: int
+    description: str
+    width: int = 1
+    half: Optional[str] = None
+    shift: int = 0
+    mask: Optional[int] = None
+    scale: Optional[float] = None
+    signed: bool = False
+    enum: Optional[type] = None
+    keep_unknown: bool = False
+    decoder: Optional[Callable[[Sequence[int]], Any]] = None
+
+    @property
+    def end(self) -> int:
+        return self.address + self.width
+
+    def decode(self, words: Sequence[int]) -> Any:
+        if self.decoder:
+            return self.decoder(words)
+
+        value = 0
+        for word in words:
+            value = value << 16 | word
+        if self.half == HIGH:
+            value >>= 8
+        elif self.half == LOW:
+            value &= 0x00FF
+        value >>= self.shift
+        if self.mask is not None:
+            value &= self.mask
+        if self.signed:
+            magnitude = value & (0xFF >> 1)
+            value = -magnitude if value >> 7 == 1 else magnitude
+
+        if self.enum:
+            try:
+                return self.enum(value)
+            except ValueError:
+                logger.warning(f"unknown {self.key} ({value})")
+                return value if self.keep_unknown else None
+        if self.scale:
+            return value / self.scale
+        return value
+
+
+def _register(key: str, address: int, description: str, **kwargs) -> Register:
+    return Register(key=key, address=address, description=description, **kwargs)
+
+
+REGISTER_MAP: tuple[Register, ...] = (
+    # System information
+    _register(
+        "max_system_voltage",
+        0x000A,
+        "Maximum voltage supported by the system (volts)",
+        half=HIGH,
+    ),
+    _register(
+        "rated_charging_current", 0x000A, "Rated charging current (amps)", half=LOW
+    ),
+    _register(
+        "rated_discharging_current",
+        0x000B,
+        "Rated discharging current (amps)",
+        half=HIGH,
+    ),
+    _register(
+        "product_type",
+        0x000B,
+        "Product type",
+        half=LOW,
+        enum=ProductType,
+        keep_unknown=True,
+    ),
+    _register("product_model", 0x000C, "Product model", width=8, decoder=_string),
+    _register(
+        "software_version", 0x0014, "Software version", width=2, decoder=_version
+    ),
+    _register(
+        "hardware_version", 0x0016, "Hardware version", width=2, decoder=_version
+    ),
+    _register("serial_number", 0x0018, "Serial number", width=2),
+    _register("device_address", 0x001A, "Device address"),
+    # Charging information
+    _register(
+        "battery_percentage", 0x0100, "Current battery capacity value (percentage)"
+    ),
+    _register("battery_voltage", 0x0101, "Current battery voltage (volts)", scale=10.0),
+    _register(
+        "charging_current", 0x0102, "Charging current to battery (amps)", scale=100.0
+    ),
+    _register(
+        "controller_temperature",
+        0x0103,
+        "Controller temperature (degrees C)",
+        half=HIGH,
+        signed=True,
+    ),
+    _register(
+        "battery_temperature",
+        0x0103,
+        "Battery temperature (degrees C)",
+        half=LOW,
+        signed=True,
+    ),
+    # Load information
+    _register(
+        "load_voltage", 0x0104, "Street light (load) voltage (volts)", scale=10.0
+    ),
+    _register(
+        "load_current", 0x0105, "Street light (load) current (amps)", scale=100.0
+    ),
+    _register("load_power", 0x0106, "Street light (load) power (watts)"),
+    # Solar panel information
+    _register(
+        "solar_voltage", 0x0107, "Solar panel voltage to controller (volts)", scale=10.0
+    ),
+    _register(
+        "solar_current", 0x0108, "Solar panel current to controller (amps)", scale=100.0
+    ),
+    _register("charging_power", 0x0109, "Charging power (watts)"),
+    # Historical information
+    _register(
+        "battery_min_voltage_today",
+        0x010B,
+        "Minimum battery voltage for the current day (volts)",
+        scale=10.0,
+    ),
+    _register(
+        "battery_max_voltage_today",
+        0x010C,
+        "Maximum battery voltage for the current day (volts)",
+        scale=10.0,
+    ),
+    _register(
+        "max_charging_current_today",
+        0x010D,
+        "Maximum charging current for the current day (amps)",
+        scale=100.0,
+    ),
+    _register(
+        "max_discharging_current_today",
+        0x010E,
+        "Maximum discharging current for the current day (amps)",
+        scale=100.0,
+    ),
+    _register(
+        "max_charging_power_today",
+        0x010F,
+        "Maximum charging power for the current day (watts)",
+    ),
+    _register(
+        "max_discharging_power_today",
+        0x0110,
+        "Maximum discharging power for the current day (watts)",
+    ),
+    _register(
+        "charging_amphours_today", 0x0111, "Charging amp hours for the current day"
+    ),
+    _register(
+        "discharging_amphours_today",
+        0x0112,
+        "Discharging amp hours for the current day",
+    ),
+    _register(
+        "power_generation_today",
+        0x0113,
+        "Power generated today (kilowatt hours)",
+        scale=10000.0,
+    ),
+    _register(
+        "power_consumption_today",
+        0x0114,
+        "Power consumed today (kilowatt hours)",
+        scale=10000.0,
+    ),
+    _register("total_operating_days", 0x0115, "Total number of operating days"),
+    _register(
+        "total_battery_over_discharges",
+        0x0116,
+        "Total number of battery over-discharges",
+    ),
+    _register(
+        "total_battery_full_charges", 0x0117, "Total number of battery full-charges"
+    ),
+    _register(
+        "total_battery_charge_amphours",
+        0x0118,
+        "Total number of amp hours charged to the battery",
+        width=2,
+    ),
+    _register(
+        "total_battery_discharge_amphours",
+        0x011A,
+        "Total number of amp hours discharged from the battery",
+        width=2,
+    ),
+    _register(
+        "cumulative_power_generation",
+        0x011C,
+        "Total power generated (kilowatt hours)",
+        width=2,
+        scale=10000.0,
+    ),
+    _register(
+        "cumulative_power_consumption",
+        0x011E,
+        "Total power consumed (kilowatt hours)",
+        width=2,
+        scale=10000.0,
+    ),
+    _register(
+        "street_light_status",
+        0x0120,
+        "Street light (load) status on/off",
+        half=HIGH,
+        shift=7,
+        enum=Toggle,
+    ),
+    _register(
+        "street_light_brightness",
+        0x0120,
+        "Street light (load) brightness percentage",
+        half=HIGH,
+        mask=0x7F,
+    ),
+    _register("charging_state", 0x0120, "Charging state", half=LOW, enum=ChargingState),
+    # Controller fault information
+    _register(
+        "controller_fault_information",
+        0x0121,
+        "Controller fault information",
+        width=2,
+        decoder=_faults,
+    ),
+    # Battery parameter settings
+    _register(
+        "nominal_battery_capacity", 0xE002, "Nominal battery capacity (amp hours)"
+    ),
+    _register(
+        "system_voltage_setting", 0xE003, "System voltage setting (volts)", half=HIGH
+    ),
+    _register("recognized_voltage", 0xE003, "Recognized voltage (volts)", half=LOW),
+    _register("battery_type", 0xE004, "Battery type", enum=BatteryType),
+    _register(
+        "over_voltage_threshold", 0xE005, "Over voltage threshold (volts)", scale=10.0
+    ),
+    _register(
+        "charging_voltage_limit", 0xE006, "Charging voltage limit (volts)", scale=10.0
+    ),
+    _register(
+        "equalizing_charging_voltage",
+        0xE007,
+        "Equalizing charging voltage (volts)",
+        scale=10.0,
+    ),
+    _register(
+        "boost_charging_voltage", 0xE008, "Boost charging voltage (volts)", scale=10.0
+    ),
+    _register("floating_voltage", 0xE009, "Floating voltage (volts)", scale=10.0),
+    _register(
+        "boost_charging_recovery_voltage",
+        0xE00A,
+        "Boost charging recovery voltage (volts)",
+        scale=10.0,
+    ),
+    _register(
+        "over_discharge_recovery_voltage",
+        0xE00B,
+        "Over discharge recovery voltage (volts)",
+        scale=10.0,
+    ),
+    _register(
+        "under_voltage_warning_level",
+        0xE00C,
+        "Under voltage warning level (volts)",
+        scale=10.0,
+    ),
+    _register(
+        "over_discharge_voltage", 0xE00D, "Over discharge voltage (volts)", scale=10.0
+    ),
+    _register(
+        "discharging_limit_voltage",
+        0xE00E,
+        "Discharging limit voltage (volts)",
+        scale=10.0,
+    ),
+    _register(
+        "end_of_charge_soc", 0xE00F, "End of charge SOC (state of charge)", half=HIGH
+    ),
+    _register(
+        "end_of_discharge_soc",
+        0xE00F,
+        "End of discharge SOC (state of charge)",
+        half=LOW,
+    ),
+    _register(
+        "over_discharge_time_delay", 0xE010, "Over discharge time delay (seconds)"
+    ),
+    _register("equalizing_charging_time", 0xE011, "Equalizing charging time (minutes)"),
+    _register("boost_charging_time", 0xE012, "Boost charging time (minutes)"),
+    _register(
+        "equalizing_charging_interval", 0xE013, "Equalizing charging interval (days)"
+    ),
+    _register(
+        "temperature_compensation_factor",
+        0xE014,
+        "Temperature compensation factor (mV/degrees C/2V)",
+    ),
+    # Load operating duration and power settings
+    _register(
+        "first_stage_operating_duration",
+        0xE015,
+        "First stage operating duration (hours)",
+    ),
+    _register("first_stage_operating_power", 0xE016, "First stage operating power (%)"),
+    _register(
+        "second_stage_operating_duration",
+        0xE017,
+        "Second stage operating duration (hours)",
+    ),
+    _register(
+        "second_stage_operating_power", 0xE018, "Second stage operating power (%)"
+    ),
+    _register(
+        "third_stage_operating_duration",
+        0xE019,
+        "Third stage operating duration (hours)",
+    ),
+    _register("third_stage_operating_power", 0xE01A, "Third stage operating power (%)"),
+    _register(
+        "morning_on_operating_duration", 0xE01B, "Morning on operating duration (hours)"
+    ),
+    _register("morning_on_operating_power", 0xE01C, "Morning on operating power (%)"),
+    # Mode setting
+    _register("load_working_mode", 0xE01D, "Load working mode", enum=LoadWorkingModes),
+    _register("light_control_delay", 0xE01E, "Light control delay (minutes)"),
+    _register("light_control_voltate", 0xE01F, "Light control voltage (volts)"),
+    _register(
+        "led_load_current_setting",
+        0xE020,
+        "LED load current setting (amps)",
+        scale=100.0,
+    ),  # N * 10 mA
+    # Special power control
+    _register(
+        "charging_mode_controlled_by",
+        0xE020,
+        "Special power charging mode controlled by (voltage or state of charge)",
+        half=HIGH,
+        shift=2,
+        mask=0x01,
+        enum=ChargingModeController,
+    ),
+    _register(
+        "special_power_control_state",
+        0xE020,
+        "Special power control state (on/off)",
+        half=HIGH,
+        shift=1,
+        mask=0x01,
+        enum=Toggle,
+    ),
+    _register(
+        "each_night_on_function_state",
+        0xE020,
+        "Each night on function state (on/off)",
+        half=HIGH,
+        mask=0x01,
+        enum=Toggle,
+    ),
+    _register(
+        "no_charging_below_freezing",
+        0xE021,
+        "Allow charging below 0C (on/off)",
+        half=LOW,
+        shift=2,
+        mask=0x01,
+        enum=Toggle,
+    ),
+    _register(
+        "charging_method",
+        0xE021,
+        "Charging method",
+        half=LOW,
+        mask=0x01,
+        enum=ChargingMethod,
+    ),
+)
+
+REGISTERS_BY_KEY: dict[str, Register] = {
+    register.key: register for register in REGISTER_MAP
+}
+
+
+class RegisterBlock(NamedTuple):
+    name: str
+    address: int
+    count: int
+
+    @property
+    def end(self) -> int:
+        return self.address + self.count
+
+    @property
+    def registers(self) -> tuple[Register, ...]:
+        return tuple(register for register in REGISTER_MAP if self.contains(register))
+
+    @property
+    def keys(self) -> tuple[str, ...]:
+        return tuple(register.key for register in self.registers)
+
+    def contains(self, register: Register) -> bool:
+        return self.address <= register.address and register.end <= self.end
+
+
+# Contiguous register ranges covering every entry of the register map. Each block is
+# fetched with a single `read_registers` request when block reads are on.
+SYSTEM_BLOCK = RegisterBlock("system", 0x000A, 0x001A - 0x000A + 1)
+TELEMETRY_BLOCK = RegisterBlock("telemetry", 0x0100, 0x0122 - 0x0100 + 1)
+SETTINGS_BLOCK = RegisterBlock("settings", 0xE002, 0xE021 - 0xE002 + 1)
+REGISTER_BLOCKS = (SYSTEM_BLOCK, TELEMETRY_BLOCK, SETTINGS_BLOCK)
+
+# Instantaneous battery, load and solar readings (0x0100-0x0109), cheap enough to sample
+# several times per second
+LIVE_REGISTERS = tuple(r for r in REGISTER_MAP if 0x0100 <= r.address <= 0x0109)
+
+
+def block_name(address: int) -> str:
+    """
+    Name of the register block holding `address`, or the address itself outside of
+    every block
+    """
+    for block in REGISTER_BLOCKS:
+        if block.address <= address < block.end:
+            return block.name
+    return f"{address:#06x}"
+
+
+# Unrequested registers between two requested ones are still read as part of the same
+# request when the gap is at most this many words. At 9600 baud the framing and
+# turnaround of an extra request costs more than reading a few unused words.
+MAX_READ_GAP = 16
+
+
+def resolve(keys: Optional[Iterable[str]] = None) -> tuple[Register, ...]:
+    """
+    Registers for the given keys in register map order, or every register when no keys
+    are given
+    """
+    if keys is None:
+        return REGISTER_MAP
+
+    keys = set(keys)
+    unknown_keys = keys - REGISTERS_BY_KEY.keys()
+    if unknown_keys:
+        logger.warning(f"Ignoring unknown keys: {sorted(unknown_keys)}")
+    return tuple(register for register in REGISTER_MAP if register.key in keys)
+
+
+@lru_cache(maxsize=None)
+def plan_reads(registers: tuple[Register, ...]) -> tuple[RegisterBlock, ...]:
+    """
+    Smallest set of contiguous reads covering `registers`. Reads never cross the
+    boundaries of `REGISTER_BLOCKS` and are only split where the gap between requested
+    registers exceeds `MAX_READ_GAP` words.
+    """
+    reads: list[RegisterBlock] = []
+    for block in REGISTER_BLOCKS:
+        start = end = None
+        for register in sorted(
+            (r for r in registers if block.contains(r)), key=lambda r: r.address
+        ):
+            if start is None:
+                start, end = register.address, register.end
+            elif register.address - end > MAX_READ_GAP:
+                reads.append(RegisterBlock(block.name, start, end - start))
+                start, end = register.address, register.end
+            else:
+                end = max(end, register.end)
+        if start is not None:
+            reads.append(RegisterBlock(block.name, start, end - start))
+    return tuple(reads)
+
+
+def decode(
+    read_words: Callable[[int, int], Sequence[int]],
+    registers: Sequence[Register] = REGISTER_MAP,
+    skip_errors: tuple[type[Exception], ...] = (),
+) -> dict[str, Any]:
+    """
+    Decode `registers` in one pass. `read_words(address, count)` returns the raw
+    words of the register buffer (e.g. `RegisterSnapshot.read`). Registers whose
+    words can't be read because of one of `skip_errors` are left out of the result.
+    """
+    if not skip_errors:
+        return {
+            register.key: register.decode(read_words(register.address, register.width))
+            for register in registers
+        }
+
+    data = {}
+    for register in registers:
+        try:
+            words = read_words(register.address, register.width)
+        except skip_errors as exc:
+            logger.warning(f"Skipping {register.key}: {exc}")
+            continue
+        data[register.key] = register.decode(words)
+    return data
+
+
+def empty_value(register: Register) -> Union[int, str, list, None]:
+    """
+    Value reported when there is no data for a register
+    """
+    if register.decoder is _faults:
+        return []
+    if register.decoder is not None:
+        return ""
+    if register.enum and not register.keep_unknown:
+        return None
+    return 0
+
+
+def install_accessors(cls: type, read: Callable[[Any, Register], Any]) -> None:
+    """
+    Give `cls` a method per register of `REGISTER_MAP`, named after its key, that
+    returns `read(self, register)`
+    """
+    for register in REGISTER_MAP:
+        setattr(cls, register.key, _accessor(register, read))
+
+
+def _accessor(
+    register: Register, read: Callable[[Any, Register], Any]
+) -> Callable[[Any], Any]:
+    def accessor(self) -> Any:
+        return read(self, register)
+
+    accessor.__name__ = accessor.__qualname__ = register.key
+    accessor.__doc__ = register.description
+    return accessor
@@ -0,0 +1,103 @@
+"""
+High-frequency sampling of live Rover readings, aggregated between engine polls
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RunningAggregate:
+    """
+    Min, max, mean and last value of a stream of samples in constant memory
+    """
+
+    __slots__ = ("count", "total", "min", "max", "last")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.last: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.last = value
+
+    def summary(self, key: str) -> dict[str, float]:
+        if not self.count:
+            return {}
+        return {
+            f"{key}_min": self.min,
+            f"{key}_max": self.max,
+            f"{key}_mean": self.total / self.count,
+            f"{key}_last": self.last,
+        }
+
+
+class Sampler:
+    """
+    Calls `read()` every `interval` seconds on a background thread and aggregates the
+    numeric values it returns until `collect()` is called
+    """
+
+    def __init__(self, read: Callable[[], dict[str, Any]], interval: float) -> None:
+        self.interval = interval
+        self._read = read
+        self._lock = threading.Lock()
+        self._aggregates: dict[str, RunningAggregate] = {}
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "Sampler":
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+    def sample(self) -> None:
+        data = self._read()
+        with self._lock:
+            for key, value in data.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self._aggregates.setdefault(key, RunningAggregate()).add(value)
+
+    def collect(self) -> dict[str, float]:
+        """
+        Aggregates of every sample taken since the previous call
+        """
+        with self._lock:
+            aggregates, self._aggregates = self._aggregates, {}
+        return {
+            name: value
+            for key, aggregate in aggregates.items()
+            for name, value in aggregate.summary(key).items()
+        }
+
+    def _run(self) -> None:
+        next_sample = time.monotonic()
+        while not self._stopped.is_set():
+            try:
+                self.sample()
+            except Exception as exc:
+                logger.warning(f"Failed to sample: {exc}")
+
+            # fixed rate; samples that are already late are skipped, not bunched up
+            next_sample += self.interval
+            now = time.monotonic()
+            if next_sample < now:
+                next_sample = now + self.interval - (now - next_sample) % self.interval
+            self._stopped.wait(next_sample - now)
@@ -0,0 +1,404 @@
+"""
+Parametric model of a small off-grid solar installation that generates the same data
+as a Renogy Rover without any hardware or recorded metrics
+"""
+
+from dataclasses import dataclass
+from functools import cached_property
+import logging
+import math
+import random
+import time
+from types import MappingProxyType
+from typing import Any, Iterator, Mapping, Optional
+
+from probes.renogy.registers import Register, install_accessors
+from probes.renogy.renogy_rover import RenogyRoverController
+from probes.renogy.types import (
+    BatteryType,
+    ChargingMethod,
+    ChargingModeController,
+    ChargingState,
+    Fault,
+    LoadWorkingModes,
+    ProductType,
+    Toggle,
+)
+
+logger = logging.getLogger(__name__)
+
+_DAY = 86400.0
+_YEAR = 365.25
+
+
+@dataclass(frozen=True)
+class SolarSite:
+    """
+    Parameters of the simulated installation. Times of day are in UTC.
+    """
+
+    panel_watts: float = 400.0
+    battery_capacity: int = 100  # amp hours
+    system_voltage: int = 12
+    base_load: float = 15.0  # watts, around the clock
+    evening_load: float = 60.0  # watts, from sunset for `evening_load_hours`
+    evening_load_hours: int = 5
+    day_length: float = 12.0  # hours of daylight at the equinoxes
+    day_length_swing: float = 3.0  # hours gained in summer and lost in winter
+    peak_irradiance: float = 0.85  # fraction of the panel rating at solar noon
+    cloudiness: float = 0.3  # average cloud cover, 0 (clear) to 1 (overcast)
+    ambient_temperature: float = 15.0  # yearly mean, degrees C
+    temperature_swing: float = 10.0  # degrees C
+
+    @cached_property
+    def static(self) -> Mapping[str, Any]:
+        """
+        Read-only `static_values()`, shared by every model of this site
+        """
+        return MappingProxyType(self.static_values())
+
+    def static_values(self) -> dict[str, Any]:
+        """
+        Device identity and settings, which never change during a simulation
+        """
+        volts = self.system_voltage / 12
+        return {
+            "max_system_voltage": self.system_voltage,
+            "rated_charging_current": 40,
+            "rated_discharging_current": 20,
+            "product_type": ProductType.CHARGE_CONTROLLER,
+            "product_model": "RNG-CTRL-RVR40",
+            "software_version": "1.0.4",
+            "hardware_version": "1.0.3",
+            "serial_number": 0x110B0020,
+            "device_address": 1,
+            "nominal_battery_capacity": self.battery_capacity,
+            "system_voltage_setting": self.system_voltage,
+            "recognized_voltage": self.system_voltage,
+            "battery_type": BatteryType.SEALED,
+            "over_voltage_threshold": round(16.0 * volts, 1),
+            "charging_voltage_limit": round(15.5 * volts, 1),
+            "equalizing_charging_voltage": round(14.8 * volts, 1),
+            "boost_charging_voltage": round(14.6 * volts, 1),
+            "floating_voltage": round(13.8 * volts, 1),
+            "boost_charging_recovery_voltage": round(13.2 * volts, 1),
+            "over_discharge_recovery_voltage": round(12.6 * volts, 1),
+            "under_voltage_warning_level": round(12.0 * volts, 1),
+            "over_discharge_voltage": round(11.1 * volts, 1),
+            "discharging_limit_voltage": round(10.6 * volts, 1),
+            "end_of_charge_soc": 100,
+            "end_of_discharge_soc": 50,
+            "over_discharge_time_delay": 5,
+            "equalizing_charging_time": 120,
+            "boost_charging_time": 120,
+            "equalizing_charging_interval": 28,
+            "temperature_compensation_factor": 3,
+            "first_stage_operating_duration": self.evening_load_hours,
+            "first_stage_operating_power": 100,
+            "second_stage_operating_duration": 0,
+            "second_stage_operating_power": 0,
+            "third_stage_operating_duration": 0,
+            "third_stage_operating_power": 0,
+            "morning_on_operating_duration": 0,
+            "morning_on_operating_power": 0,
+            "load_working_mode": LoadWorkingModes(
+                min(14, max(1, self.evening_load_hours))
+            ),
+            "light_control_delay": 5,
+            "light_control_voltate": 5,
+            "led_load_current_setting": 0.5,
+            "charging_mode_controlled_by": ChargingModeController.VOLTAGE,
+            "special_power_control_state": Toggle.OFF,
+            "each_night_on_function_state": Toggle.OFF,
+            "no_charging_below_freezing": Toggle.ON,
+            "charging_method": ChargingMethod.DIRECT,
+        }
+
+
+class SyntheticRoverModel:
+    """
+    Generates Rover data from an irradiance curve, a load profile and the battery
+    state of charge integrated between samples. Seasons shift the day length,
+    irradiance and temperature; clouds follow a mean-reverting random walk.
+
+    Samples are `interval` seconds apart starting at `start` (a unix timestamp),
+    unless an explicit timestamp is passed to `sample()`. The same `seed` always
+    generates the same data. Models can share one random generator (`rng`) instead
+    of seeding their own.
+    """
+
+    __slots__ = (
+        "site",
+        "interval",
+        "timestamp",
+        "state_of_charge",
+        "static",
+        "_start",
+        "_random",
+        "_clouds",
+        "_day",
+        "_today",
+        "_totals",
+        "_load_cut",
+    )
+
+    def __init__(
+        self,
+        site: Optional[SolarSite] = None,
+        start: Optional[float] = None,
+        interval: float = 30.0,
+        seed: Optional[int] = None,
+        state_of_charge: float = 0.6,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.site = site or SolarSite()
+        self.interval = interval
+        self.timestamp: Optional[float] = None
+        self.state_of_charge = state_of_charge
+        self.static = self.site.static
+
+        self._start = time.time() if start is None else start
+        self._random = rng or random.Random(seed)
+        self._clouds = self.site.cloudiness
+        self._day: Optional[int] = None
+        self._today: dict[str, float] = {}
+        self._totals = dict.fromkeys(
+            (
+                "total_operating_days",
+                "total_battery_over_discharges",
+                "total_battery_full_charges",
+                "total_battery_charge_amphours",
+                "total_battery_discharge_amphours",
+                "cumulative_power_generation",
+                "cumulative_power_consumption",
+            ),
+            0,
+        )
+        self._load_cut = False
+
+    def sample(self, timestamp: Optional[float] = None) -> dict[str, Any]:
+        if timestamp is None:
+            timestamp = (
+                self._start
+                if self.timestamp is None
+                else self.timestamp + self.interval
+            )
+        elapsed = (
+            self.interval if self.timestamp is None else timestamp - self.timestamp
+        )
+        self.timestamp = timestamp
+        return {**self.static, **self._step(timestamp, max(0.0, elapsed))}
+
+    def generate(self, count: int) -> list[dict[str, Any]]:
+        return [self.sample() for _ in range(count)]
+
+    def batches(
+        self, count: int, batch_size: int = 1000
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        `count` consecutive samples in lists of at most `batch_size`
+        """
+        while count > 0:
+            size = min(batch_size, count)
+            yield self.generate(size)
+            count -= size
+
+    def _step(self, timestamp: float, elapsed: float) -> dict[str, Any]:
+        site = self.site
+        day, seconds = divmod(timestamp, _DAY)
+        hour = seconds / 3600
+        if day != self._day:
+            self._day = day
+            self._today = dict.fromkeys(
+                (
+                    "max_charging_current_today",
+                    "max_discharging_current_today",
+                    "max_charging_power_today",
+                    "max_discharging_power_today",
+                    "charging_amphours_today",
+                    "discharging_amphours_today",
+                    "power_generation_today",
+                    "power_consumption_today",
+                ),
+                0.0,
+            )
+            self._totals["total_operating_days"] += 1
+
+        # +1 at the winter solstice, -1 at the summer solstice
+        winter = math.cos(2 * math.pi * ((day + 10) % _YEAR) / _YEAR)
+        day_length = site.day_length - site.day_length_swing * winter
+        sunrise = 12 - day_length / 2
+        sunset = sunrise + day_length
+        elevation = (
+            math.sin(math.pi * (hour - sunrise) / day_length)
+            if sunrise < hour < sunset
+            else 0.0
+        )
+
+        step = math.sqrt(elapsed / 60)  # keeps the walk independent of the interval
+        self._clouds += 0.05 * step * (site.cloudiness - self._clouds)
+        self._clouds += self._random.gauss(0, 0.05) * step
+        self._clouds = min(1.0, max(0.0, self._clouds))
+        irradiance = site.peak_irradiance * elevation * (1 - 0.2 * winter)
+        irradiance *= 1 - 0.75 * self._clouds
+
+        ambient = site.ambient_temperature + site.temperature_swing * (
+            0.3 * math.cos(2 * math.pi * (hour - 15) / 24) - 0.7 * winter
+        )
+
+        soc = self.state_of_charge
+        nominal = site.system_voltage
+        capacity = site.battery_capacity
+
+        solar_power = site.panel_watts * irradiance
+        charging_power = 0.96 * solar_power
+        if charging_power < 1:
+            charging_power = 0.0
+            charging_state = ChargingState.DEACTIVATED
+        elif soc < 0.85:
+            charging_state = ChargingState.MPPT
+        elif soc < 0.98:
+            charging_state = ChargingState.BOOST
+            charging_power *= 1 - 0.7 * (soc - 0.85) / 0.13
+        else:
+            charging_state = ChargingState.FLOATING
+            charging_power = min(charging_power, 0.01 * capacity * nominal)
+
+        light_on = hour >= sunset and hour < sunset + site.evening_load_hours
+        if soc <= 0.05 and not self._load_cut:
+            self._load_cut = True
+            self._totals["total_battery_over_discharges"] += 1
+        elif soc >= 0.2:
+            self._load_cut = False
+        load_power = (
+            0.0 if self._load_cut else site.base_load + site.evening_load * light_on
+        )
+
+        charging_current = charging_power / (nominal * 1.1)
+        charging_boost = 0.1 * nominal * min(1.0, charging_current / (0.2 * capacity))
+        battery_voltage = nominal * (0.98 + 0.1 * soc) + charging_boost
+        load_current = load_power / battery_voltage
+
+        hours = elapsed / 3600
+        charged = charging_current * hours
+        discharged = load_current * hours
+        soc = min(1.0, max(0.0, soc + (charged - discharged) / capacity))
+        if soc == 1.0 and self.state_of_charge < 1.0:
+            self._totals["total_battery_full_charges"] += 1
+        self.state_of_charge = soc
+
+        today, totals = self._today, self._totals
+        today["max_charging_current_today"] = max(
+            today["max_charging_current_today"], charging_current
+        )
+        today["max_discharging_current_today"] = max(
+            today["max_discharging_current_today"], load_current
+        )
+        today["max_charging_power_today"] = max(
+            today["max_charging_power_today"], charging_power
+        )
+        today["max_discharging_power_today"] = max(
+            today["max_discharging_power_today"], load_power
+        )
+        today["charging_amphours_today"] += charged
+        today["discharging_amphours_today"] += discharged
+        today["power_generation_today"] += charging_power * hours / 1000
+        today["power_consumption_today"] += load_power * hours / 1000
+        today["battery_min_voltage_today"] = min(
+            today.get("battery_min_voltage_today", battery_voltage), battery_voltage
+        )
+        today["battery_max_voltage_today"] = max(
+            today.get("battery_max_voltage_today", battery_voltage), battery_voltage
+        )
+        totals["total_battery_charge_amphours"] += charged
+        totals["total_battery_discharge_amphours"] += discharged
+        totals["cumulative_power_generation"] += charging_power * hours / 1000
+        totals["cumulative_power_consumption"] += load_power * hours / 1000
+
+        faults = []
+        if self._load_cut:
+            faults.append(Fault.BATTERY_OVER_DISCHARGE)
+        elif battery_voltage < 12.0 * nominal / 12:
+            faults.append(Fault.BATTERY_UNDER_VOLTAGE)
+
+        return {
+            "battery_percentage": round(soc * 100),
+            "battery_voltage": round(battery_voltage, 1),
+            "charging_current": round(charging_current, 2),
+            "controller_temperature": round(ambient + 5 + charging_power / 25),
+            "battery_temperature": round(ambient + 2),
+            "load_voltage": round(battery_voltage, 1) if load_power else 0.0,
+            "load_current": round(load_current, 2),
+            "load_power": round(load_power),
+            "solar_voltage": round(nominal * 1.5 + 3 * elevation, 1)
+            if solar_power >= 1
+            else 0.0,
+            "solar_current": round(solar_power / (nominal * 1.5 + 3 * elevation), 2)
+            if solar_power >= 1
+            else 0.0,
+            "charging_power": round(charging_power),
+            "battery_min_voltage_today": round(today["battery_min_voltage_today"], 1),
+            "battery_max_voltage_today": round(today["battery_max_voltage_today"], 1),
+            "max_charging_current_today": round(today["max_charging_current_today"], 2),
+            "max_discharging_current_today": round(
+                today["max_discharging_current_today"], 2
+            ),
+            "max_charging_power_today": round(today["max_charging_power_today"]),
+            "max_discharging_power_today": round(today["max_discharging_power_today"]),
+            "charging_amphours_today": round(today["charging_amphours_today"]),
+            "discharging_amphours_today": round(today["discharging_amphours_today"]),
+            "power_generation_today": round(today["power_generation_today"], 4),
+            "power_consumption_today": round(today["power_consumption_today"], 4),
+            "total_operating_days": totals["total_operating_days"],
+            "total_battery_over_discharges": totals["total_battery_over_discharges"],
+            "total_battery_full_charges": totals["total_battery_full_charges"],
+            "total_battery_charge_amphours": round(
+                totals["total_battery_charge_amphours"]
+            ),
+            "total_battery_discharge_amphours": round(
+                totals["total_battery_discharge_amphours"]
+            ),
+            "cumulative_power_generation": round(
+                totals["cumulative_power_generation"], 4
+            ),
+            "cumulative_power_consumption": round(
+                totals["cumulative_power_consumption"], 4
+            ),
+            "street_light_status": Toggle.ON if light_on and load_power else Toggle.OFF,
+            "street_light_brightness": 100 if light_on and load_power else 0,
+            "charging_state": charging_state,
+            "controller_fault_information": faults,
+        }
+
+
+class SyntheticRoverController(RenogyRoverController):
+    """
+    Stands in for a real controller and serves the data of a `SyntheticRoverModel`,
+    one sample per `read()`. With `realtime`, samples are taken at the current time
+    instead of `interval` seconds after the previous one.
+    """
+
+    def __init__(self, model: SyntheticRoverModel, realtime: bool = False) -> None:
+        self.model = model
+        self.realtime = realtime
+        self._sample: Optional[dict[str, Any]] = None
+
+    def read(self, registers: tuple[Register, ...]) -> dict[str, Any]:
+        self._sample = self.model.sample(time.time() if self.realtime else None)
+        return {register.key: self._sample[register.key] for register in registers}
+
+    def _get_value(self, register: Register) -> Any:
+        if self._sample is None:
+            self._sample = self.model.sample(time.time() if self.realtime else None)
+        return self._sample[register.key]
+
+    def set_street_light(self, state: Toggle):
+        pass
+
+    def set_street_light_brightness(self, intensity: int):
+        pass
+
+
+install_accessors(
+    SyntheticRoverController, lambda self, register: self._get_value(register)
+)
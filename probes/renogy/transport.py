@@ -0,0 +1,155 @@
+"""
+Retry and timeout policy for Modbus register reads
+"""
+
+from contextlib import nullcontext
+from dataclasses import dataclass, fields
+import logging
+import time
+from typing import Any, Callable, ContextManager, Optional, TypeVar
+
+import minimalmodbus
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Transient failures (noise on the line, a missed reply) that are worth retrying.
+# Anything else, like the slave rejecting a register address, fails immediately.
+RETRYABLE_ERRORS = (minimalmodbus.NoResponseError, minimalmodbus.InvalidResponseError)
+
+
+@dataclass
+class BlockStats:
+    requests: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    crc_errors: int = 0
+    invalid_responses: int = 0
+    failures: int = 0
+    latency: Optional[float] = None  # moving average of successful requests (seconds)
+    timeout: Optional[float] = None  # serial timeout currently used (seconds)
+
+
+# statistics of a block that aren't counts
+_GAUGES = ("latency", "timeout")
+
+
+class TransportPolicy:
+    """
+    Retries failed reads with a bounded exponential backoff and adapts the serial
+    timeout of each register block to its observed response latency. Statistics are
+    kept per block and exposed through `metrics()` and `counters()`.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 0.5,
+        retries: int = 2,
+        backoff: float = 0.05,
+        max_backoff: float = 1.0,
+        min_timeout: float = 0.1,
+        max_timeout: float = 2.0,
+        latency_factor: float = 4.0,
+        smoothing: float = 0.2,
+    ) -> None:
+        self.initial_timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.min_timeout = min_timeout
+        # never below the configured timeout, which a slow device may well need
+        self.max_timeout = max(max_timeout, timeout)
+        self.latency_factor = latency_factor
+        self.smoothing = smoothing
+        self.stats: dict[str, BlockStats] = {}
+
+    def timeout(self, block: str) -> float:
+        """
+        Serial timeout for the next request to `block`: a multiple of its average
+        latency, bounded by `min_timeout` and `max_timeout`
+        """
+        stats = self.stats.get(block)
+        if stats is None or stats.latency is None:
+            return self.initial_timeout
+        return min(
+            self.max_timeout,
+            max(self.min_timeout, stats.latency * self.latency_factor),
+        )
+
+    def call(
+        self,
+        block: str,
+        serial,
+        request: Callable[[], T],
+        transaction: Callable[[], ContextManager] = nullcontext,
+    ) -> T:
+        """
+        Run `request` against `serial`, retrying transient failures up to `retries`
+        times. Each attempt runs inside a fresh `transaction()` so that the bus is
+        released while backing off.
+        """
+        stats = self.stats.setdefault(block, BlockStats())
+        timeout = self.timeout(block)
+        attempt = 0
+        while True:
+            stats.requests += 1
+            stats.timeout = timeout
+            try:
+                with transaction():
+                    # the serial port may be shared with other devices on the bus, it
+                    # is only ours for the duration of the transaction
+                    serial.timeout = timeout
+                    start = time.monotonic()
+                    value = request()
+                    latency = time.monotonic() - start
+            except RETRYABLE_ERRORS as exc:
+                if isinstance(exc, minimalmodbus.NoResponseError):
+                    stats.timeouts += 1
+                    # the reply may simply be slower than we thought
+                    timeout = min(self.max_timeout, timeout * 2)
+                elif "checksum" in str(exc).lower():
+                    stats.crc_errors += 1
+                else:
+                    stats.invalid_responses += 1
+
+                if attempt == self.retries:
+                    stats.failures += 1
+                    raise
+                delay = min(self.max_backoff, self.backoff * 2**attempt)
+                logger.debug(f"retrying {block} in {delay:.3f}s after error: {exc}")
+                time.sleep(delay)
+                stats.retries += 1
+                attempt += 1
+            except Exception:
+                stats.failures += 1
+                raise
+            else:
+                stats.latency = (
+                    latency
+                    if stats.latency is None
+                    else stats.latency + self.smoothing * (latency - stats.latency)
+                )
+                return value
+
+    def metrics(self) -> dict[str, float]:
+        """
+        Flattened gauges, e.g. `modbus_telemetry_latency`
+        """
+        return self._flatten(_GAUGES)
+
+    def counters(self) -> dict[str, int]:
+        """
+        Flattened counters, e.g. `modbus_telemetry_timeouts`
+        """
+        return self._flatten(
+            tuple(f.name for f in fields(BlockStats) if f.name not in _GAUGES)
+        )
+
+    def _flatten(self, names: tuple[str, ...]) -> dict[str, Any]:
+        return {
+            f"modbus_{block}_{name}": getattr(stats, name)
+            for block, stats in self.stats.items()
+            for name in names
+            if getattr(stats, name) is not None
+        }
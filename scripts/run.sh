@@ -6,5 +6,5 @@ root_dir=$(dirname $script_dir)
 
 pushd $root_dir
 source .venv/bin/activate
-python -m solarstats $@
-popd
\ No newline at end of file
+# exec so that the SIGTERM systemd stops the service with reaches python
+exec python -m solarstats "$@"
@@ -1,10 +1,12 @@
 import argparse
+import asyncio
 import logging
 from os.path import abspath, dirname
+import signal
 from typing import Union
 
 from config import ConfigNotFoundError, load_config
-from engine import Engine
+from engine import AsyncEngine, Engine
 from probes.registry import ALL_PROBES, ALL_WRITERS
 
 logger = logging.getLogger(__name__)
@@ -18,9 +20,7 @@ def set_logging(level: Union[int, str], filename: Union[str, None] = None):
         "format": format,
         "datefmt": datefmt,  # Define the date and time format
     }
-    logging.basicConfig(
-        **config
-    )
+    logging.basicConfig(**config)
     if filename:
         file_handler = logging.FileHandler(filename)
         file_handler.formatter = logging.Formatter(
@@ -33,6 +33,15 @@ def set_logging(level: Union[int, str], filename: Union[str, None] = None):
 DEFAULT_CONFIG_PATH = f"{dirname(abspath(__file__))}/config/config.yaml"
 
 
+def terminate(signum, frame):
+    """
+    Stop on SIGTERM, which systemd sends, as on CTRL-C so that the engine stops the
+    probes and the writers write what they buffer
+    """
+    logger.info(f"Received {signal.Signals(signum).name}, stopping")
+    raise KeyboardInterrupt
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(prog=__package__)
     parser.add_argument(
@@ -46,6 +55,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     config_file = abspath(args.config) if args.config else DEFAULT_CONFIG_PATH
+    signal.signal(signal.SIGTERM, terminate)
 
     try:
         config = load_config(config_file, probes=ALL_PROBES, writers=ALL_WRITERS)
@@ -60,10 +70,26 @@ if __name__ == "__main__":
             logger.error("No probes configured, exiting...")
             exit(1)
 
-        engine = Engine(
-            frequency=config.frequency, probes=config.probes, writers=config.writers
-        )
-        engine.run()
+        if config.asyncio:
+            asyncio.run(
+                AsyncEngine(
+                    frequency=config.frequency,
+                    probes=config.probes,
+                    writers=config.writers,
+                    poll_timeout=config.poll_timeout,
+                    overrun=config.overrun,
+                ).run()
+            )
+        else:
+            engine = Engine(
+                frequency=config.frequency,
+                probes=config.probes,
+                writers=config.writers,
+                concurrent=config.concurrent,
+                poll_timeout=config.poll_timeout,
+                overrun=config.overrun,
+            )
+            engine.run()
     except ConfigNotFoundError:
         logger.error(f"Could not find valid config file at: {config_file}")
     except KeyboardInterrupt:
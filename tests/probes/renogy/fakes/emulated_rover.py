@@ -0,0 +1,148 @@
+"""
+Register-level emulation of a Renogy Rover served over a pseudo-terminal pair
+
+The emulator answers Modbus RTU requests on the master side of a pty while the code
+under test talks to the slave side (`EmulatedRover.port`) exactly as it would to a USB
+serial adapter. Replies are delayed by the time the request and the response would
+take on the wire at the configured baudrate plus the device's turnaround time, so
+reducing the number of transactions shows up as a wall-clock win.
+"""
+
+import os
+import select
+import struct
+import threading
+import time
+import tty
+from typing import Optional
+
+# start bit, 8 data bits, stop bit
+BITS_PER_BYTE = 10
+
+READ_HOLDING_REGISTERS = 0x03
+READ_INPUT_REGISTERS = 0x04
+WRITE_SINGLE_REGISTER = 0x06
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+
+
+def crc16(frame: bytes) -> bytes:
+    crc = 0xFFFF
+    for byte in frame:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return struct.pack("<H", crc)
+
+
+class EmulatedRover:
+    def __init__(
+        self,
+        registers: dict[int, int],
+        slave_address: int = 1,
+        baudrate: int = 9600,
+        turnaround: float = 0.005,
+    ) -> None:
+        self.registers = dict(registers)
+        self.slave_address = slave_address
+        self.baudrate = baudrate
+        self.turnaround = turnaround
+        self.requests = 0
+
+        self._timeouts = 0
+        self._crc_errors = 0
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def port(self) -> str:
+        assert self._slave is not None, "emulator is not running"
+        return os.ttyname(self._slave)
+
+    def transfer_time(self, number_of_bytes: int) -> float:
+        return number_of_bytes * BITS_PER_BYTE / self.baudrate
+
+    def inject_timeouts(self, count: int = 1) -> None:
+        """
+        Ignore the next `count` requests
+        """
+        self._timeouts += count
+
+    def inject_crc_errors(self, count: int = 1) -> None:
+        """
+        Corrupt the checksum of the next `count` responses
+        """
+        self._crc_errors += count
+
+    def start(self) -> "EmulatedRover":
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def __enter__(self) -> "EmulatedRover":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def _serve(self) -> None:
+        buffer = b""
+        while not self._stopped.is_set():
+            readable, _, _ = select.select([self._master], [], [], 0.05)
+            if not readable:
+                buffer = b""  # a silent interval ends any partial frame
+                continue
+            buffer += os.read(self._master, 256)
+            while len(buffer) >= 8:
+                request, buffer = buffer[:8], buffer[8:]
+                self._handle(request)
+
+    def _handle(self, request: bytes) -> None:
+        if crc16(request[:-2]) != request[-2:] or request[0] != self.slave_address:
+            return  # real devices stay silent on corrupt or foreign frames
+        self.requests += 1
+        if self._timeouts:
+            self._timeouts -= 1
+            return
+
+        function, address, value = struct.unpack(">BHH", request[1:6])
+        response = self._respond(function, address, value)
+        frame = bytes([self.slave_address]) + response
+        frame += crc16(frame)
+        if self._crc_errors:
+            self._crc_errors -= 1
+            frame = frame[:-2] + bytes([frame[-2] ^ 0xFF, frame[-1]])
+
+        time.sleep(
+            self.transfer_time(len(request))
+            + self.turnaround
+            + self.transfer_time(len(frame))
+        )
+        os.write(self._master, frame)
+
+    def _respond(self, function: int, address: int, value: int) -> bytes:
+        if function in (READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+            addresses = range(address, address + value)
+            if any(a not in self.registers for a in addresses):
+                return bytes([function | 0x80, ILLEGAL_DATA_ADDRESS])
+            words = [self.registers[a] for a in addresses]
+            return struct.pack(f">BB{len(words)}H", function, 2 * len(words), *words)
+        if function == WRITE_SINGLE_REGISTER:
+            self.registers[address] = value
+            return struct.pack(">BHH", function, address, value)
+        return bytes([function | 0x80, ILLEGAL_FUNCTION])
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from probes.renogy.bus import ModbusBus
+
+
+def test_transactions_are_serialized():
+    bus = ModbusBus("/dev/ttyUSB0", baudrate=115200)
+    active = []
+    overlaps = []
+
+    def device(address):
+        for _ in range(20):
+            with bus.transaction(address):
+                active.append(address)
+                if len(active) > 1:
+                    overlaps.append(list(active))
+                time.sleep(0.0005)
+                active.remove(address)
+
+    threads = [threading.Thread(target=device, args=(a,)) for a in (1, 2, 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert overlaps == []
+    assert bus.transactions == 60
+
+
+def test_bus_is_granted_round_robin():
+    bus = ModbusBus("/dev/ttyUSB0", baudrate=115200)
+    granted = []
+    waiting = threading.Barrier(4)
+
+    def device(address):
+        waiting.wait()
+        with bus.transaction(address):
+            granted.append(address)
+
+    with bus.transaction(2):
+        threads = [threading.Thread(target=device, args=(a,)) for a in (1, 3, 4)]
+        for thread in threads:
+            thread.start()
+        waiting.wait()
+        time.sleep(0.05)  # let every device queue up for the bus
+    for thread in threads:
+        thread.join()
+
+    assert granted == [3, 4, 1]
+
+
+def test_poll_due_honours_cadence():
+    bus = ModbusBus("/dev/ttyUSB0")
+    bus.attach(1, cadence=5.0)
+    bus.attach(2)
+
+    assert bus.poll_due(1, now=0.0)
+    assert bus.poll_due(2, now=0.0)
+    assert not bus.poll_due(1, now=4.0)
+    assert bus.poll_due(2, now=4.0)
+    assert bus.poll_due(1, now=5.0)
+
+
+def test_utilization():
+    bus = ModbusBus("/dev/ttyUSB0", baudrate=115200)
+    with bus.transaction(1):
+        time.sleep(0.05)
+
+    assert bus.busy_seconds >= 0.05
+    assert 0.0 < bus.utilization() <= 1.0
@@ -0,0 +1,91 @@
+from unittest import mock
+
+import pytest
+
+from probes.renogy import RenogyRover, RenogyRoverReplay
+from probes.renogy.bus import ModbusBus
+from probes.renogy.capture import MAX_WORDS, CaptureReader, CaptureWriter, ReplayDevice
+from tests.probes.renogy.fakes.fake_modbus import create_fake_modbus
+
+
+@pytest.fixture
+def capture_path(tmpdir):
+    return str(tmpdir / "rover.capture")
+
+
+@pytest.fixture(autouse=True)
+def buses():
+    with mock.patch.object(ModbusBus, "_buses", {}) as buses:
+        yield buses
+
+
+def test_capture_round_trip(capture_path):
+    writer = CaptureWriter(capture_path)
+    writer.write(1.0, 0x0100, [1, 2, 3])
+    writer.write(1.0, 0xE002, list(range(MAX_WORDS + 2)))
+    writer.write(2.0, 0x0100, [4, 5, 6])
+    writer.close()
+
+    reader = CaptureReader(capture_path)
+    assert len(reader) == 4
+    assert reader[0].words == (1, 2, 3)
+    assert reader[2].address == 0xE002 + MAX_WORDS
+    assert reader[2].words == (MAX_WORDS, MAX_WORDS + 1)
+    assert [len(cycle) for cycle in reader.cycles()] == [3, 1]
+
+
+def test_capture_rejects_other_files(capture_path):
+    with open(capture_path, "wb") as fd:
+        fd.write(b"not a capture file")
+    with pytest.raises(ValueError):
+        CaptureReader(capture_path)
+
+
+def test_replay_matches_captured_polls(capture_path):
+    fake_modbus = create_fake_modbus()
+    with mock.patch(
+        "probes.renogy.renogy_rover._create_controller"
+    ) as mock_create_controller:
+        mock_create_controller.return_value = fake_modbus
+        probe = RenogyRover("/dev/ttyUSB0", 1, capture=capture_path)
+    captured = probe.poll()
+
+    replay = RenogyRoverReplay(capture_path, speed=None, loop=False)
+    assert replay.poll() == captured
+    assert replay.poll() == {}
+
+
+@mock.patch("probes.renogy.capture.time")
+def test_replay_device_follows_recorded_timing(mock_time, capture_path):
+    writer = CaptureWriter(capture_path)
+    for timestamp in (100.0, 110.0, 130.0):
+        writer.write(timestamp, 0x0100, [int(timestamp)])
+    writer.close()
+
+    mock_time.monotonic.return_value = 0.0
+    device = ReplayDevice(capture_path, speed=10.0, loop=True)
+
+    assert device.advance()
+    assert device.read_register(0x0100) == 100
+    assert device.advance()
+    mock_time.sleep.assert_called_with(1.0)
+    assert device.advance()
+    mock_time.sleep.assert_called_with(3.0)
+    assert device.read_register(0x0100) == 130
+    assert device.advance(), "the replay loops back to the start"
+    assert device.read_register(0x0100) == 100
+
+
+def test_stopping_the_probe_closes_the_capture(capture_path):
+    with mock.patch(
+        "probes.renogy.renogy_rover._create_controller"
+    ) as mock_create_controller:
+        mock_create_controller.return_value = create_fake_modbus()
+        probe = RenogyRover("/dev/ttyUSB0", 1, capture=capture_path)
+    probe.poll()
+    capture = probe._controller._capture
+
+    probe.stop()
+
+    assert capture._file.closed
+    assert len(CaptureReader(capture_path)) > 0
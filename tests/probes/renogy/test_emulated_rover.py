@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from probes.renogy.registers import REGISTER_BLOCKS
+from probes.renogy.renogy_rover import RenogyRoverController
+from probes.renogy.types import ChargingState
+from tests.probes.renogy.fakes.emulated_rover import EmulatedRover
+from tests.probes.renogy.fakes.fake_modbus import fake_registers
+
+
+@pytest.fixture
+def rover():
+    registers = {
+        address: 0
+        for block in REGISTER_BLOCKS
+        for address in range(block.address, block.end)
+    }
+    registers.update(fake_registers())
+    with EmulatedRover(registers, baudrate=19200) as rover:
+        yield rover
+
+
+@pytest.fixture
+def create_controller(rover):
+    controllers = []
+
+    def create(**kwargs):
+        controller = RenogyRoverController(
+            rover.port, rover.slave_address, baudrate=rover.baudrate, **kwargs
+        )
+        controllers.append(controller)
+        return controller
+
+    yield create
+    for controller in controllers:
+        controller.device.serial.close()
+
+
+def timed_all_data(controller: RenogyRoverController) -> tuple[dict, float]:
+    start = time.monotonic()
+    data = controller.all_data()
+    return data, time.monotonic() - start
+
+
+def test_all_data_over_serial(rover, create_controller):
+    data = create_controller().all_data()
+
+    assert data["product_model"] == "RNG-CTRL-WND30"
+    assert data["battery_voltage"] == 12.6
+    assert data["controller_temperature"] == -5
+    assert data["charging_state"] == ChargingState.MPPT
+    assert rover.requests == len(REGISTER_BLOCKS)
+
+
+def test_block_reads_are_faster_than_single_reads(rover, create_controller):
+    block_data, block_elapsed = timed_all_data(create_controller())
+    single_data, single_elapsed = timed_all_data(create_controller(block_reads=False))
+
+    assert block_data == single_data
+    assert block_elapsed * 3 < single_elapsed
+
+
+def test_latency_model(rover, create_controller):
+    controller = create_controller()
+    controller.battery_voltage()  # warm up the serial port
+
+    start = time.monotonic()
+    controller.battery_voltage()
+    elapsed = time.monotonic() - start
+
+    expected = rover.transfer_time(8) + rover.turnaround + rover.transfer_time(7)
+    assert elapsed >= expected
+
+
+def test_retries_injected_timeouts(rover, create_controller):
+    controller = create_controller(timeout=0.1)
+    rover.inject_timeouts(1)
+
+    assert controller.all_data()["battery_voltage"] == 12.6
+    assert controller.transport.stats["system"].timeouts == 1
+    assert controller.transport.stats["system"].retries == 1
+
+
+def test_retries_injected_crc_errors(rover, create_controller):
+    controller = create_controller()
+    rover.inject_crc_errors(1)
+
+    assert controller.all_data()["battery_voltage"] == 12.6
+    assert controller.transport.stats["system"].crc_errors == 1
@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from probes.renogy import RenogyRoverFleet
+from probes.renogy.fleet import RecordedHistory, ReplayedFleet
+from probes.renogy.registers import REGISTER_MAP
+from probes.renogy.renogy_rover_sim import NoSimulatedMetricsFoundError
+from writers.sql import Metric, Sql
+
+# 2023-10-04 00:00:00 UTC
+MIDNIGHT = 1696377600.0
+
+
+@pytest.fixture
+def connection(tmpdir):
+    connection = f"sqlite+pysqlite:///{tmpdir}/fleet.sqlite"
+    Sql(connection)
+    start = datetime(2023, 10, 4, 12, 0, 0)
+    with Session(create_engine(connection)) as session:
+        for i in range(6):
+            session.add(
+                Metric(
+                    probe="RenogyRover",
+                    version="0.1",
+                    data={"battery_voltage": 12.0 + i / 10, "serial_number": 1234},
+                    created_at=start + timedelta(minutes=i),
+                )
+            )
+        session.commit()
+    return connection
+
+
+def test_synthetic_fleet_reports_one_record_per_device():
+    probe = RenogyRoverFleet(devices=3, interval=600, start=MIDNIGHT, seed=1)
+
+    records = probe.poll()
+
+    assert [record["device_id"] for record in records] == [
+        "rover-1",
+        "rover-2",
+        "rover-3",
+    ]
+    expected_keys = sorted(["device_id"] + [register.key for register in REGISTER_MAP])
+    assert all(sorted(record) == expected_keys for record in records)
+
+
+def test_synthetic_fleet_offsets_devices():
+    probe = RenogyRoverFleet(
+        devices=2,
+        interval=600,
+        start=MIDNIGHT,
+        offset=12 * 3600,
+        keys=["solar_voltage"],
+    )
+
+    night, noon = probe.poll()
+
+    assert night == {"device_id": "rover-1", "solar_voltage": 0.0}
+    assert noon["solar_voltage"] > 0
+
+
+def test_synthetic_fleet_shares_static_data():
+    probe = RenogyRoverFleet(devices=3, interval=600, start=MIDNIGHT, panel_watts=100)
+
+    first, second, third = probe.fleet.models
+
+    assert first.static is second.static is third.static
+    assert first.site.panel_watts == 100
+
+
+def test_replayed_fleet_offsets_devices(connection):
+    probe = RenogyRoverFleet(
+        devices=3,
+        connection=connection,
+        offset=120,
+        keys=["battery_voltage"],
+        name="site",
+    )
+
+    assert probe.poll() == [
+        {"device_id": "site-1", "battery_voltage": 12.0},
+        {"device_id": "site-2", "battery_voltage": 12.2},
+        {"device_id": "site-3", "battery_voltage": 12.4},
+    ]
+    assert [record["battery_voltage"] for record in probe.poll()] == [12.1, 12.3, 12.5]
+    assert [record["battery_voltage"] for record in probe.poll()] == [12.2, 12.4, 12.0]
+
+
+def test_replayed_fleet_fills_missing_values(connection):
+    probe = RenogyRoverFleet(devices=1, connection=connection)
+
+    (record,) = probe.poll()
+
+    assert record["solar_current"] == 0
+    assert record["controller_fault_information"] == []
+
+
+def test_recorded_history_is_loaded_once(connection):
+    history = RecordedHistory(connection, max_records=4)
+    fleet = ReplayedFleet(1000, history, offset=60)
+
+    samples = fleet.sample()
+
+    assert len(history) == 4
+    assert samples[0] == samples[3] == history.record(0)
+    assert samples[0] == {"battery_voltage": 12.0, "serial_number": 1234}
+    assert history.position(60) == 1
+    assert history.position(180) == 0  # wraps around a 180s history
+
+
+def test_recorded_history_requires_metrics(tmpdir):
+    connection = f"sqlite+pysqlite:///{tmpdir}/empty.sqlite"
+    Sql(connection)
+
+    with pytest.raises(NoSimulatedMetricsFoundError):
+        RecordedHistory(connection)
+
+
+def test_recorded_history_stores_unchanging_keys_once(connection):
+    history = RecordedHistory(connection)
+
+    assert history.constants == {"serial_number": 1234}
+    assert list(history.columns) == ["battery_voltage"]
+    assert history.columns["battery_voltage"].typecode == "d"
+    assert [history.record(i)["battery_voltage"] for i in range(6)] == [
+        pytest.approx(12.0 + i / 10) for i in range(6)
+    ]
+
+
+def test_recorded_history_handles_keys_that_come_and_go(tmpdir):
+    connection = f"sqlite+pysqlite:///{tmpdir}/changing.sqlite"
+    writer = Sql(connection)
+    for data in (
+        {"load": 1, "state": "on"},
+        {"load": 1, "state": "off", "fault": 3},
+        {"load": 1.0},
+    ):
+        writer.output_metrics("RenogyRover", "0.1", data)
+
+    history = RecordedHistory(connection)
+
+    assert [history.record(i) for i in range(3)] == [
+        {"load": 1, "state": "on", "fault": None},
+        {"load": 1, "state": "off", "fault": 3},
+        {"load": 1.0, "state": None, "fault": None},
+    ]
@@ -0,0 +1,47 @@
+from probes.renogy.registers import (
+    MAX_READ_GAP,
+    REGISTER_BLOCKS,
+    REGISTER_MAP,
+    REGISTERS_BY_KEY,
+    RegisterBlock,
+    plan_reads,
+    resolve,
+)
+
+
+def test_resolve_all_registers():
+    assert resolve() == REGISTER_MAP
+
+
+def test_resolve_keeps_register_map_order():
+    registers = resolve(["charging_method", "battery_voltage"])
+    assert [r.key for r in registers] == ["battery_voltage", "charging_method"]
+
+
+def test_plan_reads_all_registers_reads_whole_blocks():
+    assert plan_reads(REGISTER_MAP) == REGISTER_BLOCKS
+
+
+def test_plan_reads_merges_small_gaps():
+    registers = resolve(["battery_percentage", "charging_power"])
+    assert plan_reads(registers) == (RegisterBlock("telemetry", 0x0100, 0x0A),)
+
+
+def test_plan_reads_splits_large_gaps():
+    registers = resolve(["battery_percentage", "controller_fault_information"])
+    assert 0x0121 - 0x0101 > MAX_READ_GAP
+    assert plan_reads(registers) == (
+        RegisterBlock("telemetry", 0x0100, 1),
+        RegisterBlock("telemetry", 0x0121, 2),
+    )
+
+
+def test_plan_reads_never_crosses_blocks():
+    registers = (
+        REGISTERS_BY_KEY["device_address"],
+        REGISTERS_BY_KEY["battery_percentage"],
+    )
+    assert plan_reads(registers) == (
+        RegisterBlock("system", 0x001A, 1),
+        RegisterBlock("telemetry", 0x0100, 1),
+    )
@@ -0,0 +1,134 @@
+from unittest import mock
+
+import minimalmodbus
+import pytest
+
+from probes.renogy import RenogyRover
+from probes.renogy.bus import ModbusBus
+from probes.renogy.registers import (
+    REGISTER_BLOCKS,
+    SETTINGS_BLOCK,
+    SYSTEM_BLOCK,
+    TELEMETRY_BLOCK,
+)
+from tests.probes.renogy.fakes.fake_modbus import create_fake_modbus
+
+
+@pytest.fixture
+def fake_modbus():
+    return create_fake_modbus()
+
+
+@pytest.fixture(autouse=True)
+def buses():
+    with mock.patch.object(ModbusBus, "_buses", {}) as buses:
+        yield buses
+
+
+@pytest.fixture
+def create_probe(fake_modbus):
+    with mock.patch(
+        "probes.renogy.renogy_rover._create_controller"
+    ) as mock_create_controller:
+        mock_create_controller.return_value = fake_modbus
+        yield lambda **kwargs: RenogyRover("/dev/ttyUSB0", 1, **kwargs)
+
+
+def blocks_read(fake_modbus) -> list[int]:
+    return [c.args[0] for c in fake_modbus.read_registers.call_args_list]
+
+
+def test_register_blocks_cover_all_data_keys(create_probe):
+    probe = create_probe()
+    block_keys = [key for block in REGISTER_BLOCKS for key in block.keys]
+    assert sorted(block_keys) == sorted(probe._controller.all_data_keys())
+
+
+def test_poll_returns_all_data(create_probe, fake_modbus):
+    probe = create_probe()
+    assert probe.poll() == probe._controller.all_data()
+
+
+@mock.patch("probes.renogy.time")
+def test_poll_refreshes_blocks_on_their_own_interval(
+    mock_time, create_probe, fake_modbus
+):
+    probe = create_probe(refresh_intervals={"system": 100.0, "settings": 10.0})
+
+    mock_time.monotonic.return_value = 0.0
+    first = probe.poll()
+    assert blocks_read(fake_modbus) == [
+        SYSTEM_BLOCK.address,
+        TELEMETRY_BLOCK.address,
+        SETTINGS_BLOCK.address,
+    ]
+
+    fake_modbus.read_registers.reset_mock()
+    mock_time.monotonic.return_value = 5.0
+    assert probe.poll() == first
+    assert blocks_read(fake_modbus) == [TELEMETRY_BLOCK.address]
+
+    fake_modbus.read_registers.reset_mock()
+    mock_time.monotonic.return_value = 10.0
+    assert probe.poll() == first
+    assert blocks_read(fake_modbus) == [TELEMETRY_BLOCK.address, SETTINGS_BLOCK.address]
+
+
+def test_poll_only_reads_requested_keys(create_probe, fake_modbus):
+    probe = create_probe(keys=["battery_voltage", "solar_current", "unknown_key"])
+
+    assert probe.poll() == {"battery_voltage": 12.6, "solar_current": 24.4}
+    assert fake_modbus.read_registers.call_args_list == [
+        mock.call(0x0101, number_of_registers=0x0108 - 0x0101 + 1)
+    ]
+
+
+def test_probes_on_the_same_port_share_a_bus(create_probe):
+    probe1 = RenogyRover("/dev/ttyUSB0", 1)
+    probe2 = RenogyRover("/dev/ttyUSB0", 2)
+
+    assert probe1._bus is probe2._bus
+    assert probe1._bus is not RenogyRover("/dev/ttyUSB1", 1)._bus
+
+
+@mock.patch("probes.renogy.time")
+def test_poll_skips_device_until_cadence_elapsed(mock_time, create_probe):
+    probe = create_probe(cadence=10.0)
+
+    mock_time.monotonic.return_value = 0.0
+    assert probe.poll()
+    mock_time.monotonic.return_value = 5.0
+    assert probe.poll() == {}
+    mock_time.monotonic.return_value = 10.0
+    assert probe.poll()
+
+
+def test_metrics_report_the_bus_and_transport(create_probe):
+    probe = create_probe()
+    data = probe.poll()
+
+    assert not any("modbus" in key or "bus_utilization" in key for key in data)
+    metrics = probe.metrics()
+    assert 0.0 <= metrics["rover_dev_ttyusb0_1_bus_utilization"] <= 1.0
+    assert "rover_dev_ttyusb0_1_modbus_telemetry_latency" in metrics
+    assert probe.counters()["rover_dev_ttyusb0_1_modbus_telemetry_requests"] == 1
+
+
+def test_poll_returns_partial_data_when_a_block_fails(create_probe, fake_modbus):
+    probe = create_probe(retries=0)
+    read_registers = fake_modbus.read_registers.side_effect
+
+    def fail_settings(address, number_of_registers, **kwargs):
+        if address == SETTINGS_BLOCK.address:
+            raise minimalmodbus.NoResponseError("No communication with the instrument")
+        return read_registers(address, number_of_registers, **kwargs)
+
+    fake_modbus.read_registers.side_effect = fail_settings
+    data = probe.poll()
+
+    assert sorted(k for k in data if k in SETTINGS_BLOCK.keys) == []
+    assert data["battery_voltage"] == 12.6
+    counters = probe.counters()
+    assert counters["rover_dev_ttyusb0_1_modbus_settings_timeouts"] == 1
+    assert counters["rover_dev_ttyusb0_1_modbus_settings_failures"] == 1
+    assert counters["rover_dev_ttyusb0_1_modbus_telemetry_failures"] == 0
@@ -2,8 +2,18 @@ from unittest import mock
 
 import pytest
 
+from probes.renogy.registers import REGISTER_BLOCKS
 from probes.renogy.renogy_rover import RenogyRoverController
-from probes.renogy.types import BatteryType, ChargingMethod, ChargingModeController, ChargingState, Fault, LoadWorkingModes, Toggle, ProductType
+from probes.renogy.types import (
+    BatteryType,
+    ChargingMethod,
+    ChargingModeController,
+    ChargingState,
+    Fault,
+    LoadWorkingModes,
+    Toggle,
+    ProductType,
+)
 from tests.probes.renogy.fakes.fake_modbus import create_fake_modbus
 
 
@@ -71,10 +81,16 @@ def test_controller_init_fails_if_controller_serial_is_none(fake_modbus):
         ("total_battery_discharge_amphours", 17105410),
         ("cumulative_power_generation", 1717.0947),
         ("cumulative_power_consumption", 3388.2372),
-        ("street_light_status", Toggle.ON), # TODO test for both ON and OFF
+        ("street_light_status", Toggle.ON),  # TODO test for both ON and OFF
         ("street_light_brightness", 62),
-        ("charging_state", ChargingState.MPPT), # TODO add multiple tests for each state value
-        ("controller_fault_information", [Fault.BATTERY_OVER_DISCHARGE, Fault.PHOTOVOLTAIC_INPUT_SHORT_CIRCUIT]), # TODO parameterized test for this
+        (
+            "charging_state",
+            ChargingState.MPPT,
+        ),  # TODO add multiple tests for each state value
+        (
+            "controller_fault_information",
+            [Fault.BATTERY_OVER_DISCHARGE, Fault.PHOTOVOLTAIC_INPUT_SHORT_CIRCUIT],
+        ),  # TODO parameterized test for this
         ("nominal_battery_capacity", 200),
         ("system_voltage_setting", 12),
         ("recognized_voltage", 12),
@@ -117,4 +133,61 @@ def test_controller_init_fails_if_controller_serial_is_none(fake_modbus):
 )
 def test_controller_metrics(metric, expected, controller):
     assert hasattr(controller, metric), f"Controller does not have metric {metric}"
-    assert getattr(controller, metric)() == expected, f"Unexpected value for metric {metric}"
+    assert (
+        getattr(controller, metric)() == expected
+    ), f"Unexpected value for metric {metric}"
+
+
+def test_controller_block_reads_match_single_reads(fake_modbus):
+    with mock.patch(
+        "probes.renogy.renogy_rover._create_controller"
+    ) as mock_create_controller:
+        mock_create_controller.return_value = fake_modbus
+        block_controller = RenogyRoverController(port=123, address="/dev/ttyUSB0")
+        single_controller = RenogyRoverController(
+            port=123, address="/dev/ttyUSB0", block_reads=False
+        )
+
+    assert block_controller.all_data() == single_controller.all_data()
+
+
+def test_controller_block_reads_one_request_per_block(controller, fake_modbus):
+    controller.all_data()
+
+    assert fake_modbus.read_register.call_count == 0
+    assert fake_modbus.read_string.call_count == 0
+    assert fake_modbus.read_registers.call_args_list == [
+        mock.call(block.address, number_of_registers=block.count)
+        for block in REGISTER_BLOCKS
+    ]
+
+
+def test_controller_snapshot_reads_shared_registers_once(fake_modbus):
+    with mock.patch(
+        "probes.renogy.renogy_rover._create_controller"
+    ) as mock_create_controller:
+        mock_create_controller.return_value = fake_modbus
+        controller = RenogyRoverController(
+            port=123, address="/dev/ttyUSB0", block_reads=False
+        )
+
+    controller.all_data()
+
+    addresses = [c.args[0] for c in fake_modbus.read_register.call_args_list]
+    for address in (0x000A, 0x000B, 0x0103, 0x0120, 0xE003, 0xE00F, 0xE020):
+        assert addresses.count(address) == 1, hex(address)
+    assert len(addresses) == len(set(addresses))
+
+
+def test_controller_snapshot_serves_repeated_reads(controller, fake_modbus):
+    with controller.snapshot():
+        first = controller.battery_voltage()
+        fake_modbus.read_register.side_effect = lambda x, *args, **kwargs: 0
+        assert controller.battery_voltage() == first
+
+    assert controller.battery_voltage() == 0, "reads outside a snapshot are live"
+
+
+def test_controller_all_data_matches_accessors(controller):
+    expected = {key: getattr(controller, key)() for key in controller.all_data_keys()}
+    assert controller.all_data() == expected
@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from probes.renogy import RenogyRoverSimulator
+
+from probes.renogy.registers import REGISTER_MAP
+from probes.renogy.renogy_rover_sim import (
+    NoSimulatedMetricsFoundError,
+    RenogyRoverControllerSimulator,
+)
+from probes.renogy.types import ChargingState
+from writers.sql import Metric, Sql
+
+
+@pytest.fixture
+def connection(tmpdir):
+    return f"sqlite+pysqlite:///{tmpdir}/simulated.sqlite"
+
+
+@pytest.fixture
+def simulator(connection):
+    writer = Sql(connection)
+    writer.output_metrics(
+        "RenogyRover",
+        "0.1",
+        {"battery_voltage": 12.6, "charging_state": ChargingState.MPPT},
+    )
+    return RenogyRoverControllerSimulator(connection)
+
+
+def test_simulator_replays_recorded_values(simulator):
+    data = simulator.all_data()
+
+    assert sorted(data.keys()) == sorted(register.key for register in REGISTER_MAP)
+    assert data["battery_voltage"] == 12.6
+    assert data["charging_state"] == ChargingState.MPPT
+
+
+def test_simulator_fills_missing_values(simulator):
+    data = simulator.all_data()
+
+    assert data["solar_current"] == 0
+    assert data["product_model"] == ""
+    assert data["controller_fault_information"] == []
+    assert data["battery_type"] is None
+
+
+@pytest.fixture
+def recorded(connection):
+    writer = Sql(connection)
+    for voltage in (12.1, 12.2, 12.3):
+        writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": voltage})
+    return connection
+
+
+def test_simulator_advances_one_record_per_read(recorded):
+    simulator = RenogyRoverControllerSimulator(recorded)
+
+    voltages = [simulator.all_data()["battery_voltage"] for _ in range(4)]
+
+    assert voltages == [12.1, 12.2, 12.3, 12.1]
+
+
+def test_simulator_accessors_use_current_record(recorded):
+    simulator = RenogyRoverControllerSimulator(recorded)
+
+    assert simulator.battery_voltage() == 12.1
+    assert simulator.battery_voltage() == 12.1
+    assert simulator.all_data()["battery_voltage"] == 12.2
+    assert simulator.battery_voltage() == 12.2
+
+
+def test_simulator_holds_record_for_poll_delay(recorded):
+    simulator = RenogyRoverControllerSimulator(recorded, poll_delay=60)
+
+    assert simulator.all_data()["battery_voltage"] == 12.1
+    assert simulator.all_data()["battery_voltage"] == 12.1
+
+
+def test_simulator_streams_in_chunks(recorded, monkeypatch):
+    monkeypatch.setattr("probes.renogy.renogy_rover_sim.CHUNK_SIZE", 2)
+    simulator = RenogyRoverControllerSimulator(recorded)
+
+    voltages = [simulator.all_data()["battery_voltage"] for _ in range(7)]
+
+    assert voltages == [12.1, 12.2, 12.3] * 2 + [12.1]
+
+
+def test_simulator_empty_database(connection):
+    Sql(connection)
+    simulator = RenogyRoverControllerSimulator(connection)
+
+    with pytest.raises(NoSimulatedMetricsFoundError):
+        simulator.all_data()
+
+
+@pytest.fixture
+def timestamped(connection):
+    Sql(connection)
+    start = datetime(2023, 10, 4, 12, 0, 0)
+    with Session(create_engine(connection)) as session:
+        for i, voltage in enumerate((12.1, 12.2, 12.3)):
+            session.add(
+                Metric(
+                    probe="RenogyRover",
+                    version="0.1",
+                    data={"battery_voltage": voltage},
+                    created_at=start + timedelta(minutes=i),
+                )
+            )
+        session.commit()
+    return connection
+
+
+def test_simulator_follows_recorded_spacing(timestamped, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("probes.renogy.renogy_rover_sim.time.sleep", sleeps.append)
+    simulator = RenogyRoverControllerSimulator(timestamped, speed=60.0)
+
+    voltages = [simulator.all_data()["battery_voltage"] for _ in range(3)]
+
+    assert voltages == [12.1, 12.2, 12.3]
+    assert len(sleeps) == 2
+    assert sleeps[0] == pytest.approx(1.0, abs=0.1)
+    assert sleeps[1] == pytest.approx(2.0, abs=0.1)
+
+
+def test_simulator_replays_as_fast_as_possible(timestamped, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("probes.renogy.renogy_rover_sim.time.sleep", sleeps.append)
+    simulator = RenogyRoverControllerSimulator(timestamped, speed=0)
+
+    voltages = [simulator.all_data()["battery_voltage"] for _ in range(4)]
+
+    assert voltages == [12.1, 12.2, 12.3, 12.1]
+    assert sleeps == []
+    assert simulator.samples == 1  # a new pass started
+    assert simulator.throughput() > 0
+
+
+def test_simulator_probe_reports_throughput(timestamped):
+    probe = RenogyRoverSimulator(timestamped, keys=["battery_voltage"], speed=0)
+
+    data = probe.poll()
+
+    assert data["battery_voltage"] == 12.1
+    assert "replay_samples_per_second" in data
+
+
+def test_simulator_replays_the_wide_layout(connection):
+    writer = Sql(connection, layout="wide")
+    for voltage in (12.1, 12.2):
+        writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": voltage})
+
+    simulator = RenogyRoverSimulator(connection, layout="wide", probe="RenogyRover")
+
+    assert [simulator.poll()["battery_voltage"] for _ in range(3)] == [12.1, 12.2, 12.1]
@@ -0,0 +1,88 @@
+import time
+from unittest import mock
+
+import pytest
+
+from probes.renogy import RenogyRover
+from probes.renogy.bus import ModbusBus
+from probes.renogy.sampling import RunningAggregate, Sampler
+from tests.probes.renogy.fakes.fake_modbus import create_fake_modbus
+
+
+def test_running_aggregate():
+    aggregate = RunningAggregate()
+    for value in (3.0, 1.0, 2.0):
+        aggregate.add(value)
+
+    assert aggregate.summary("load_power") == {
+        "load_power_min": 1.0,
+        "load_power_max": 3.0,
+        "load_power_mean": 2.0,
+        "load_power_last": 2.0,
+    }
+
+
+def test_running_aggregate_without_samples():
+    assert RunningAggregate().summary("load_power") == {}
+
+
+def test_sampler_collect_resets_aggregates():
+    values = iter(
+        [{"load_power": 10, "state": "on"}, {"load_power": 20}, {"load_power": 5}]
+    )
+    sampler = Sampler(lambda: next(values), interval=1.0)
+
+    sampler.sample()
+    sampler.sample()
+    assert sampler.collect() == {
+        "load_power_min": 10,
+        "load_power_max": 20,
+        "load_power_mean": 15.0,
+        "load_power_last": 20,
+    }
+
+    sampler.sample()
+    assert sampler.collect()["load_power_mean"] == 5.0
+    assert sampler.collect() == {}
+
+
+def test_sampler_keeps_sampling_after_errors():
+    read = mock.Mock(
+        side_effect=[IOError("no response"), {"load_power": 1}] + [{}] * 1000
+    )
+    sampler = Sampler(read, interval=0.01).start()
+    time.sleep(0.1)
+    sampler.stop()
+
+    assert read.call_count > 2
+    assert sampler.collect()["load_power_last"] == 1
+
+
+@pytest.fixture
+def fake_modbus():
+    return create_fake_modbus()
+
+
+def test_probe_reports_sampled_live_readings(fake_modbus):
+    with mock.patch.object(ModbusBus, "_buses", {}), mock.patch(
+        "probes.renogy.renogy_rover._create_controller"
+    ) as mock_create_controller:
+        mock_create_controller.return_value = fake_modbus
+        probe = RenogyRover(
+            "/dev/ttyUSB0",
+            1,
+            keys=["solar_current", "charging_state"],
+            sample_interval=0.01,
+        )
+        time.sleep(0.1)
+        data = probe.poll()
+        probe.stop()
+
+    assert data["solar_current_min"] == data["solar_current_max"] == 24.4
+    assert data["solar_current_last"] == 24.4
+    assert "charging_state_min" not in data
+    assert "load_power_min" not in data, "only requested keys are sampled"
+    sampled = [
+        c for c in fake_modbus.read_register.call_args_list if c.args[0] == 0x0108
+    ]
+    assert sampled, "the live register is read on its own between polls"
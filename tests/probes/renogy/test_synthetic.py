@@ -0,0 +1,98 @@
+import pytest
+
+from probes.renogy import SyntheticRover
+from probes.renogy.registers import REGISTER_MAP
+from probes.renogy.synthetic import SolarSite, SyntheticRoverModel
+from probes.renogy.types import ChargingState, Fault
+
+# 2023-10-04 00:00:00 UTC
+MIDNIGHT = 1696377600.0
+
+
+def test_model_generates_every_key():
+    model = SyntheticRoverModel(start=MIDNIGHT, seed=1)
+
+    sample = model.sample()
+
+    assert sorted(sample) == sorted(register.key for register in REGISTER_MAP)
+
+
+def test_model_is_deterministic_with_a_seed():
+    first = SyntheticRoverModel(start=MIDNIGHT, interval=300, seed=1).generate(100)
+    second = SyntheticRoverModel(start=MIDNIGHT, interval=300, seed=1).generate(100)
+
+    assert first == second
+
+
+def test_model_charges_during_the_day_only():
+    model = SyntheticRoverModel(start=MIDNIGHT, interval=3600, seed=1)
+
+    night, _, _, _, _, _, _, _, _, _, _, _, noon = model.generate(13)
+
+    assert night["solar_voltage"] == 0
+    assert night["charging_power"] == 0
+    assert night["charging_state"] == ChargingState.DEACTIVATED
+    assert noon["solar_voltage"] > 0
+    assert noon["charging_state"] != ChargingState.DEACTIVATED
+
+
+def test_model_integrates_state_of_charge():
+    model = SyntheticRoverModel(start=MIDNIGHT, interval=600, seed=1)
+
+    samples = model.generate(6 * 24)
+    percentages = [sample["battery_percentage"] for sample in samples]
+
+    # discharges overnight, charges during the day
+    assert percentages[6 * 5] < percentages[0]
+    assert max(percentages[6 * 6 : 6 * 18]) > percentages[6 * 6]
+
+
+def test_model_resets_daily_totals():
+    model = SyntheticRoverModel(start=MIDNIGHT, interval=600, seed=1)
+
+    samples = model.generate(6 * 24 + 1)
+
+    assert samples[-2]["power_generation_today"] > 0
+    assert samples[-1]["power_generation_today"] == 0
+    assert samples[-1]["total_operating_days"] == 2
+    assert (
+        samples[-1]["cumulative_power_generation"]
+        >= samples[-2]["power_generation_today"]
+    )
+
+
+def test_model_cuts_the_load_when_over_discharged():
+    site = SolarSite(panel_watts=0, base_load=100)
+    model = SyntheticRoverModel(site, start=MIDNIGHT, interval=600, state_of_charge=0.1)
+
+    sample = model.generate(6 * 12)[-1]
+
+    assert sample["load_power"] == 0
+    assert sample["controller_fault_information"] == [Fault.BATTERY_OVER_DISCHARGE]
+    assert sample["total_battery_over_discharges"] == 1
+
+
+def test_model_batches():
+    model = SyntheticRoverModel(start=MIDNIGHT, seed=1)
+
+    batches = list(model.batches(2500, batch_size=1000))
+
+    assert [len(batch) for batch in batches] == [1000, 1000, 500]
+    assert model.timestamp == MIDNIGHT + 2499 * model.interval
+
+
+def test_probe_advances_by_interval():
+    probe = SyntheticRover(
+        interval=3600, start=MIDNIGHT, seed=1, keys=["solar_voltage"], panel_watts=200
+    )
+
+    data = [probe.poll() for _ in range(13)]
+
+    assert data[0] == {"solar_voltage": 0.0}
+    assert data[12]["solar_voltage"] > 0
+    assert probe.model.timestamp == MIDNIGHT + 12 * 3600
+
+
+def test_probe_rejects_unknown_site_options():
+    with pytest.raises(TypeError):
+        SyntheticRover(solar_panels=3)
@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+from unittest import mock
+
+import minimalmodbus
+import pytest
+
+from probes.renogy.transport import TransportPolicy
+
+
+@pytest.fixture
+def serial():
+    return mock.Mock(timeout=None)
+
+
+@pytest.fixture(autouse=True)
+def sleep():
+    with mock.patch("probes.renogy.transport.time.sleep") as sleep:
+        yield sleep
+
+
+def test_call_returns_value(serial):
+    policy = TransportPolicy(timeout=0.5)
+
+    assert policy.call("telemetry", serial, lambda: 42) == 42
+    assert serial.timeout == 0.5
+    assert policy.stats["telemetry"].requests == 1
+    assert policy.stats["telemetry"].latency is not None
+
+
+def test_call_retries_with_bounded_backoff(serial, sleep):
+    policy = TransportPolicy(retries=3, backoff=0.1, max_backoff=0.25)
+    request = mock.Mock(
+        side_effect=[
+            minimalmodbus.NoResponseError("timeout"),
+            minimalmodbus.InvalidResponseError("Checksum error in rtu mode"),
+            minimalmodbus.InvalidResponseError("Wrong slave address"),
+            7,
+        ]
+    )
+
+    assert policy.call("settings", serial, request) == 7
+    assert sleep.call_args_list == [mock.call(0.1), mock.call(0.2), mock.call(0.25)]
+
+    stats = policy.stats["settings"]
+    assert (stats.requests, stats.retries, stats.failures) == (4, 3, 0)
+    assert (stats.timeouts, stats.crc_errors, stats.invalid_responses) == (1, 1, 1)
+
+
+def test_call_gives_up_after_retries(serial):
+    policy = TransportPolicy(retries=1)
+    request = mock.Mock(side_effect=minimalmodbus.NoResponseError("timeout"))
+
+    with pytest.raises(minimalmodbus.NoResponseError):
+        policy.call("system", serial, request)
+    assert request.call_count == 2
+    assert policy.stats["system"].failures == 1
+
+
+def test_call_does_not_retry_other_errors(serial):
+    policy = TransportPolicy(retries=3)
+    request = mock.Mock(side_effect=minimalmodbus.IllegalRequestError("illegal"))
+
+    with pytest.raises(minimalmodbus.IllegalRequestError):
+        policy.call("system", serial, request)
+    assert request.call_count == 1
+
+
+def test_timeout_adapts_to_latency():
+    policy = TransportPolicy(
+        timeout=0.5, min_timeout=0.1, max_timeout=2.0, latency_factor=4.0
+    )
+    assert policy.timeout("telemetry") == 0.5
+
+    policy.call("telemetry", mock.Mock(), lambda: 1)
+    policy.stats["telemetry"].latency = 0.05
+    assert policy.timeout("telemetry") == pytest.approx(0.2)
+
+    policy.stats["telemetry"].latency = 0.001
+    assert policy.timeout("telemetry") == 0.1
+
+    policy.stats["telemetry"].latency = 1.0
+    assert policy.timeout("telemetry") == 2.0
+
+
+def test_timeout_is_extended_after_a_timeout(serial):
+    policy = TransportPolicy(timeout=0.2, retries=1)
+    timeouts = []
+
+    def request():
+        timeouts.append(serial.timeout)
+        if len(timeouts) == 1:
+            raise minimalmodbus.NoResponseError("timeout")
+
+    policy.call("telemetry", serial, request)
+    assert timeouts == [0.2, 0.4]
+
+
+def test_metrics():
+    policy = TransportPolicy()
+    policy.call("telemetry", mock.Mock(), lambda: 1)
+
+    assert list(policy.metrics()) == [
+        "modbus_telemetry_latency",
+        "modbus_telemetry_timeout",
+    ]
+    counters = policy.counters()
+    assert counters["modbus_telemetry_requests"] == 1
+    assert counters["modbus_telemetry_timeouts"] == 0
+    assert "modbus_telemetry_latency" not in counters
+
+
+def test_timeout_is_set_inside_the_transaction(serial):
+    policy = TransportPolicy(timeout=0.3)
+    timeouts = []
+
+    @contextmanager
+    def transaction():
+        timeouts.append(serial.timeout)
+        yield
+
+    policy.call("telemetry", serial, lambda: 1, transaction)
+
+    assert timeouts == [None]
+    assert serial.timeout == 0.3
+
+
+def test_extended_timeout_is_never_below_the_configured_one(serial):
+    policy = TransportPolicy(timeout=5.0, retries=1)
+    timeouts = []
+
+    def request():
+        timeouts.append(serial.timeout)
+        if len(timeouts) == 1:
+            raise minimalmodbus.NoResponseError("timeout")
+
+    policy.call("telemetry", serial, request)
+    assert timeouts == [5.0, 5.0]
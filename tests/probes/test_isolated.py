@@ -0,0 +1,133 @@
+import os
+import time
+from typing import Optional
+
+import pytest
+
+from probes import Probe
+from probes.isolated import IsolatedProbe, isolated
+
+
+class EchoProbe(Probe):
+    def __init__(
+        self,
+        value: float = 1.0,
+        hang_on: int = 0,
+        fail_on: int = 0,
+        stopped_file: Optional[str] = None,
+    ) -> None:
+        self.value = value
+        self.hang_on = hang_on
+        self.fail_on = fail_on
+        self.stopped_file = stopped_file
+        self.polls = 0
+
+    def stop(self) -> None:
+        if self.stopped_file:
+            with open(self.stopped_file, "w") as fd:
+                fd.write(str(self.polls))
+
+    def poll(self) -> dict:
+        self.polls += 1
+        if self.polls == self.hang_on:
+            time.sleep(60)
+        if self.polls == self.fail_on:
+            raise ValueError("poll failure")
+        return {"value": self.value, "polls": self.polls, "pid": os.getpid()}
+
+    def version(self) -> str:
+        return "3.0"
+
+
+class BrokenProbe(Probe):
+    def __init__(self) -> None:
+        raise ValueError("can't create probe")
+
+    def poll(self) -> dict:
+        return {}
+
+    def version(self) -> str:
+        return "0.0"
+
+
+@pytest.fixture
+def probes():
+    started: list[IsolatedProbe] = []
+    yield started
+    for probe in started:
+        probe.stop()
+
+
+def test_isolated_probe_is_named_after_the_probe(probes):
+    probe = isolated(EchoProbe)(value=2.5)
+    probes.append(probe)
+
+    assert probe.__class__.__name__ == "EchoProbe"
+    assert isolated(EchoProbe) is probe.__class__
+    assert probe.version() == "3.0"
+
+
+def test_isolated_probe_polls_in_a_worker_process(probes):
+    probe = isolated(EchoProbe)(value=2.5)
+    probes.append(probe)
+
+    first, second = probe.poll(), probe.poll()
+
+    assert first["value"] == 2.5
+    assert (first["polls"], second["polls"]) == (1, 2)
+    assert first["pid"] == second["pid"] == probe.pid != os.getpid()
+
+
+def test_isolated_probe_raises_poll_errors(probes):
+    probe = isolated(EchoProbe)(fail_on=1)
+    probes.append(probe)
+
+    with pytest.raises(ValueError, match="poll failure"):
+        probe.poll()
+    assert probe.poll()["polls"] == 2  # the worker survives
+
+
+def test_isolated_probe_restarts_hung_workers(probes):
+    probe = isolated(EchoProbe)(deadline=0.5, hang_on=2)
+    probes.append(probe)
+    pid = probe.poll()["pid"]
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        probe.poll()
+    assert time.monotonic() - start < 5
+
+    data = probe.poll()
+    assert data["pid"] != pid
+    assert data["polls"] == 1  # a fresh probe
+    assert probe.restarts == 1
+
+
+def test_isolated_probe_restarts_dead_workers(probes):
+    probe = isolated(EchoProbe)()
+    probes.append(probe)
+    pid = probe.pid
+    probe._process.kill()
+    probe._process.join()
+
+    data = probe.poll()
+
+    assert data["pid"] != pid
+    assert data["polls"] == 1
+    assert probe.restarts == 1
+
+
+def test_isolated_probe_reports_creation_errors():
+    with pytest.raises(ValueError, match="can't create probe"):
+        isolated(BrokenProbe)()
+
+
+def test_isolated_probe_stops_the_probe_in_its_worker(tmpdir):
+    stopped_file = str(tmpdir / "stopped")
+    probe = isolated(EchoProbe)(stopped_file=stopped_file)
+    probe.poll()
+
+    probe.stop()
+
+    with open(stopped_file) as fd:
+        assert fd.read() == "1"
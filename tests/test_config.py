@@ -1,8 +1,10 @@
 from typing import Any
+from unittest import mock
 import pytest
 from config import EngineConfig, load_config
 from probes import Probe
 from writers import MetricsWriter
+from writers.queued import QueuedWriter
 
 
 def write_config(tmpdir, config: str):
@@ -100,6 +102,140 @@ writers:
     assert config.writers == [Writer1(arg1=1, arg2="two")]
 
 
+def test_load_config_with_multiple_instances_of_a_probe(tmpdir):
+    config_yaml = """
+probes:
+  probe1:
+    - arg1: 1
+    - arg1: 2
+"""
+
+    filepath = write_config(tmpdir, config_yaml)
+
+    config = load_config(filepath, [Probe1], [Writer1])
+    assert config.probes == [Probe1(arg1=1), Probe1(arg1=2)]
+
+
+def test_load_config_with_concurrent_polling(tmpdir):
+    config_yaml = """
+concurrent: true
+poll_timeout: 2.5
+probes:
+  probe1:
+    arg1: 1
+"""
+
+    filepath = write_config(tmpdir, config_yaml)
+
+    config = load_config(filepath, [Probe1], [Writer1])
+    assert config.concurrent is True
+    assert config.poll_timeout == 2.5
+
+
+def test_load_config_with_queued_writer(tmpdir):
+    config_yaml = """
+writers:
+  writer1:
+    arg1: 1
+    arg2: two
+    queue:
+      max_size: 10
+      overflow: drop_oldest
+"""
+
+    filepath = write_config(tmpdir, config_yaml)
+
+    config = load_config(filepath, [Probe1], [Writer1])
+    (writer,) = config.writers
+    assert isinstance(writer, QueuedWriter)
+    assert writer.writer == Writer1(arg1=1, arg2="two")
+    assert writer.overflow == "drop_oldest"
+    writer.close()
+
+
+def test_load_config_with_probe_frequency(tmpdir):
+    config_yaml = """
+frequency: 30.0
+overrun: coalesce
+probes:
+  probe1:
+    arg1: 1
+    frequency: 2.0
+  probe2:
+    arg2: two
+"""
+
+    filepath = write_config(tmpdir, config_yaml)
+
+    config = load_config(filepath, [Probe1, Probe2], [Writer1])
+    assert config.overrun == "coalesce"
+    assert config.probes == [Probe1(arg1=1), Probe2(arg2="two")]
+    assert config.probes[0].frequency == 2.0
+    assert not hasattr(config.probes[1], "frequency")
+
+
+def test_load_config_with_isolated_probe(tmpdir):
+    config_yaml = """
+probes:
+  probe1:
+    arg1: 1
+    isolate:
+      deadline: 5.0
+"""
+
+    filepath = write_config(tmpdir, config_yaml)
+
+    with mock.patch("config.isolated") as isolated:
+        config = load_config(filepath, [Probe1], [Writer1])
+
+    isolated.assert_called_once_with(Probe1)
+    isolated.return_value.assert_called_once_with(deadline=5.0, arg1=1)
+    assert config.probes == [isolated.return_value.return_value]
+
+
+class BusProbe(Probe1):
+    shared_bus = "device"
+
+    def __init__(self, device: str) -> None:
+        self.arg1 = device
+
+
+def test_load_config_rejects_isolated_probes_sharing_a_bus(tmpdir):
+    config_yaml = """
+probes:
+  BusProbe:
+    - device: /dev/ttyUSB0
+      isolate: true
+    - device: /dev/ttyUSB0
+"""
+
+    filepath = write_config(tmpdir, config_yaml)
+
+    with pytest.raises(ValueError, match="share a bus"):
+        load_config(filepath, [BusProbe], [Writer1])
+
+
+def test_load_config_isolates_probes_on_their_own_bus(tmpdir):
+    config_yaml = """
+probes:
+  BusProbe:
+    - device: /dev/ttyUSB0
+      isolate: true
+    - device: /dev/ttyUSB1
+"""
+
+    filepath = write_config(tmpdir, config_yaml)
+
+    with mock.patch("config.isolated") as isolated:
+        config = load_config(filepath, [BusProbe], [Writer1])
+
+    isolated.return_value.assert_called_once_with(device="/dev/ttyUSB0")
+    assert config.probes == [
+        isolated.return_value.return_value,
+        BusProbe("/dev/ttyUSB1"),
+    ]
+
+
 def test_load_config_no_probes_no_writers(tmpdir, caplog):
     config_yaml = """
 frequency: 1.0
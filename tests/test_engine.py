@@ -1,11 +1,14 @@
+import asyncio
+import time
 from unittest import mock
 from unittest.mock import MagicMock
 
 import pytest
 
-from engine import Engine
+from engine import AsyncEngine, Engine, ProbeSchedule
 from probes import Probe
 from writers import MetricsWriter
+from writers.queued import QueuedWriter
 
 
 class ProbeOne(Probe):
@@ -96,3 +99,326 @@ def test_engine_run_continues_despite_polling_exceptions(mock_logger):
         writer.output_metrics.call_args_list == expected_writer_calls
     ), "both metrics should have been written despite the exception in between"
     mock_logger.exception.assert_called_with(exception)
+
+
+def test_engine_run_writes_each_record_of_a_device_list():
+    probe = MagicMock(spec=ProbeOne)
+    probe.poll.side_effect = [
+        [{"device_id": "a", "metric1": 1.0}, {"device_id": "b", "metric1": 2.0}],
+        KeyboardInterrupt,
+    ]
+    probe.version.return_value = "1.1"
+    writer = MagicMock(spec=MetricsWriter)
+
+    engine = Engine(probes=[probe], writers=[writer], frequency=0.0)
+    with pytest.raises(KeyboardInterrupt):
+        engine.run()
+
+    assert writer.output_metrics.call_args_list == [
+        mock.call("ProbeOne", "1.1", {"device_id": "a", "metric1": 1.0}),
+        mock.call("ProbeOne", "1.1", {"device_id": "b", "metric1": 2.0}),
+    ]
+
+
+class SlowProbe(Probe):
+    def __init__(self, name: str, delays: list[float]) -> None:
+        self.name = name
+        self.delays = delays
+        self.polls = 0
+
+    def poll(self) -> dict:
+        if self.polls == len(self.delays):
+            raise KeyboardInterrupt
+        time.sleep(self.delays[self.polls])
+        self.polls += 1
+        return {self.name: float(self.polls)}
+
+    def version(self) -> str:
+        return "1.0"
+
+
+def test_engine_concurrent_polls_probes_in_parallel():
+    probes = [SlowProbe("one", [0.2, 0.2]), SlowProbe("two", [0.2, 0.2])]
+    writer = MagicMock(spec=MetricsWriter)
+
+    engine = Engine(probes=probes, writers=[writer], frequency=0.0, concurrent=True)
+    start = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        engine.run()
+
+    assert time.monotonic() - start < 0.7  # 0.8s when polled one after the other
+    assert writer.output_metrics.call_args_list == [
+        mock.call("SlowProbe", "1.0", {"one": 1.0}),
+        mock.call("SlowProbe", "1.0", {"two": 1.0}),
+        mock.call("SlowProbe", "1.0", {"one": 2.0}),
+        mock.call("SlowProbe", "1.0", {"two": 2.0}),
+    ]
+
+
+def test_engine_concurrent_skips_probes_that_time_out():
+    # the hung probe's second poll stops the engine
+    hung = SlowProbe("hung", [0.5])
+    fast = SlowProbe("fast", [0.0] * 100)
+    writer = MagicMock(spec=MetricsWriter)
+
+    engine = Engine(
+        probes=[hung, fast],
+        writers=[writer],
+        frequency=0.1,
+        concurrent=True,
+        poll_timeout=0.05,
+    )
+    with pytest.raises(KeyboardInterrupt):
+        engine.run()
+
+    written = [call.args[2] for call in writer.output_metrics.call_args_list]
+    assert len(written) >= 3
+    assert written == [{"fast": float(i)} for i in range(1, len(written) + 1)]
+    # the hung probe was not polled again until its first poll returned
+    assert hung.polls == 1
+
+
+def test_probe_schedule_advances_at_a_fixed_rate():
+    schedule = ProbeSchedule(period=2.0, next_tick=100.0)
+
+    schedule.advance(now=100.5)
+    assert schedule.next_tick == 102.0
+    schedule.advance(now=102.9)
+    assert schedule.next_tick == 104.0  # no drift from the time spent polling
+    assert schedule.overruns == 0
+
+
+def test_probe_schedule_skips_overrun_ticks():
+    schedule = ProbeSchedule(period=2.0, next_tick=100.0)
+
+    schedule.advance(now=105.0)
+
+    assert schedule.next_tick == 106.0
+    assert schedule.overruns == 1
+    assert schedule.missed_ticks == 2
+
+
+def test_probe_schedule_coalesces_overrun_ticks():
+    schedule = ProbeSchedule(period=2.0, next_tick=100.0)
+
+    schedule.advance(now=105.0, overrun="coalesce")
+
+    assert schedule.next_tick == 104.0  # due right away, in place of 102 and 104
+    assert schedule.overruns == 1
+    assert schedule.missed_ticks == 1
+
+
+def test_engine_polls_probes_at_their_own_frequency():
+    fast = SlowProbe("fast", [0.0] * 100)
+    fast.frequency = 0.02
+    slow = SlowProbe("slow", [0.0])
+    writer = MagicMock(spec=MetricsWriter)
+
+    # the slow probe's second poll, after 0.3s, stops the engine
+    engine = Engine(probes=[fast, slow], writers=[writer], frequency=0.3)
+    with pytest.raises(KeyboardInterrupt):
+        engine.run()
+
+    assert slow.polls == 1
+    assert 10 <= fast.polls <= 17
+
+
+def test_engine_rejects_unknown_overrun_policy():
+    with pytest.raises(ValueError):
+        Engine(overrun="catch_up")
+
+
+class AsyncProbe(Probe):
+    def __init__(self, name: str, delay: float) -> None:
+        self.name = name
+        self.delay = delay
+        self.polls = 0
+
+    def poll(self) -> dict:
+        raise AssertionError("the async engine should use poll_async")
+
+    async def poll_async(self) -> dict:
+        await asyncio.sleep(self.delay)
+        self.polls += 1
+        return {self.name: float(self.polls)}
+
+    def version(self) -> str:
+        return "2.0"
+
+
+class RecordingWriter(MetricsWriter):
+    def __init__(self) -> None:
+        self.calls: list[tuple] = []
+
+    def output_metrics(self, provider, version, data):
+        self.calls.append((provider, version, data))
+
+
+def run_async_engine(engine: AsyncEngine, duration: float) -> None:
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(engine.run(), duration)
+
+    asyncio.run(run())
+
+
+def test_async_engine_overlaps_async_probes():
+    probes = [AsyncProbe(f"probe{i}", delay=0.1) for i in range(20)]
+    writer = RecordingWriter()
+
+    run_async_engine(AsyncEngine(probes=probes, writers=[writer], frequency=1.0), 0.3)
+
+    # polled one after the other, they would have taken 2s
+    assert all(probe.polls == 1 for probe in probes)
+    written = {key: value for _, _, data in writer.calls for key, value in data.items()}
+    assert written == {f"probe{i}": 1.0 for i in range(20)}
+
+
+def test_async_engine_runs_sync_probes_and_writers_in_executor():
+    probe = SlowProbe("sync", [0.0] * 100)
+    writer = RecordingWriter()
+
+    run_async_engine(AsyncEngine(probes=[probe], writers=[writer], frequency=0.1), 0.25)
+
+    assert writer.calls == [
+        ("SlowProbe", "1.0", {"sync": 1.0}),
+        ("SlowProbe", "1.0", {"sync": 2.0}),
+        ("SlowProbe", "1.0", {"sync": 3.0}),
+    ]
+
+
+def test_async_engine_times_out_slow_probes():
+    slow = AsyncProbe("slow", delay=1.0)
+    fast = AsyncProbe("fast", delay=0.0)
+    writer = RecordingWriter()
+
+    engine = AsyncEngine(
+        probes=[slow, fast], writers=[writer], frequency=0.1, poll_timeout=0.05
+    )
+    run_async_engine(engine, 0.25)
+
+    assert slow.polls == 0
+    assert fast.polls == 3
+    assert [data for _, _, data in writer.calls] == [
+        {"fast": 1.0},
+        {"fast": 2.0},
+        {"fast": 3.0},
+    ]
+
+
+def test_engine_records_stats():
+    failing = MagicMock(spec=ProbeTwo)
+    failing.poll.side_effect = Exception("polling failure")
+    probe = SlowProbe("one", [0.0, 0.0])
+    writer = RecordingWriter()
+
+    engine = Engine(probes=[failing, probe], writers=[writer], frequency=0.0)
+    with pytest.raises(KeyboardInterrupt):
+        engine.run()
+
+    assert engine.stats.poll_latency["SlowProbe"].count == 3
+    assert engine.stats.poll_errors == {"ProbeTwo": 3}
+    assert engine.stats.write_latency["RecordingWriter"].count == 2
+    assert engine.stats.cycle_duration.count == 2
+
+
+def test_engines_close_writers_when_stopping():
+    probe = SlowProbe("one", [0.0])
+    writer = MagicMock(spec=MetricsWriter)
+    writer.close.side_effect = Exception("close failure")
+    other_writer = MagicMock(spec=MetricsWriter)
+
+    with pytest.raises(KeyboardInterrupt):
+        Engine(probes=[probe], writers=[writer, other_writer], frequency=0.0).run()
+    assert writer.close.call_count == 1
+    assert other_writer.close.call_count == 1
+
+    writer = RecordingWriter()
+    writer.close = MagicMock()
+    run_async_engine(
+        AsyncEngine(probes=[AsyncProbe("one", 0.0)], writers=[writer]), 0.1
+    )
+    assert writer.close.call_count == 1
+
+
+def test_engines_stop_probes_when_stopping():
+    failing = MagicMock(spec=ProbeTwo)
+    failing.poll.side_effect = KeyboardInterrupt
+    failing.stop.side_effect = Exception("stop failure")
+    probe = MagicMock(spec=ProbeOne)
+    probe.poll.return_value = {}
+
+    with pytest.raises(KeyboardInterrupt):
+        Engine(probes=[failing, probe], frequency=0.0).run()
+    assert failing.stop.call_count == 1
+    assert probe.stop.call_count == 1
+
+    probe = AsyncProbe("one", 0.0)
+    probe.stop = MagicMock()
+    run_async_engine(AsyncEngine(probes=[probe]), 0.1)
+    assert probe.stop.call_count == 1
+
+
+class HungProbe(Probe):
+    def __init__(self) -> None:
+        self.polls = 0
+
+    def poll(self) -> dict:
+        self.polls += 1
+        time.sleep(0.5)
+        return {"hung": 1.0}
+
+    def version(self) -> str:
+        return "1.0"
+
+
+def test_async_engine_skips_probes_until_their_late_poll_returns():
+    hung = HungProbe()
+    fast = AsyncProbe("fast", delay=0.0)
+    writer = RecordingWriter()
+
+    engine = AsyncEngine(
+        probes=[hung, fast], writers=[writer], frequency=0.05, poll_timeout=0.05
+    )
+    run_async_engine(engine, 0.4)
+
+    assert hung.polls == 1
+    assert engine.stats.poll_timeouts == {"HungProbe": 1}
+    assert fast.polls >= 6
+    assert all("hung" not in data for _, _, data in writer.calls)
+
+
+class OtherRecordingWriter(RecordingWriter):
+    pass
+
+
+def test_engine_records_stats_of_queued_writers_by_writer():
+    probe = SlowProbe("one", [0.0, 0.0, 0.0])
+    writers = [QueuedWriter(RecordingWriter()), QueuedWriter(OtherRecordingWriter())]
+
+    engine = Engine(probes=[probe], writers=writers, frequency=0.0)
+    with pytest.raises(KeyboardInterrupt):
+        engine.run()
+
+    assert sorted(engine.stats.write_latency) == [
+        "OtherRecordingWriter",
+        "RecordingWriter",
+    ]
+    assert engine.stats.write_latency["RecordingWriter"].count == 3
+    assert engine.stats.write_latency["OtherRecordingWriter"].count == 3
+
+
+class ReportingProbe(SlowProbe):
+    def metrics(self) -> dict[str, float]:
+        return {"probe_bus_utilization": 0.5}
+
+
+def test_engine_exports_the_metrics_of_probes_and_writers():
+    probe, other = ReportingProbe("one", [0.0]), SlowProbe("two", [0.0])
+    writer = QueuedWriter(RecordingWriter())
+
+    engine = Engine(probes=[probe, other], writers=[writer], frequency=0.0)
+    with pytest.raises(KeyboardInterrupt):
+        engine.run()
+
+    assert engine.stats.sources == [probe, writer]
@@ -0,0 +1,76 @@
+from prometheus_client import CollectorRegistry, generate_latest
+
+from instrumentation import EngineStats, Histogram
+
+
+class StatsCollector:
+    def __init__(self, stats: EngineStats) -> None:
+        self.stats = stats
+
+    def collect(self):
+        return self.stats.collect()
+
+
+def scrape(stats: EngineStats) -> str:
+    registry = CollectorRegistry()
+    registry.register(StatsCollector(stats))
+    return generate_latest(registry).decode()
+
+
+def test_histogram_counts_observations_per_bucket():
+    histogram = Histogram(buckets=(0.1, 1.0, float("inf")))
+
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.cumulative() == ([("0.1", 2), ("1.0", 3), ("+Inf", 4)], 2.65)
+
+
+def test_engine_stats_are_exported():
+    stats = EngineStats()
+    stats.poll_latency["RenogyRover"].observe(0.2)
+    stats.write_latency["Sql"].observe(0.01)
+    stats.cycle_duration.observe(0.25)
+    stats.poll_errors["RenogyRover"] += 1
+    stats.overruns["PSUtil"] += 2
+
+    output = scrape(stats)
+
+    assert (
+        'solarstats_poll_duration_seconds_bucket{le="0.25",probe="RenogyRover"} 1.0'
+        in output
+    )
+    assert 'solarstats_poll_duration_seconds_count{probe="RenogyRover"} 1.0' in output
+    assert 'solarstats_write_duration_seconds_sum{writer="Sql"} 0.01' in output
+    assert "solarstats_cycle_duration_seconds_count 1.0" in output
+    assert 'solarstats_poll_errors_total{probe="RenogyRover"} 1.0' in output
+    assert 'solarstats_overruns_total{probe="PSUtil"} 2.0' in output
+
+
+def test_engine_stats_export_source_metrics():
+    class Source:
+        def metrics(self):
+            return {"writer_sql_queue_depth": 3}
+
+    stats = EngineStats()
+    stats.sources = [Source()]
+
+    assert "solarstats_writer_sql_queue_depth 3.0" in scrape(stats)
+
+
+def test_engine_stats_export_source_counters():
+    class Source:
+        def metrics(self):
+            return {}
+
+        def counters(self):
+            return {"writer_sql_dropped": 4}
+
+    stats = EngineStats()
+    stats.sources = [Source()]
+
+    output = scrape(stats)
+    assert "# TYPE solarstats_writer_sql_dropped_total counter" in output
+    assert "solarstats_writer_sql_dropped_total 4.0" in output
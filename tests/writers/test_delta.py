@@ -0,0 +1,202 @@
+from datetime import datetime, timedelta
+import json
+import zlib
+
+import pytest
+from sqlalchemy import func, select
+
+from probes.renogy import RenogyRoverSimulator, SyntheticRover
+from writers.delta import BLOCK_TABLE, CHUNK_TABLE, decode_block, encode_block
+from writers.sql import Sql, read_samples
+
+START = datetime(2023, 10, 4, 12, 0, 0)
+
+
+@pytest.fixture
+def connection(tmpdir):
+    return f"sqlite+pysqlite:///{tmpdir}/delta.sqlite"
+
+
+def test_blocks_reconstruct_every_sample():
+    samples = [
+        (START, {"battery_voltage": 12.6, "charging_state": 2, "faults": []}),
+        (
+            START + timedelta(seconds=5),
+            {"battery_voltage": 12.7, "charging_state": 2, "faults": [3]},
+        ),
+        (START + timedelta(seconds=10.5), {"battery_voltage": 12.7, "load": None}),
+        (START + timedelta(seconds=15), {"battery_voltage": 12.7, "load": None}),
+    ]
+
+    assert list(decode_block(START, encode_block(samples))) == samples
+
+
+def test_blocks_only_hold_changes():
+    samples = [
+        (START + timedelta(seconds=i), {"battery_voltage": 12.6, "serial": 1234})
+        for i in range(3)
+    ]
+
+    lines = zlib.decompress(encode_block(samples)).decode().splitlines()
+
+    assert [json.loads(line) for line in lines] == [
+        {"v": 2, "k": {"battery_voltage": 12.6, "serial": 1234}},
+        [1000, {}],
+        [2000, {}],
+    ]
+
+
+def test_blocks_decode_the_first_format():
+    block = {
+        "v": 1,
+        "t": [0, 1000],
+        "k": {"battery_voltage": 12.6, "load": 1},
+        "d": [[{"battery_voltage": 12.7}, ["load"]]],
+    }
+
+    assert list(decode_block(START, zlib.compress(json.dumps(block).encode()))) == [
+        (START, {"battery_voltage": 12.6, "load": 1}),
+        (START + timedelta(seconds=1), {"battery_voltage": 12.7}),
+    ]
+
+
+def test_blocks_reject_unknown_formats():
+    block = json.loads(zlib.decompress(encode_block([(START, {"load": 1})])))
+    block["v"] = 99
+
+    with pytest.raises(ValueError):
+        list(decode_block(START, zlib.compress(json.dumps(block).encode())))
+
+
+def test_writer_stores_a_block_per_probe(connection):
+    writer = Sql(connection, layout="delta", batch_size=4)
+    for i in range(4):
+        writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.0 + i})
+    writer.output_metrics("PSUtil", "0.1", {"cpu_percent": 5.0})
+    writer.close()
+
+    with writer._engine.connect() as db:
+        blocks = db.execute(
+            select(BLOCK_TABLE.c.probe, BLOCK_TABLE.c.count).order_by(BLOCK_TABLE.c.id)
+        ).all()
+    assert blocks == [("RenogyRover", 4), ("PSUtil", 1)]
+
+    samples = read_samples(writer._engine, "delta", "RenogyRover", limit=3)
+    assert [data for _, data in samples] == [
+        {"battery_voltage": 12.0 + i} for i in range(3)
+    ]
+
+
+def test_blocks_span_inserts_until_the_keyframe_interval(connection):
+    writer = Sql(connection, layout="delta", keyframe_interval=3)
+    for i in range(7):
+        writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.0 + i})
+    writer.close()
+
+    with writer._engine.connect() as db:
+        counts = db.scalars(
+            select(BLOCK_TABLE.c.count).order_by(BLOCK_TABLE.c.id)
+        ).all()
+    assert counts == [3, 3, 1]
+
+    samples = read_samples(writer._engine, "delta")
+    assert [data for _, data in samples] == [
+        {"battery_voltage": 12.0 + i} for i in range(7)
+    ]
+
+
+def test_open_blocks_only_append_chunks(connection):
+    writer = Sql(connection, layout="delta")
+    for i in range(3):
+        writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.0 + i})
+
+    with writer._engine.connect() as db:
+        assert db.execute(select(BLOCK_TABLE.c.count, BLOCK_TABLE.c.payload)).all() == [
+            (3, b"")
+        ]
+        assert db.scalar(select(func.count()).select_from(CHUNK_TABLE)) == 3
+    samples = read_samples(writer._engine, "delta")
+    assert [data for _, data in samples] == [
+        {"battery_voltage": 12.0 + i} for i in range(3)
+    ]
+
+    writer.close()
+    with writer._engine.connect() as db:
+        assert db.scalar(select(func.count()).select_from(CHUNK_TABLE)) == 0
+    samples = read_samples(writer._engine, "delta")
+    assert len(list(samples)) == 3
+
+
+def test_failed_inserts_start_a_new_block(connection):
+    writer = Sql(connection, layout="delta")
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.0})
+    with pytest.raises(TypeError):
+        writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": object()})
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.2})
+    writer.close()
+
+    samples = read_samples(writer._engine, "delta")
+    assert [data for _, data in samples] == [
+        {"battery_voltage": 12.0},
+        {"battery_voltage": 12.2},
+    ]
+
+
+def test_reading_blocks_of_several_probes_requires_a_probe(connection):
+    writer = Sql(connection, layout="delta")
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.0})
+    writer.output_metrics("PSUtil", "0.1", {"cpu_percent": 5.0})
+    writer.close()
+
+    with pytest.raises(ValueError, match="several probes"):
+        list(read_samples(writer._engine, "delta"))
+    assert [data for _, data in read_samples(writer._engine, "delta", "PSUtil")] == [
+        {"cpu_percent": 5.0}
+    ]
+
+
+def test_delta_layout_is_ten_times_smaller(connection):
+    probe = SyntheticRover(interval=5, start=START.timestamp(), seed=1)
+    samples = [probe.poll() for _ in range(720)]  # an hour
+    # the default flush settings, every record is inserted on its own
+    writer = Sql(connection, layout="delta")
+    for sample in samples:
+        writer.output_metrics("SyntheticRover", "0.1", sample)
+    writer.close()
+
+    with writer._engine.connect() as db:
+        stored = db.scalar(select(func.sum(func.length(BLOCK_TABLE.c.payload))))
+    documents = sum(len(json.dumps(sample)) for sample in samples)
+    assert documents / stored >= 10
+
+    replayed = [data for _, data in read_samples(writer._engine, "delta")]
+    assert replayed == json.loads(json.dumps(samples))
+
+
+def test_simulator_replays_the_delta_layout(connection):
+    writer = Sql(connection, layout="delta", batch_size=10)
+    for voltage in (12.1, 12.2):
+        writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": voltage})
+    writer.close()
+
+    simulator = RenogyRoverSimulator(connection, layout="delta")
+
+    assert [simulator.poll()["battery_voltage"] for _ in range(3)] == [12.1, 12.2, 12.1]
+
+
+def test_retention_prunes_blocks_and_their_chunks(connection):
+    writer = Sql(connection, layout="delta")
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.0})
+    # left open, like after a crash
+    writer._connection.close()
+    with writer._engine.begin() as db:
+        db.execute(BLOCK_TABLE.update().values(start=START, end=START))
+
+    writer = Sql(connection, layout="delta", retention=1)
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 13.0})
+
+    samples = read_samples(writer._engine, "delta")
+    assert [data for _, data in samples] == [{"battery_voltage": 13.0}]
+    with writer._engine.connect() as db:
+        assert db.scalar(select(func.count()).select_from(CHUNK_TABLE)) == 1
+    writer.close()
@@ -0,0 +1,153 @@
+import threading
+import time
+from unittest import mock
+from unittest.mock import MagicMock
+
+import pytest
+
+from instrumentation import Histogram
+from writers import MetricsWriter
+from writers.queued import QueuedWriter
+
+
+class BlockedWriter(MetricsWriter):
+    """
+    Writes nothing until `release` is set
+    """
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.written: list[dict] = []
+
+    def output_metrics(self, provider, version, data):
+        self.started.set()
+        self.release.wait()
+        self.written.append(data)
+
+
+def fill(queued: QueuedWriter, writer: BlockedWriter, count: int) -> None:
+    # the first record is taken by the writer thread, the others wait in the queue
+    queued.output_metrics("Probe", "1.0", {"value": 0})
+    assert writer.started.wait(1)
+    for i in range(1, count + 1):
+        queued.output_metrics("Probe", "1.0", {"value": i})
+
+
+def test_queued_writer_writes_in_order():
+    writer = MagicMock(spec=MetricsWriter)
+    queued = QueuedWriter(writer)
+
+    for i in range(3):
+        queued.output_metrics("Probe", "1.0", {"value": i})
+    queued.close()
+
+    assert writer.output_metrics.call_args_list == [
+        mock.call("Probe", "1.0", {"value": i}) for i in range(3)
+    ]
+    assert queued.metrics() == {
+        "writer_metricswriter_queue_depth": 0,
+        "writer_metricswriter_lag": pytest.approx(0, abs=0.5),
+    }
+    assert queued.counters() == {
+        "writer_metricswriter_written": 3,
+        "writer_metricswriter_dropped": 0,
+    }
+
+
+def test_queued_writer_drop_newest():
+    writer = BlockedWriter()
+    queued = QueuedWriter(writer, max_size=2, overflow="drop_newest")
+
+    fill(queued, writer, 4)
+    assert queued.metrics()["writer_blockedwriter_queue_depth"] == 2
+    writer.release.set()
+    queued.close()
+
+    assert [data["value"] for data in writer.written] == [0, 1, 2]
+    assert queued.dropped == 2
+
+
+def test_queued_writer_drop_oldest():
+    writer = BlockedWriter()
+    queued = QueuedWriter(writer, max_size=2, overflow="drop_oldest")
+
+    fill(queued, writer, 4)
+    writer.release.set()
+    queued.close()
+
+    assert [data["value"] for data in writer.written] == [0, 3, 4]
+    assert queued.dropped == 2
+
+
+def test_queued_writer_block():
+    writer = BlockedWriter()
+    queued = QueuedWriter(writer, max_size=1, overflow="block")
+    fill(queued, writer, 1)
+
+    producer = threading.Thread(
+        target=queued.output_metrics, args=("Probe", "1.0", {"value": 2})
+    )
+    producer.start()
+    time.sleep(0.05)
+    assert producer.is_alive(), "the queue is full, the producer should be waiting"
+
+    writer.release.set()
+    producer.join(1)
+    queued.close()
+
+    assert [data["value"] for data in writer.written] == [0, 1, 2]
+    assert queued.dropped == 0
+
+
+def test_queued_writer_survives_writer_exceptions():
+    writer = MagicMock(spec=MetricsWriter)
+    writer.output_metrics.side_effect = [Exception("writer failure"), None]
+    queued = QueuedWriter(writer)
+
+    queued.output_metrics("Probe", "1.0", {"value": 1})
+    queued.output_metrics("Probe", "1.0", {"value": 2})
+    queued.join()
+
+    assert writer.output_metrics.call_count == 2
+    assert queued.written == 1
+    queued.close()
+
+
+def test_queued_writer_rejects_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        QueuedWriter(MagicMock(spec=MetricsWriter), overflow="drop_everything")
+
+
+def test_queued_writer_close_is_bounded():
+    writer = BlockedWriter()
+    writer.close = MagicMock()
+    queued = QueuedWriter(writer, max_size=2)
+    fill(queued, writer, 2)
+
+    start = time.monotonic()
+    queued.close(timeout=0.1)
+
+    assert time.monotonic() - start < 0.5
+    writer.close.assert_not_called()
+
+    # the stalled write completes, the queued records are abandoned
+    writer.release.set()
+    queued._thread.join(1)
+    assert not queued._thread.is_alive()
+    assert [data["value"] for data in writer.written] == [0]
+
+
+def test_queued_writer_observes_write_latency():
+    writer = BlockedWriter()
+    queued = QueuedWriter(writer)
+    queued.latency = Histogram()
+
+    queued.output_metrics("Probe", "1.0", {"value": 0})
+    assert writer.started.wait(1)
+    time.sleep(0.05)
+    writer.release.set()
+    queued.close()
+
+    assert queued.latency.count == 1
+    assert queued.latency.sum >= 0.05
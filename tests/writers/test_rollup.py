@@ -0,0 +1,195 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from probes.renogy.types import ChargingState
+from writers.rollup import ROLLUP_TABLES, Rollups, bucket_start, numeric
+from writers.sql import Metric, Sql
+
+START = datetime(2023, 10, 4, 22, 0, 0)
+
+
+@pytest.fixture
+def engine(tmpdir):
+    return create_engine(f"sqlite+pysqlite:///{tmpdir}/rollup.sqlite")
+
+
+def rows(*samples: tuple[float, dict]) -> list[dict]:
+    return [
+        {
+            "probe": "RenogyRover",
+            "version": "0.1",
+            "created_at": START + timedelta(seconds=seconds),
+            "data": data,
+        }
+        for seconds, data in samples
+    ]
+
+
+def aggregates(engine, tier: str) -> list[tuple]:
+    table = ROLLUP_TABLES[tier]
+    with engine.connect() as connection:
+        return [
+            tuple(row)
+            for row in connection.execute(
+                select(
+                    table.c.key,
+                    table.c.bucket,
+                    table.c.count,
+                    table.c.min,
+                    table.c.max,
+                    table.c.avg,
+                    table.c.last,
+                ).order_by(table.c.bucket, table.c.key)
+            )
+        ]
+
+
+def test_bucket_start():
+    assert bucket_start(START + timedelta(seconds=59), 60) == START
+    assert bucket_start(START + timedelta(minutes=61), 3600) == START + timedelta(
+        hours=1
+    )
+    assert bucket_start(START + timedelta(hours=3), 86400) == datetime(2023, 10, 5)
+
+
+def test_numeric():
+    assert numeric(12.6) and numeric(3)
+    assert not numeric(True)
+    assert not numeric(ChargingState.MPPT)
+    assert not numeric("12.6")
+
+
+def test_rollups_write_open_buckets_with_every_insert(engine):
+    rollups = Rollups(engine, {"1m": None, "1h": None})
+    with engine.begin() as connection:
+        rollups.add(
+            connection,
+            rows(
+                (0, {"battery_voltage": 12.0, "charging_state": ChargingState.MPPT}),
+                (20, {"battery_voltage": 13.0, "charging_power": 100}),
+            ),
+        )
+    assert aggregates(engine, "1m") == [
+        ("battery_voltage", START, 2, 12.0, 13.0, 12.5, 13.0),
+        ("charging_power", START, 1, 100.0, 100.0, 100.0, 100.0),
+    ]
+
+    with engine.begin() as connection:
+        rollups.add(
+            connection, rows((40, {"battery_voltage": 12.2, "charging_power": 50}))
+        )
+        rollups.add(connection, rows((60, {"battery_voltage": 12.4})))
+    assert aggregates(engine, "1m") == [
+        ("battery_voltage", START, 3, 12.0, 13.0, pytest.approx(12.4), 12.2),
+        ("charging_power", START, 2, 50.0, 100.0, 75.0, 50.0),
+        ("battery_voltage", START + timedelta(minutes=1), 1, 12.4, 12.4, 12.4, 12.4),
+    ]
+    assert aggregates(engine, "1h") == [
+        ("battery_voltage", START, 4, 12.0, 13.0, pytest.approx(12.4), 12.4),
+        ("charging_power", START, 2, 50.0, 100.0, 75.0, 50.0),
+    ]
+
+
+def test_rollups_carry_on_buckets_written_by_a_previous_run(engine):
+    with engine.begin() as connection:
+        rollups = Rollups(engine, {"1m": None})
+        rollups.add(connection, rows((0, {"battery_voltage": 12.0})))
+
+        rollups = Rollups(engine, {"1m": None})
+        rollups.add(connection, rows((30, {"battery_voltage": 13.0})))
+        rollups.add(connection, rows((40, {"battery_voltage": 11.0})))
+
+    assert aggregates(engine, "1m") == [
+        ("battery_voltage", START, 3, 11.0, 13.0, 12.0, 11.0)
+    ]
+
+
+def test_rollups_reload_buckets_after_a_rollback(engine):
+    rollups = Rollups(engine, {"1m": None})
+    with engine.begin() as connection:
+        rollups.add(connection, rows((0, {"battery_voltage": 12.0})))
+    with pytest.raises(RuntimeError):
+        with engine.begin() as connection:
+            rollups.add(connection, rows((10, {"battery_voltage": 14.0})))
+            raise RuntimeError("database is locked")
+    rollups.reset()
+
+    with engine.begin() as connection:
+        rollups.add(connection, rows((20, {"battery_voltage": 13.0})))
+
+    assert aggregates(engine, "1m") == [
+        ("battery_voltage", START, 2, 12.0, 13.0, 12.5, 13.0)
+    ]
+
+
+def test_rollups_prune_past_their_retention(engine):
+    rollups = Rollups(engine, {"1m": 1, "1d": None})
+    with engine.begin() as connection:
+        rollups.add(
+            connection,
+            rows((0, {"battery_voltage": 12.0}), (86400, {"battery_voltage": 13.0})),
+        )
+        rollups.prune(connection, START + timedelta(days=1, minutes=1))
+
+    assert [row[1] for row in aggregates(engine, "1m")] == [START + timedelta(days=1)]
+    assert len(aggregates(engine, "1d")) == 2
+
+
+def test_rollups_reject_unknown_tiers(engine):
+    with pytest.raises(ValueError):
+        Rollups(engine, {"5m": None})
+
+
+def test_sql_writer_maintains_rollups_and_prunes_raw_records(tmpdir):
+    connection = f"sqlite+pysqlite:///{tmpdir}/writer.sqlite"
+    writer = Sql(connection)
+    for _ in range(2):
+        writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.0})
+    with writer._engine.begin() as db:
+        db.execute(Metric.__table__.update().values(created_at=START))
+    writer.close()
+
+    writer = Sql(connection, rollups={"1m": None, "1d": None}, retention=1)
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 13.0})
+    # written with the record rather than when the writer closes
+    assert len(aggregates(writer._engine, "1d")) == 1
+    writer.close()
+
+    with writer._engine.connect() as db:
+        assert db.scalar(select(func.count()).select_from(Metric)) == 1
+    assert [row[2:] for row in aggregates(writer._engine, "1d")] == [
+        (1, 13.0, 13.0, 13.0, 13.0)
+    ]
+
+
+def test_rollups_aggregate_each_device_separately(engine):
+    rollups = Rollups(engine, {"1m": None})
+    with engine.begin() as connection:
+        rollups.add(
+            connection,
+            rows(
+                (0, {"device_id": "rover-1", "battery_voltage": 12.0}),
+                (0, {"device_id": "rover-2", "battery_voltage": 14.0}),
+                (30, {"device_id": "rover-1", "battery_voltage": 13.0}),
+                (30, {"device_id": "rover-2", "battery_voltage": 14.0}),
+            ),
+        )
+
+    table = ROLLUP_TABLES["1m"]
+    with engine.connect() as connection:
+        aggregates = connection.execute(
+            select(
+                table.c.device_id,
+                table.c.key,
+                table.c.count,
+                table.c.min,
+                table.c.max,
+                table.c.avg,
+            ).order_by(table.c.device_id)
+        ).all()
+    assert aggregates == [
+        ("rover-1", "battery_voltage", 2, 12.0, 13.0, 12.5),
+        ("rover-2", "battery_voltage", 2, 14.0, 14.0, 14.0),
+    ]
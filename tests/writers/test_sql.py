@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
+import time
+
 import pytest
-from sqlalchemy import Engine, create_engine, select
+from sqlalchemy import Engine, create_engine, event, select
 from sqlalchemy.orm import Session
 
 from writers.sql import Metric, Sql
@@ -22,16 +24,101 @@ def writer(connection):
 
 
 def test_output_metrics(writer: Sql, engine):
-    provider = "test_provider"
+    probe = "test_probe"
     data = {"metric1": 1.0, "metric2": "pass", "metric3": False}
 
     created_threshold = datetime.utcnow()
-    writer.output_metrics(provider, "1.0", data)
+    writer.output_metrics(probe, "1.0", data)
 
     with Session(engine) as session:
         metric = session.scalar(select(Metric).limit(1))
 
     assert metric is not None
-    assert metric.provider == provider
+    assert metric.probe == probe
     assert metric.data == data
     assert metric.created_at - created_threshold < timedelta(seconds=2)
+
+
+def count_metrics(engine) -> int:
+    with Session(engine) as session:
+        return len(session.scalars(select(Metric)).all())
+
+
+@pytest.fixture
+def batch_connection(tmpdir):
+    # a file database, an in-memory one is private to each pooled connection
+    return f"sqlite+pysqlite:///{tmpdir}/batch.sqlite"
+
+
+def test_output_metrics_in_batches(batch_connection):
+    writer = Sql(batch_connection, batch_size=3, max_batch_age=60)
+
+    writer.output_metrics("test_probe", "1.0", {"metric1": 1.0})
+    writer.output_metrics("test_probe", "1.0", {"metric1": 2.0})
+    assert count_metrics(writer._engine) == 0
+
+    writer.output_metrics("test_probe", "1.0", {"metric1": 3.0})
+    with Session(writer._engine) as session:
+        metrics = session.scalars(select(Metric).order_by(Metric.id)).all()
+    assert [metric.data for metric in metrics] == [
+        {"metric1": float(i)} for i in (1, 2, 3)
+    ]
+    assert all(metric.probe == "test_probe" for metric in metrics)
+    assert metrics[0].created_at <= metrics[2].created_at
+    writer.close()
+
+
+def test_output_metrics_flushes_old_batches(batch_connection):
+    writer = Sql(batch_connection, batch_size=100, max_batch_age=0.05)
+
+    writer.output_metrics("test_probe", "1.0", {"metric1": 1.0})
+    time.sleep(0.3)
+
+    assert count_metrics(writer._engine) == 1
+    writer.close()
+
+
+def test_close_flushes_the_batch(batch_connection):
+    writer = Sql(batch_connection, batch_size=100, max_batch_age=60)
+    writer.output_metrics("test_probe", "1.0", {"metric1": 1.0})
+
+    writer.close()
+
+    assert count_metrics(create_engine(batch_connection)) == 1
+
+
+def test_output_metrics_reuses_one_connection(batch_connection):
+    writer = Sql(batch_connection)
+    connects = []
+    event.listen(writer._engine, "connect", lambda *args: connects.append(args))
+
+    for i in range(3):
+        writer.output_metrics("test_probe", "1.0", {"metric1": float(i)})
+
+    assert connects == []
+    assert count_metrics(writer._engine) == 3
+    writer.close()
+
+
+def test_failed_flushes_keep_the_batch(batch_connection, monkeypatch):
+    writer = Sql(batch_connection, batch_size=2, max_batch_age=60)
+    write = writer._write
+
+    def locked(connection, rows):
+        monkeypatch.setattr(writer, "_write", write)
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(writer, "_write", locked)
+    writer.output_metrics("test_probe", "1.0", {"metric1": 1.0})
+    with pytest.raises(RuntimeError):
+        writer.output_metrics("test_probe", "1.0", {"metric1": 2.0})
+    assert count_metrics(writer._engine) == 0
+
+    writer.output_metrics("test_probe", "1.0", {"metric1": 3.0})
+    writer.close()
+
+    with Session(create_engine(batch_connection)) as session:
+        metrics = session.scalars(select(Metric).order_by(Metric.id)).all()
+    assert [metric.data for metric in metrics] == [
+        {"metric1": float(i)} for i in (1, 2, 3)
+    ]
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import create_engine
+
+from writers.sql import Sql, read_samples
+from writers.sqlite import SQLITE_PROFILE, SqliteMaintenance, sqlite_profile
+
+
+@pytest.fixture
+def connection(tmpdir):
+    return f"sqlite+pysqlite:///{tmpdir}/tuned.sqlite"
+
+
+def pragma(writer: Sql, name: str):
+    with writer._engine.connect() as db:
+        return db.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_sqlite_profile_options():
+    assert sqlite_profile(None) is None
+    assert sqlite_profile(False) is None
+    assert sqlite_profile(True) == SQLITE_PROFILE
+    assert sqlite_profile({"mmap_size": 0})["mmap_size"] == 0
+    assert sqlite_profile({"mmap_size": 0})["journal_mode"] == "WAL"
+    with pytest.raises(ValueError):
+        sqlite_profile({"page_size": 4096})
+
+
+def test_writer_applies_the_sqlite_profile(connection):
+    writer = Sql(connection, sqlite={"cache_size": -1024})
+
+    assert pragma(writer, "journal_mode") == "wal"
+    assert pragma(writer, "synchronous") == 1  # NORMAL
+    assert pragma(writer, "cache_size") == -1024
+    assert pragma(writer, "auto_vacuum") == 2  # INCREMENTAL
+    writer.close()
+
+
+def test_writer_runs_sqlite_housekeeping(connection, caplog):
+    writer = Sql(connection, sqlite={"checkpoint_interval": 0, "vacuum_interval": 0})
+
+    with caplog.at_level("DEBUG", logger="writers.sqlite"):
+        writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.6})
+
+    assert "WAL pages" in caplog.text
+    assert "incremental vacuum" in caplog.text
+    assert [data for _, data in read_samples(writer._engine)] == [
+        {"battery_voltage": 12.6}
+    ]
+    writer.close()
+
+
+def test_sqlite_profile_requires_sqlite():
+    engine = create_engine("sqlite+pysqlite:///:memory:")
+    engine.dialect.name = "postgresql"
+
+    with pytest.raises(ValueError):
+        SqliteMaintenance(engine, SQLITE_PROFILE)
+
+
+def test_incremental_vacuum_releases_free_pages(connection):
+    writer = Sql(connection, sqlite={"vacuum_interval": 0, "vacuum_pages": 100})
+    writer.output_metrics("RenogyRover", "0.1", {"padding": "x" * 100_000})
+    with writer._engine.begin() as db:
+        db.exec_driver_sql("DELETE FROM metric")
+    free_pages = pragma(writer, "freelist_count")
+
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.6})
+
+    assert free_pages > 0
+    assert pragma(writer, "freelist_count") < free_pages
+    writer.close()
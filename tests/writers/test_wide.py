@@ -0,0 +1,195 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import Boolean, Float, Integer, String, create_engine, inspect, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import JSON
+
+from writers.sql import Sql, read_samples
+from writers.wide import column_type, table_name, widens
+
+
+@pytest.fixture
+def connection(tmpdir):
+    return f"sqlite+pysqlite:///{tmpdir}/wide.sqlite"
+
+
+@pytest.fixture
+def writer(connection):
+    return Sql(connection, layout="wide")
+
+
+def columns(connection, table: str) -> dict[str, type]:
+    return {
+        column["name"]: column["type"]
+        for column in inspect(create_engine(connection)).get_columns(table)
+    }
+
+
+def test_column_types():
+    assert isinstance(column_type(True), Boolean)
+    assert isinstance(column_type(12), Integer)
+    assert isinstance(column_type(12.6), Float)
+    assert isinstance(column_type("MPPT"), String)
+    assert isinstance(column_type([1, 2]), JSON)
+    assert column_type(None) is None
+
+
+def test_widens():
+    assert widens(Integer(), 12.5)
+    assert not widens(Integer(), 12)
+    assert not widens(Float(), 12)
+
+
+def test_table_name():
+    assert table_name("RenogyRover") == "metric_renogyrover"
+    assert table_name("my-probe.1") == "metric_my_probe_1"
+
+
+def test_output_metrics_creates_typed_columns(writer, connection):
+    created_threshold = datetime.utcnow()
+    writer.output_metrics(
+        "RenogyRover",
+        "0.1",
+        {"battery_voltage": 12.6, "charging_power": 120, "load": False, "model": "RNG"},
+    )
+
+    types = columns(connection, "metric_renogyrover")
+    assert list(types) == [
+        "id",
+        "probe",
+        "version",
+        "created_at",
+        "battery_voltage",
+        "charging_power",
+        "load",
+        "model",
+    ]
+    assert isinstance(types["battery_voltage"], Float)
+    assert isinstance(types["charging_power"], Integer)
+    assert isinstance(types["load"], Boolean)
+    assert isinstance(types["model"], String)
+
+    indexes = inspect(create_engine(connection)).get_indexes("metric_renogyrover")
+    assert [index["column_names"] for index in indexes] == [["probe", "created_at"]]
+
+    with create_engine(connection).connect() as db:
+        row = db.execute(select(writer._schema.table("RenogyRover", []))).one()
+    assert row.probe == "RenogyRover"
+    assert row.battery_voltage == 12.6
+    assert row.load is False
+    assert row.created_at - created_threshold < timedelta(seconds=2)
+
+
+def test_output_metrics_adds_columns_for_new_keys(writer, connection):
+    writer.output_metrics(
+        "RenogyRover", "0.1", {"battery_voltage": 12.6, "fault": None}
+    )
+    assert "fault" not in columns(connection, "metric_renogyrover")
+
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.7, "fault": 3})
+    assert isinstance(columns(connection, "metric_renogyrover")["fault"], Integer)
+
+    samples = [data for _, data in read_samples(writer._engine, "wide")]
+    assert samples == [
+        {"battery_voltage": 12.6, "fault": None},
+        {"battery_voltage": 12.7, "fault": 3},
+    ]
+
+
+def test_output_metrics_uses_a_table_per_probe(writer, connection):
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.6})
+    writer.output_metrics("PSUtil", "0.1", {"cpu_percent": 5.0})
+
+    assert sorted(inspect(create_engine(connection)).get_table_names()) == [
+        "metric_psutil",
+        "metric_renogyrover",
+    ]
+    with pytest.raises(ValueError):
+        list(read_samples(writer._engine, "wide"))
+    assert [data for _, data in read_samples(writer._engine, "wide", "PSUtil")] == [
+        {"cpu_percent": 5.0}
+    ]
+
+
+def test_wide_tables_are_reused_by_later_writers(writer, connection):
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.6})
+    writer.close()
+
+    writer = Sql(connection, layout="wide", batch_size=2)
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.7})
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.8, "load": 1})
+
+    samples = [data for _, data in read_samples(writer._engine, "wide")]
+    assert samples == [
+        {"battery_voltage": 12.6, "load": None},
+        {"battery_voltage": 12.7, "load": None},
+        {"battery_voltage": 12.8, "load": 1},
+    ]
+
+
+def test_reserved_keys_are_not_stored(writer):
+    writer.output_metrics("RenogyRover", "0.1", {"id": 7, "battery_voltage": 12.6})
+
+    assert [data for _, data in read_samples(writer._engine, "wide")] == [
+        {"battery_voltage": 12.6}
+    ]
+
+
+def test_unknown_layout():
+    with pytest.raises(ValueError):
+        Sql("sqlite+pysqlite:///:memory:", layout="columns")
+
+
+def test_batches_create_the_tables_of_several_probes(connection):
+    writer = Sql(connection, layout="wide", batch_size=3)
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.6})
+    writer.output_metrics("PSUtil", "0.1", {"cpu_percent": 5.0})
+    writer.output_metrics("RenogyRover", "0.1", {"battery_voltage": 12.7, "load": 1})
+
+    samples = read_samples(writer._engine, "wide", "RenogyRover")
+    assert [data for _, data in samples] == [
+        {"battery_voltage": 12.6, "load": None},
+        {"battery_voltage": 12.7, "load": 1},
+    ]
+    assert [data for _, data in read_samples(writer._engine, "wide", "PSUtil")] == [
+        {"cpu_percent": 5.0}
+    ]
+
+
+def test_integer_columns_are_widened_for_float_values(writer):
+    writer.output_metrics("RenogyRover", "0.1", {"charging_current": 0})
+    writer.output_metrics("RenogyRover", "0.1", {"charging_current": 1.25})
+
+    table = writer._schema.table("RenogyRover", [])
+    assert isinstance(table.c.charging_current.type, Float)
+    assert [data for _, data in read_samples(writer._engine, "wide")] == [
+        {"charging_current": 0},
+        {"charging_current": 1.25},
+    ]
+
+
+def test_batches_type_columns_after_all_their_values(connection):
+    writer = Sql(connection, layout="wide", batch_size=2)
+    writer.output_metrics("RenogyRover", "0.1", {"charging_current": 0})
+    writer.output_metrics("RenogyRover", "0.1", {"charging_current": 1.25})
+
+    assert isinstance(
+        columns(connection, "metric_renogyrover")["charging_current"], Float
+    )
+
+
+def test_widening_alters_the_column_type(writer):
+    writer.output_metrics("RenogyRover", "0.1", {"charging_current": 0})
+    schema = writer._schema
+    schema._engine = MagicMock(dialect=postgresql.dialect())
+
+    schema.table("RenogyRover", [{"charging_current": 1.25}])
+
+    connection = schema._engine.begin.return_value.__enter__.return_value
+    (statement,), _ = connection.execute.call_args
+    assert str(statement) == (
+        "ALTER TABLE metric_renogyrover ALTER COLUMN charging_current "
+        "SET DATA TYPE FLOAT"
+    )
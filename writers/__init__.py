@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+import asyncio
 from typing import Any
 
 
@@ -6,3 +7,20 @@ class MetricsWriter(ABC):
     @abstractmethod
     def output_metrics(self, provider: str, version: str, data: dict[str, Any]):
         raise NotImplementedError()
+
+    def close(self) -> None:
+        """
+        Called when the engine stops, to write anything still buffered and release
+        resources
+        """
+
+    async def output_metrics_async(
+        self, provider: str, version: str, data: dict[str, Any]
+    ):
+        """
+        `output_metrics()` for the asyncio engine. The default runs `output_metrics()`
+        on the event loop's thread pool.
+        """
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.output_metrics, provider, version, data
+        )
@@ -0,0 +1,283 @@
+"""
+The `delta` layout of the Sql writer: records are stored in compressed blocks, each
+holding a full first record (the keyframe) followed by only what changed from one
+record to the next
+"""
+
+import datetime
+import json
+from typing import Any, Iterator, Optional
+import zlib
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    delete,
+    insert,
+    select,
+    update,
+)
+
+FORMAT_VERSION = 2
+COMPRESSION_LEVEL = 9
+
+metadata = MetaData()
+
+BLOCK_TABLE = Table(
+    "sample_block",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("probe", String, nullable=False),
+    Column("version", String, nullable=False),
+    Column("start", DateTime, nullable=False, index=True),  # first record, UTC
+    Column("end", DateTime, nullable=False),  # last record, UTC
+    Column("count", Integer, nullable=False),
+    # empty while the block is open, its records are then in its chunks
+    Column("payload", LargeBinary, nullable=False),
+)
+
+# the records appended to an open block by each insert
+CHUNK_TABLE = Table(
+    "sample_block_chunk",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("block_id", ForeignKey(BLOCK_TABLE.c.id), nullable=False, index=True),
+    Column("payload", LargeBinary, nullable=False),
+)
+
+
+def _line(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode() + b"\n"
+
+
+def _delta(previous: dict[str, Any], data: dict[str, Any]) -> list:
+    changed = {
+        key: value
+        for key, value in data.items()
+        if key not in previous or previous[key] != value
+    }
+    removed = [key for key in previous if key not in data]
+    return [changed, removed] if removed else [changed]
+
+
+class _Block:
+    """
+    A block as a line of JSON per record: the keyframe first, then the offset in
+    milliseconds from the start, the keys whose value changed and the keys that are
+    gone of each record after it
+    """
+
+    __slots__ = ("id", "start", "end", "lines", "last", "_written", "_compressor")
+
+    def __init__(self, created_at: datetime.datetime, data: dict[str, Any]) -> None:
+        self.id: Optional[int] = None  # row of the block, once inserted
+        self.start = self.end = created_at
+        self.lines = [_line({"v": FORMAT_VERSION, "k": data})]
+        self.last = data
+        self._written = 0
+        self._compressor = zlib.compressobj(COMPRESSION_LEVEL)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def append(self, created_at: datetime.datetime, data: dict[str, Any]) -> None:
+        offset = round((created_at - self.start).total_seconds() * 1000)
+        self.lines.append(_line([offset, *_delta(self.last, data)]))
+        self.end = created_at
+        self.last = data
+
+    def chunk(self) -> bytes:
+        """
+        The lines appended since the previous chunk, compressed so that the chunks
+        put end to end are one stream
+        """
+        lines, self._written = self.lines[self._written :], len(self.lines)
+        return self._compressor.compress(b"".join(lines)) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def payload(self) -> bytes:
+        return zlib.compress(b"".join(self.lines), COMPRESSION_LEVEL)
+
+
+def encode_block(samples: list[tuple[datetime.datetime, dict[str, Any]]]) -> bytes:
+    """
+    Compress `(created_at, data)` samples into a block. Timestamps are kept as
+    milliseconds after the first one, and each record after the first as the keys
+    whose value changed and the keys that are gone.
+    """
+    block = _Block(*samples[0])
+    for created_at, data in samples[1:]:
+        block.append(created_at, data)
+    return block.payload()
+
+
+def decode_block(
+    start: datetime.datetime, payload: bytes
+) -> Iterator[tuple[datetime.datetime, dict[str, Any]]]:
+    """
+    The `(created_at, data)` samples of a block starting at `start`, or of the chunks
+    of an open block put end to end
+    """
+    lines = zlib.decompressobj().decompress(payload).split(b"\n")
+    head = json.loads(lines[0])
+    if head["v"] == 1:
+        yield from _decode_v1(start, head)
+        return
+    if head["v"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported block format {head['v']}")
+
+    data = head["k"]
+    yield start, data
+    for line in lines[1:]:
+        if not line:
+            continue
+        offset, changed, *removed = json.loads(line)
+        data = {**data, **changed}
+        for key in removed[0] if removed else ():
+            del data[key]
+        yield start + datetime.timedelta(milliseconds=offset), data
+
+
+def _decode_v1(
+    start: datetime.datetime, block: dict[str, Any]
+) -> Iterator[tuple[datetime.datetime, dict[str, Any]]]:
+    # blocks written as a single JSON document, before blocks were appended to
+    offsets = block["t"]
+    data = block["k"]
+    yield start + datetime.timedelta(milliseconds=offsets[0]), data
+    for offset, delta in zip(offsets[1:], block["d"]):
+        data = {**data, **delta[0]}
+        for key in delta[1] if len(delta) > 1 else ():
+            del data[key]
+        yield start + datetime.timedelta(milliseconds=offset), data
+
+
+def read_payload(connection: Connection, block_id: int, payload: bytes) -> bytes:
+    """
+    The payload of a block, put together from its chunks while it is open
+    """
+    if payload:
+        return payload
+    return b"".join(
+        connection.scalars(
+            select(CHUNK_TABLE.c.payload)
+            .where(CHUNK_TABLE.c.block_id == block_id)
+            .order_by(CHUNK_TABLE.c.id)
+        )
+    )
+
+
+def prune(connection: Connection, cutoff: datetime.datetime) -> None:
+    """
+    Delete the blocks whose last record is older than `cutoff`
+    """
+    expired = select(BLOCK_TABLE.c.id).where(BLOCK_TABLE.c.end < cutoff)
+    connection.execute(delete(CHUNK_TABLE).where(CHUNK_TABLE.c.block_id.in_(expired)))
+    connection.execute(delete(BLOCK_TABLE).where(BLOCK_TABLE.c.end < cutoff))
+
+
+class BlockWriter:
+    """
+    Appends records to the open block of their probe and version, however they are
+    batched. Each insert only adds a chunk holding its records, compressed as
+    the continuation of the block's previous chunks. Once a block holds
+    `keyframe_interval` records, or the writer closes, it is compressed as a whole
+    into its row and its chunks are deleted; the next record starts a new block
+    with a keyframe.
+    """
+
+    def __init__(self, keyframe_interval: int = 360) -> None:
+        if keyframe_interval < 1:
+            raise ValueError(
+                f"The keyframe interval must be at least 1, got {keyframe_interval}"
+            )
+        self.keyframe_interval = keyframe_interval
+        self._open: dict[tuple[str, str], _Block] = {}
+
+    def insert(self, connection: Connection, rows: list[dict[str, Any]]) -> None:
+        """
+        Insert rows shaped like `Metric` rows, in the blocks of their probe
+        """
+        changed: dict[int, tuple[str, str, _Block]] = {}
+        closed: dict[int, tuple[str, str, _Block]] = {}
+        for row in rows:
+            key = row["probe"], row["version"]
+            block = self._open.get(key)
+            if block is not None and len(block) >= self.keyframe_interval:
+                closed[id(block)] = (*key, block)
+                block = None
+            if block is None:
+                block = self._open[key] = _Block(row["created_at"], row["data"])
+            else:
+                block.append(row["created_at"], row["data"])
+            changed[id(block)] = (*key, block)
+
+        for probe, version, block in closed.values():
+            self._seal(connection, probe, version, block)
+        for probe, version, block in changed.values():
+            if id(block) not in closed:
+                self._append(connection, probe, version, block)
+
+    def close(self, connection: Connection) -> None:
+        """
+        Compress the open blocks into their rows
+        """
+        for (probe, version), block in self._open.items():
+            self._seal(connection, probe, version, block)
+        self._open.clear()
+
+    def reset(self) -> None:
+        """
+        Forget the open blocks, the next records start new ones
+        """
+        self._open.clear()
+
+    def _append(
+        self, connection: Connection, probe: str, version: str, block: _Block
+    ) -> None:
+        if block.id is None:
+            block.id = connection.execute(
+                insert(BLOCK_TABLE).values(
+                    probe=probe,
+                    version=version,
+                    start=block.start,
+                    end=block.end,
+                    count=len(block),
+                    payload=b"",
+                )
+            ).inserted_primary_key[0]
+        else:
+            connection.execute(
+                update(BLOCK_TABLE)
+                .where(BLOCK_TABLE.c.id == block.id)
+                .values(end=block.end, count=len(block))
+            )
+        connection.execute(
+            insert(CHUNK_TABLE).values(block_id=block.id, payload=block.chunk())
+        )
+
+    def _seal(
+        self, connection: Connection, probe: str, version: str, block: _Block
+    ) -> None:
+        values = {"end": block.end, "count": len(block), "payload": block.payload()}
+        if block.id is None:
+            connection.execute(
+                insert(BLOCK_TABLE).values(
+                    probe=probe, version=version, start=block.start, **values
+                )
+            )
+            return
+        connection.execute(
+            update(BLOCK_TABLE).where(BLOCK_TABLE.c.id == block.id).values(**values)
+        )
+        connection.execute(
+            delete(CHUNK_TABLE).where(CHUNK_TABLE.c.block_id == block.id)
+        )
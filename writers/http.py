@@ -5,6 +5,10 @@ from prometheus_client import start_http_server, Gauge
 
 logger = logging.getLogger(__name__)
 
+# Keys that identify where a record comes from rather than being a metric. They are
+# exported as labels so that probes reporting several devices get one series each.
+LABELS = ("device_id",)
+
 
 class Http(MetricsWriter):
     def __init__(self, port: int = 5000, keys: Optional[list[str]] = None) -> None:
@@ -13,7 +17,7 @@ class Http(MetricsWriter):
         self.port = port
         self.keys = keys
         self.__started = False
-        self.__gauges: dict[str, Gauge] = {}
+        self.__gauges: dict[str, tuple[Gauge, tuple[str, ...]]] = {}
 
     def __start(self, keys: list[str]):
         if self.__started:
@@ -32,16 +36,20 @@ class Http(MetricsWriter):
         if ignored_keys:
             logger.debug(f"Ignoring non-float metrics: {ignored_keys}")
 
+        labels = {label: str(data[label]) for label in LABELS if label in data}
+        labelnames = tuple(sorted(labels))
         for key in sorted(set(keys) - set(ignored_keys)):
             metric_value = data.get(key)
             if not metric_value:
                 continue
 
-            gauge = self.__gauges.get(key)
-            if not gauge:
+            if key not in self.__gauges:
                 name = key.replace("_", " ").title()
-                gauge = Gauge(key, name)
-                self.__gauges[key] = gauge
-            gauge.set(metric_value)
+                self.__gauges[key] = Gauge(key, name, labelnames=labelnames), labelnames
+            gauge, gauge_labelnames = self.__gauges[key]
+            if gauge_labelnames != labelnames:
+                logger.debug(f"Ignoring {key}, it was first reported with other labels")
+                continue
+            (gauge.labels(**labels) if labels else gauge).set(metric_value)
 
         self.__start(keys)
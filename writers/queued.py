@@ -0,0 +1,140 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Optional
+
+from instrumentation import Histogram
+from writers import MetricsWriter
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+_STOP = object()
+
+
+class QueuedWriter(MetricsWriter):
+    """
+    Hands metrics to `writer` through a bounded queue served by a dedicated thread,
+    so that a slow writer delays neither polling nor the other writers.
+
+    When the queue holds `max_size` records, `overflow` decides what happens to the
+    next one: `block` waits for room, `drop_oldest` discards the oldest queued record
+    and `drop_newest` discards the new one.
+    """
+
+    def __init__(
+        self, writer: MetricsWriter, max_size: int = 1000, overflow: str = "block"
+    ) -> None:
+        super().__init__()
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}"
+            )
+
+        self.writer = writer
+        self.name = writer.__class__.__name__
+        self.overflow = overflow
+        self.written = 0
+        self.dropped = 0
+        self.lag = 0.0  # seconds the last written record spent in the queue
+        # observes how long each write takes, set by the engine
+        self.latency: Optional[Histogram] = None
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self._abandon = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"writer-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def output_metrics(self, provider: str, version: str, data: dict[str, Any]):
+        item = (time.monotonic(), provider, version, data)
+        if self.overflow == "block":
+            self._queue.put(item)
+            return
+
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                if self.overflow == "drop_newest":
+                    self._drop()
+                    return
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._drop()
+            except queue.Empty:
+                pass
+
+    def metrics(self) -> dict[str, float]:
+        prefix = f"writer_{self.name.lower()}"
+        return {
+            f"{prefix}_queue_depth": self._queue.qsize(),
+            f"{prefix}_lag": self.lag,
+        }
+
+    def counters(self) -> dict[str, int]:
+        prefix = f"writer_{self.name.lower()}"
+        return {
+            f"{prefix}_written": self.written,
+            f"{prefix}_dropped": self.dropped,
+        }
+
+    def join(self) -> None:
+        """
+        Wait until every queued record has been written
+        """
+        self._queue.join()
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """
+        Write the records still queued, stop the writer thread and close the writer.
+        Records not written within `timeout` seconds are dropped, and a writer still
+        stuck writing is left to its thread rather than closed under it.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            self._abandon.set()
+        self._thread.join(
+            None if deadline is None else max(0.0, deadline - time.monotonic())
+        )
+        if self._thread.is_alive():
+            self._abandon.set()
+            logger.warning(
+                f"{self.name} did not finish writing within {timeout}s, "
+                f"dropping {self._queue.qsize()} queued records"
+            )
+            return
+        self.writer.close()
+
+    def _drop(self) -> None:
+        self.dropped += 1
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            logger.warning(
+                f"{self.name} is falling behind, {self.dropped} records dropped so far"
+            )
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP or self._abandon.is_set():
+                    return
+                enqueued_at, provider, version, data = item
+                try:
+                    start = time.perf_counter()
+                    self.writer.output_metrics(provider, version, data)
+                    if self.latency is not None:
+                        self.latency.observe(time.perf_counter() - start)
+                    self.written += 1
+                except Exception as exc:
+                    logger.exception(exc)
+                self.lag = time.monotonic() - enqueued_at
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,245 @@
+"""
+Per-minute, per-hour and per-day aggregates of the numeric values written by the Sql
+writer, maintained as records arrive so that long range queries don't read raw rows
+"""
+
+import datetime
+from enum import Enum
+import logging
+from typing import Any, Optional
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    Engine,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    bindparam,
+    delete,
+    insert,
+    select,
+    update,
+)
+
+logger = logging.getLogger(__name__)
+
+# bucket size of each tier, in seconds
+TIERS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+# key of the records of probes reporting on several devices, like the simulated
+# fleet, whose devices are aggregated separately
+DEVICE_KEY = "device_id"
+
+metadata = MetaData()
+
+
+def _rollup_table(tier: str) -> Table:
+    return Table(
+        f"rollup_{tier}",
+        metadata,
+        Column("probe", String, primary_key=True),
+        # empty for probes reporting on a single device
+        Column("device_id", String, primary_key=True),
+        Column("key", String, primary_key=True),
+        Column("bucket", DateTime, primary_key=True),  # start of the bucket, UTC
+        Column("count", Integer, nullable=False),
+        Column("min", Float, nullable=False),
+        Column("max", Float, nullable=False),
+        Column("avg", Float, nullable=False),
+        Column("last", Float, nullable=False),
+    )
+
+
+ROLLUP_TABLES = {tier: _rollup_table(tier) for tier in TIERS}
+
+# indexes of the aggregates of a key in an open bucket
+_MIN, _MAX, _SUM, _COUNT, _LAST = range(5)
+
+
+def numeric(value: Any) -> bool:
+    """
+    Whether `value` is aggregated, booleans and enums are states rather than amounts
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, (bool, Enum))
+
+
+def bucket_start(created_at: datetime.datetime, size: int) -> datetime.datetime:
+    """
+    Start of the bucket of `size` seconds holding `created_at`, both naive UTC
+    """
+    seconds = created_at.replace(tzinfo=datetime.timezone.utc).timestamp()
+    start = datetime.datetime.fromtimestamp(
+        seconds - seconds % size, datetime.timezone.utc
+    )
+    return start.replace(tzinfo=None)
+
+
+class _Bucket:
+    __slots__ = ("start", "values", "stored", "changed")
+
+    def __init__(self, start: datetime.datetime) -> None:
+        self.start = start
+        self.values: dict[str, list[float]] = {}
+        self.stored: set[str] = set()  # keys with a row in the database
+        self.changed = False
+
+    def add(self, data: dict[str, Any]) -> None:
+        for key, value in data.items():
+            if key == DEVICE_KEY or not numeric(value):
+                continue
+            self.changed = True
+            aggregates = self.values.get(key)
+            if aggregates is None:
+                self.values[key] = [value, value, value, 1, value]
+                continue
+            if value < aggregates[_MIN]:
+                aggregates[_MIN] = value
+            if value > aggregates[_MAX]:
+                aggregates[_MAX] = value
+            aggregates[_SUM] += value
+            aggregates[_COUNT] += 1
+            aggregates[_LAST] = value
+
+
+class Rollups:
+    """
+    Keeps the open bucket of each tier, probe and device in memory, adds every new
+    record to it and upserts the bucket's count, min, max, avg and last value of each
+    numeric key in the same transaction, so that a stop loses none of it. A bucket
+    already in the database, like the one the previous run was filling when it
+    stopped, is loaded when it is opened and carried on.
+
+    `retention` maps each tier to the days of aggregates kept, None keeps them all.
+    """
+
+    def __init__(self, engine: Engine, retention: dict[str, Optional[float]]) -> None:
+        unknown = set(retention) - set(TIERS)
+        if unknown:
+            raise ValueError(
+                f"Unknown rollup tiers {sorted(unknown)}, expected some of {list(TIERS)}"
+            )
+        self.retention = retention
+        self.tables = {tier: ROLLUP_TABLES[tier] for tier in retention}
+        metadata.create_all(engine, tables=list(self.tables.values()))
+        self._open: dict[tuple[str, str, str], _Bucket] = {}
+        self._update = {
+            tier: update(table)
+            .where(
+                table.c.probe == bindparam("_probe"),
+                table.c.device_id == bindparam("_device_id"),
+                table.c.key == bindparam("_key"),
+                table.c.bucket == bindparam("_bucket"),
+            )
+            .values(
+                count=bindparam("_count"),
+                min=bindparam("_min"),
+                max=bindparam("_max"),
+                avg=bindparam("_avg"),
+                last=bindparam("_last"),
+            )
+            for tier, table in self.tables.items()
+        }
+
+    def add(self, connection: Connection, rows: list[dict[str, Any]]) -> None:
+        """
+        Aggregate rows shaped like `Metric` rows and write the buckets they changed
+        """
+        changed: dict[tuple[str, str, str], _Bucket] = {}
+        for row in rows:
+            probe, data = row["probe"], row["data"]
+            device = str(data.get(DEVICE_KEY, ""))
+            for tier in self.tables:
+                start = bucket_start(row["created_at"], TIERS[tier])
+                key = tier, probe, device
+                bucket = self._open.get(key)
+                if bucket is None or bucket.start != start:
+                    if bucket is not None:
+                        self._write(connection, *key, bucket)
+                    bucket = self._open[key] = self._load(connection, *key, start)
+                bucket.add(data)
+                changed[key] = bucket
+        for key, bucket in changed.items():
+            self._write(connection, *key, bucket)
+
+    def reset(self) -> None:
+        """
+        Forget the open buckets, to be loaded again from the database after a write
+        was rolled back
+        """
+        self._open.clear()
+
+    def prune(self, connection: Connection, now: datetime.datetime) -> None:
+        for tier, table in self.tables.items():
+            days = self.retention[tier]
+            if days is not None:
+                cutoff = now - datetime.timedelta(days=days)
+                connection.execute(delete(table).where(table.c.bucket < cutoff))
+
+    def _load(
+        self,
+        connection: Connection,
+        tier: str,
+        probe: str,
+        device: str,
+        start: datetime.datetime,
+    ) -> _Bucket:
+        bucket = _Bucket(start)
+        table = self.tables[tier]
+        for row in connection.execute(
+            select(table).where(
+                table.c.probe == probe,
+                table.c.device_id == device,
+                table.c.bucket == start,
+            )
+        ):
+            bucket.values[row.key] = [
+                row.min,
+                row.max,
+                row.avg * row.count,
+                row.count,
+                row.last,
+            ]
+            bucket.stored.add(row.key)
+        return bucket
+
+    def _write(
+        self,
+        connection: Connection,
+        tier: str,
+        probe: str,
+        device: str,
+        bucket: _Bucket,
+    ) -> None:
+        if not bucket.changed:
+            return
+        inserts, updates = [], []
+        for key, (low, high, total, count, last) in bucket.values.items():
+            values = {
+                "probe": probe,
+                "device_id": device,
+                "key": key,
+                "bucket": bucket.start,
+                "count": count,
+                "min": low,
+                "max": high,
+                "avg": total / count,
+                "last": last,
+            }
+            if key in bucket.stored:
+                updates.append({f"_{name}": value for name, value in values.items()})
+            else:
+                inserts.append(values)
+        if updates:
+            connection.execute(self._update[tier], updates)
+        if inserts:
+            connection.execute(insert(self.tables[tier]), inserts)
+            bucket.stored.update(values["key"] for values in inserts)
+        bucket.changed = False
+        logger.debug(
+            f"Wrote the {tier} rollup of {probe}{f' ({device})' if device else ''} "
+            f"at {bucket.start}"
+        )
@@ -1,19 +1,37 @@
 import datetime
+from itertools import islice
 import logging
+import threading
+import time
 
 from sqlalchemy import (
     URL,
+    Connection,
+    Engine,
     create_engine,
+    delete,
     func,
+    insert,
+    inspect,
+    select,
 )
-from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from sqlalchemy.types import JSON
-from typing import Any, Union
+from typing import Any, Iterator, Optional, Union
 
 from writers import MetricsWriter
+from writers import delta
+from writers.rollup import Rollups
+from writers.sqlite import SqliteMaintenance, sqlite_profile
+from writers.wide import WideSchema, find_table, select_samples
 
 logger = logging.getLogger(__name__)
 
+LAYOUTS = ("json", "wide", "delta")
+
+# seconds between deletions of the rows past their retention
+PRUNE_INTERVAL = 3600.0
+
 
 class Base(DeclarativeBase):
     pass
@@ -30,20 +48,245 @@ class Metric(Base):
 
 
 class Sql(MetricsWriter):
-    def __init__(self, connection: Union[str, URL]) -> None:
+    """
+    Writes each record as a `Metric` row, its data as a JSON document. With the `wide`
+    `layout`, records are instead written to a table per probe with a typed column per
+    key (see `writers.wide`). The `delta` layout stores the records of a probe in
+    compressed blocks of the changes from one record to the next (see
+    `writers.delta`), with a full record every `keyframe_interval` records.
+
+    With a `batch_size` above 1, records are buffered and inserted together in one
+    transaction once `batch_size` of them are waiting or the oldest one has waited
+    `max_batch_age` seconds, which bounds how much data a crash can lose.
+
+    `rollups` maps the aggregate tiers to maintain (`1m`, `1h` and `1d`, see
+    `writers.rollup`) to the days they are kept for, or None to keep them all. Raw
+    records older than `retention` days are deleted.
+
+    The writer keeps one connection open and reuses the same insert statement, so
+    SQLAlchemy compiles it once. `sqlite` opts into the SQLite tuning of
+    `writers.sqlite`, `true` for its defaults or a dict overriding some of them.
+    """
+
+    def __init__(
+        self,
+        connection: Union[str, URL],
+        batch_size: int = 1,
+        max_batch_age: float = 10.0,
+        layout: str = "json",
+        rollups: Optional[dict[str, Optional[float]]] = None,
+        retention: Optional[float] = None,
+        sqlite: Union[bool, dict[str, Any], None] = None,
+        keyframe_interval: int = 360,
+    ) -> None:
         super().__init__()
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout {layout!r}, expected one of {LAYOUTS}")
 
         self._engine = create_engine(connection)
-        Base.metadata.create_all(self._engine)
+        profile = sqlite_profile(sqlite)
+        self._maintenance = (
+            SqliteMaintenance(self._engine, profile) if profile else None
+        )
+        self.layout = layout
+        self._schema: Optional[WideSchema] = None
+        self._blocks: Optional[delta.BlockWriter] = None
+        if layout == "wide":
+            self._schema = WideSchema(self._engine)
+        elif layout == "delta":
+            self._blocks = delta.BlockWriter(keyframe_interval)
+            delta.metadata.create_all(self._engine)
+        else:
+            Base.metadata.create_all(self._engine)
+        self._rollups = Rollups(self._engine, rollups) if rollups else None
+        self.retention = retention
+        self._pruned_at: Optional[float] = None
+        self._insert_metric = insert(Metric.__table__)
+        self._connection = self._engine.connect()
+        self._write_lock = threading.Lock()
+
+        self.batch_size = batch_size
+        self.max_batch_age = max_batch_age
+        self._batch: list[dict[str, Any]] = []
+        self._batch_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
 
     def output_metrics(self, probe: str, version: str, data: dict[str, Any]):
-        logger.info(f"Writing metrics for probe {probe}@{version}")
-        with Session(self._engine) as session:
-            session.add(
-                Metric(
-                    probe=probe,
-                    version=version,
-                    data=data,
-                )
+        logger.debug(f"Writing metrics for probe {probe}@{version}")
+        row = {
+            "probe": probe,
+            "version": version,
+            "data": data,
+            # the time of the sample rather than of the insert, in UTC like func.now()
+            "created_at": datetime.datetime.now(datetime.timezone.utc).replace(
+                tzinfo=None
+            ),
+        }
+        if self.batch_size <= 1:
+            self._insert([row])
+            return
+
+        with self._batch_lock:
+            self._batch.append(row)
+            full = len(self._batch) >= self.batch_size
+            if not full:
+                self._start_timer()
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Insert the buffered records in a single transaction
+        """
+        with self._flush_lock:
+            with self._batch_lock:
+                batch, self._batch = self._batch, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not batch:
+                return
+            logger.debug(f"Inserting a batch of {len(batch)} metrics")
+            try:
+                self._insert(batch)
+            except Exception:
+                # the records are put back to be inserted with the next batch, or by
+                # the timer if no other record comes
+                with self._batch_lock:
+                    self._batch[:0] = batch
+                    self._start_timer()
+                raise
+
+    def close(self) -> None:
+        self.flush()
+        with self._write_lock:
+            if self._blocks:
+                with self._connection.begin():
+                    self._blocks.close(self._connection)
+            self._connection.close()
+        self._engine.dispose()
+
+    def _insert(self, rows: list[dict[str, Any]]) -> None:
+        with self._write_lock:
+            try:
+                with self._connection.begin():
+                    self._write(self._connection, rows)
+            except Exception:
+                # the open blocks and buckets hold records that were rolled back
+                if self._blocks:
+                    self._blocks.reset()
+                if self._rollups:
+                    self._rollups.reset()
+                raise
+            if self._maintenance:
+                self._maintenance.run(self._connection)
+
+    def _write(self, connection: Connection, rows: list[dict[str, Any]]) -> None:
+        if self.layout == "wide":
+            self._schema.insert(connection, rows)
+        elif self.layout == "delta":
+            self._blocks.insert(connection, rows)
+        else:
+            connection.execute(self._insert_metric, rows)
+        if self._rollups:
+            self._rollups.add(connection, rows)
+        now = time.monotonic()
+        if self._pruned_at is None or now - self._pruned_at >= PRUNE_INTERVAL:
+            self._pruned_at = now
+            self._prune(connection)
+
+    def _prune(self, connection: Connection) -> None:
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        if self.retention is not None:
+            cutoff = now - datetime.timedelta(days=self.retention)
+            if self.layout == "wide":
+                columns = [table.c.created_at for table in self._schema.tables]
+            elif self.layout == "delta":
+                columns = []
+                delta.prune(connection, cutoff)
+            else:
+                columns = [Metric.created_at]
+            for column in columns:
+                connection.execute(delete(column.table).where(column < cutoff))
+        if self._rollups:
+            self._rollups.prune(connection, now)
+
+    def _start_timer(self) -> None:
+        if self._timer is None:
+            self._timer = threading.Timer(self.max_batch_age, self._flush_on_age)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_on_age(self) -> None:
+        try:
+            self.flush()
+        except Exception as exc:
+            logger.exception(exc)
+
+
+def read_samples(
+    engine: Engine,
+    layout: str = "json",
+    probe: Optional[str] = None,
+    limit: Optional[int] = None,
+    yield_per: int = 500,
+) -> Iterator[tuple[datetime.datetime, dict[str, Any]]]:
+    """
+    Stream the records written by the Sql writer with `layout`, oldest first, as
+    `(created_at, data)` pairs. Only the records of `probe` are read when it is given;
+    it can only be left out of the `wide` and `delta` layouts when they hold a single
+    probe.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout {layout!r}, expected one of {LAYOUTS}")
+
+    with engine.connect() as connection:
+        if layout == "delta":
+            samples = _read_blocks(connection, probe, yield_per)
+            yield from islice(samples, limit or None)
+            return
+        if layout == "json":
+            query = select(Metric.created_at, Metric.data).order_by(
+                Metric.created_at.asc(), Metric.id.asc()
             )
-            session.commit()
+            if probe is not None:
+                query = query.where(Metric.probe == probe)
+        else:
+            table = find_table(connection, probe)
+            if table is None:
+                return
+            query = select_samples(table)
+        if limit:
+            query = query.limit(limit)
+
+        result = connection.execution_options(yield_per=yield_per).execute(query)
+        if layout == "json":
+            for created_at, data in result:
+                yield created_at, data or {}
+        else:
+            keys = list(result.keys())[1:]
+            for created_at, *values in result:
+                yield created_at, dict(zip(keys, values))
+
+
+def _read_blocks(
+    connection: Connection, probe: Optional[str], yield_per: int
+) -> Iterator[tuple[datetime.datetime, dict[str, Any]]]:
+    table = delta.BLOCK_TABLE
+    if not inspect(connection).has_table(table.name):
+        return
+    if probe is None:
+        # blocks of several probes overlap, their records would go back in time
+        probes = connection.scalars(select(table.c.probe).distinct().limit(2)).all()
+        if len(probes) > 1:
+            raise ValueError("Found blocks of several probes, set which probe to read")
+    query = select(table.c.id, table.c.start, table.c.payload).order_by(
+        table.c.start.asc(), table.c.id.asc()
+    )
+    if probe is not None:
+        query = query.where(table.c.probe == probe)
+    result = connection.execution_options(yield_per=yield_per).execute(query)
+    for block_id, start, payload in result:
+        payload = delta.read_payload(connection, block_id, payload)
+        yield from delta.decode_block(start, payload)
@@ -0,0 +1,97 @@
+"""
+An opt-in SQLite tuning for the Sql writer: a write-ahead log, so that readers like
+Grafana or the simulator don't block inserts, and periodic housekeeping of the log
+and of free pages
+"""
+
+import logging
+import time
+from typing import Any, Optional, Union
+
+from sqlalchemy import Connection, Engine, event
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PROFILE: dict[str, Any] = {
+    "journal_mode": "WAL",
+    # with a WAL, only a power loss can lose the last commits, the database is safe
+    "synchronous": "NORMAL",
+    "mmap_size": 64 * 1024 * 1024,  # bytes
+    "cache_size": -16 * 1024,  # negative means KiB rather than pages
+    # only applies to databases created with it, or after a VACUUM
+    "auto_vacuum": "INCREMENTAL",
+    "checkpoint_interval": 300.0,  # seconds between WAL checkpoints
+    "vacuum_interval": 3600.0,  # seconds between incremental vacuums
+    "vacuum_pages": 1000,  # free pages released by each incremental vacuum
+}
+
+_PRAGMAS = ("auto_vacuum", "journal_mode", "synchronous", "mmap_size", "cache_size")
+
+
+def sqlite_profile(options: Union[bool, dict[str, Any], None]) -> Optional[dict]:
+    """
+    The profile for the Sql writer's `sqlite` option: None when it is off, the
+    defaults for `true` or the defaults overridden by a dict of options
+    """
+    if not options:
+        return None
+    if options is True:
+        return dict(SQLITE_PROFILE)
+    unknown = set(options) - set(SQLITE_PROFILE)
+    if unknown:
+        raise ValueError(
+            f"Unknown SQLite options {sorted(unknown)}, "
+            f"expected some of {list(SQLITE_PROFILE)}"
+        )
+    return {**SQLITE_PROFILE, **options}
+
+
+class SqliteMaintenance:
+    """
+    Sets the pragmas of `profile` on every connection `engine` opens, then checkpoints
+    the WAL and releases free pages every `checkpoint_interval` and `vacuum_interval`
+    seconds as `run()` is called
+    """
+
+    def __init__(self, engine: Engine, profile: dict[str, Any]) -> None:
+        if engine.dialect.name != "sqlite":
+            raise ValueError(
+                f"The SQLite profile doesn't apply to {engine.dialect.name} databases"
+            )
+        self.profile = profile
+        event.listen(engine, "connect", self._configure)
+        now = time.monotonic()
+        self._checkpointed_at = now
+        self._vacuumed_at = now
+
+    def _configure(self, dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in _PRAGMAS:
+                if self.profile.get(pragma) is not None:
+                    cursor.execute(f"PRAGMA {pragma}={self.profile[pragma]}")
+        finally:
+            cursor.close()
+
+    def run(self, connection: Connection) -> None:
+        """
+        Run the housekeeping that is due, outside of any write transaction
+        """
+        now = time.monotonic()
+        interval = self.profile["checkpoint_interval"]
+        if interval is not None and now - self._checkpointed_at >= interval:
+            self._checkpointed_at = now
+            busy, pages, checkpointed = connection.exec_driver_sql(
+                "PRAGMA wal_checkpoint(PASSIVE)"
+            ).one()
+            logger.debug(f"Checkpointed {checkpointed} of {pages} WAL pages")
+        interval = self.profile["vacuum_interval"]
+        if interval is not None and now - self._vacuumed_at >= interval:
+            self._vacuumed_at = now
+            # each page freed is a step of the statement and execute() only takes the
+            # first one, executescript() runs them all
+            connection.connection.driver_connection.executescript(
+                f"PRAGMA incremental_vacuum({int(self.profile['vacuum_pages'])})"
+            )
+            logger.debug("Ran an incremental vacuum")
+        connection.commit()
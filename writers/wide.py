@@ -0,0 +1,262 @@
+"""
+The `wide` layout of the Sql writer: one table per probe with a typed column per key
+of its records, so that queries read native columns instead of parsing JSON
+"""
+
+from collections import defaultdict
+import logging
+import re
+import threading
+from typing import Any, Optional
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    Connection,
+    DateTime,
+    Engine,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    Select,
+    String,
+    Table,
+    func,
+    insert,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.types import TypeEngine
+
+logger = logging.getLogger(__name__)
+
+TABLE_PREFIX = "metric_"
+
+# columns of every wide table, keys of a record with the same name are not stored
+RESERVED_COLUMNS = ("id", "probe", "version", "created_at")
+
+# changing the type of a column, SQLite keeps each value's own type whatever the
+# column's and needs none
+_ALTER_TYPE = {
+    "mysql": "ALTER TABLE {table} MODIFY {column} {type}",
+    "mariadb": "ALTER TABLE {table} MODIFY {column} {type}",
+}
+_ALTER_TYPE_DEFAULT = "ALTER TABLE {table} ALTER COLUMN {column} SET DATA TYPE {type}"
+
+
+def table_name(probe: str) -> str:
+    return TABLE_PREFIX + re.sub(r"\W+", "_", probe).lower()
+
+
+def column_type(value: Any) -> Optional[TypeEngine]:
+    """
+    The column type storing `value`, None until a key has a value to infer it from
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return Boolean()
+    if isinstance(value, int):
+        return BigInteger()
+    if isinstance(value, float):
+        return Float()
+    if isinstance(value, str):
+        return String()
+    return JSON()
+
+
+def widens(type_: TypeEngine, value: Any) -> bool:
+    """
+    Whether `value` doesn't fit a column of `type_`, like a scaled register whose
+    first value was a whole number
+    """
+    return isinstance(type_, Integer) and isinstance(value, float)
+
+
+def data_columns(table: Table) -> list[Column]:
+    return [column for column in table.columns if column.name not in RESERVED_COLUMNS]
+
+
+class WideSchema:
+    """
+    Creates the table of each probe from the keys of its first records, typed after
+    their values, and adds a column whenever a new key shows up. An integer column
+    is widened to a float one when a float value comes. Tables written by earlier
+    runs are picked up as they are.
+    """
+
+    def __init__(self, engine: Engine) -> None:
+        self._engine = engine
+        self._metadata = MetaData()
+        self._metadata.reflect(
+            engine, only=lambda name, _: name.startswith(TABLE_PREFIX)
+        )
+        self._lock = threading.Lock()
+        self._ignored: set[str] = set()
+
+    @property
+    def tables(self) -> list[Table]:
+        with self._lock:
+            return list(self._metadata.tables.values())
+
+    def insert(self, connection: Connection, rows: list[dict[str, Any]]) -> None:
+        """
+        Insert rows shaped like `Metric` rows, their `data` spread over the columns of
+        the table of their probe
+        """
+        by_probe: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            by_probe[row["probe"]].append(row)
+
+        # tables are altered on connections of their own, before `connection` writes
+        # and holds a lock on the database
+        tables = {
+            probe: self.table(probe, [row["data"] for row in probe_rows])
+            for probe, probe_rows in by_probe.items()
+        }
+        for probe, probe_rows in by_probe.items():
+            table = tables[probe]
+            keys = [column.name for column in data_columns(table)]
+            connection.execute(
+                insert(table),
+                [
+                    {
+                        "probe": row["probe"],
+                        "version": row["version"],
+                        "created_at": row["created_at"],
+                        **{key: row["data"].get(key) for key in keys},
+                    }
+                    for row in probe_rows
+                ],
+            )
+
+    def table(self, probe: str, records: list[dict[str, Any]]) -> Table:
+        """
+        The table of `probe`, created or altered to have a column for every key of
+        `records` that has a value, and of a type fitting all of them
+        """
+        with self._lock:
+            name = table_name(probe)
+            table = self._metadata.tables.get(name)
+            new_columns = self._new_columns(table, records)
+            if table is not None:
+                self._widen_columns(table, records)
+            if table is None:
+                table = Table(
+                    name,
+                    self._metadata,
+                    Column("id", Integer, primary_key=True),
+                    Column("probe", String, nullable=False),
+                    Column("version", String, nullable=False),
+                    Column("created_at", DateTime, nullable=False, default=func.now()),
+                    *new_columns,
+                    Index(f"ix_{name}_probe_created_at", "probe", "created_at"),
+                )
+                logger.info(f"Creating table {name} for probe {probe}")
+                table.create(self._engine)
+            elif new_columns:
+                self._add_columns(table, new_columns)
+            return table
+
+    def _new_columns(
+        self, table: Optional[Table], records: list[dict[str, Any]]
+    ) -> list[Column]:
+        columns: dict[str, Column] = {}
+        for record in records:
+            for key, value in record.items():
+                if key in columns or (table is not None and key in table.columns):
+                    continue
+                if key in RESERVED_COLUMNS:
+                    if key not in self._ignored:
+                        self._ignored.add(key)
+                        logger.warning(f"Not storing key {key}, it is a column name")
+                    continue
+                type_ = column_type(value)
+                if type_ is not None:
+                    columns[key] = Column(key, type_)
+        # a later record of the batch may need a wider type than the first one
+        for record in records:
+            for key, value in record.items():
+                if key in columns and widens(columns[key].type, value):
+                    columns[key] = Column(key, Float())
+        return list(columns.values())
+
+    def _widen_columns(self, table: Table, records: list[dict[str, Any]]) -> None:
+        columns = {
+            column.name: column
+            for record in records
+            for key, value in record.items()
+            if (column := table.columns.get(key)) is not None
+            and key not in RESERVED_COLUMNS
+            and widens(column.type, value)
+        }
+        if not columns:
+            return
+        dialect = self._engine.dialect
+        if dialect.name != "sqlite":
+            preparer = dialect.identifier_preparer
+            template = _ALTER_TYPE.get(dialect.name, _ALTER_TYPE_DEFAULT)
+            with self._engine.begin() as connection:
+                for column in columns.values():
+                    connection.execute(
+                        text(
+                            template.format(
+                                table=preparer.format_table(table),
+                                column=preparer.quote(column.name),
+                                type=Float().compile(dialect=dialect),
+                            )
+                        )
+                    )
+        for column in columns.values():
+            logger.info(f"Widening column {column.name} of table {table.name} to float")
+            column.type = Float()
+
+    def _add_columns(self, table: Table, columns: list[Column]) -> None:
+        preparer = self._engine.dialect.identifier_preparer
+        with self._engine.begin() as connection:
+            for column in columns:
+                logger.info(f"Adding column {column.name} to table {table.name}")
+                type_ = column.type.compile(dialect=self._engine.dialect)
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {preparer.quote(column.name)} {type_}"
+                    )
+                )
+        for column in columns:
+            table.append_column(column)
+
+
+def find_table(connection: Connection, probe: Optional[str] = None) -> Optional[Table]:
+    """
+    The wide table of `probe`, or the only wide table when no probe is given
+    """
+    if probe is not None:
+        names = [table_name(probe)]
+    else:
+        names = [
+            name
+            for name in inspect(connection).get_table_names()
+            if name.startswith(TABLE_PREFIX)
+        ]
+        if len(names) > 1:
+            raise ValueError(
+                f"Found several probe tables ({', '.join(sorted(names))}), "
+                "set which probe to read"
+            )
+    if not names or not inspect(connection).has_table(names[0]):
+        return None
+    return Table(names[0], MetaData(), autoload_with=connection)
+
+
+def select_samples(table: Table) -> Select:
+    """
+    `created_at` and the data columns of `table`, oldest rows first
+    """
+    return select(table.c.created_at, *data_columns(table)).order_by(
+        table.c.created_at.asc(), table.c.id.asc()
+    )